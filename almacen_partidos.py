@@ -0,0 +1,1053 @@
+"""
+Almacenamiento de partidos detectados.
+
+Todos los backends comparten la clave única (fecha, equipo_casa, equipo_visitante)
+y la misma interfaz (AlmacenPartidos). El backend se elige con DETECTOR_ALMACEN:
+
+- 'sqlite' (por defecto): base de datos SQLite indexada por fecha, estado, liga y supero_1_5.
+  Los filtros (rango de fechas, estado, liga, supero_1_5) y la paginación se resuelven con SQL.
+- 'jsonl': log JSON Lines con índice en memoria. Un partido nuevo se añade al final
+  del archivo, un partido que cambia se añade de nuevo (vale la última línea de cada
+  clave), las lecturas solo procesan lo añadido y el log se compacta cuando acumula
+  demasiadas versiones antiguas.
+
+Ambos admiten varios procesos (workers de gunicorn) sobre los mismos archivos:
+SQLite serializa las escrituras con BEGIN IMMEDIATE y el log JSON Lines con un
+bloqueo de archivo; la compactación reemplaza el log con un rename atómico.
+
+Uso como script (migración única desde el JSON original o el log JSON Lines):
+    python almacen_partidos.py migrar [--origen data/partidos_un_gol_detectados.json]
+"""
+import os
+import json
+import bisect
+import base64
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from bloqueo import BloqueoArchivo
+
+DATA_DIR = os.environ.get('DETECTOR_DATA_DIR', 'data')
+BACKEND = os.environ.get('DETECTOR_ALMACEN', 'sqlite')
+
+# Archivo JSON original (documento completo); se importa una vez al crear el almacén
+ARCHIVO_JSON_LEGACY = 'partidos_un_gol_detectados.json'
+ARCHIVO_LOG = 'partidos_un_gol_detectados.jsonl'
+ARCHIVO_DB = 'partidos_un_gol.db'
+
+# Detector cuyo almacén usa los archivos originales (ver detectores.py)
+DETECTOR_PRINCIPAL = 'un_gol'
+
+# Versión del esquema SQLite (PRAGMA user_version)
+ESQUEMA_VERSION = 4
+
+# Estado terminal de un detectado cuyo resultado no apareció antes del horizonte de
+# reconciliación (aplazado, suspendido): deja de estar pendiente y de contar en vivo
+SIN_RESULTADO = 'SIN_RESULTADO'
+
+# Campos de un partido, en el orden en que se guardan
+CAMPOS = [
+    'fecha', 'hora', 'liga', 'equipo_casa', 'equipo_visitante',
+    'goles_casa', 'goles_visitante', 'minuto',
+    'cuota_casa', 'cuota_empate', 'cuota_visitante',
+    'prob_casa', 'prob_empate', 'prob_visitante', 'tip',
+    'hora_deteccion', 'estado',
+    'goles_finales_casa', 'goles_finales_visitante', 'supero_1_5'
+]
+CAMPOS_ENTEROS = {
+    'goles_casa', 'goles_visitante', 'minuto',
+    'goles_finales_casa', 'goles_finales_visitante', 'supero_1_5'
+}
+
+# Compactar cuando haya más de este número de líneas obsoletas
+MAX_LINEAS_OBSOLETAS = 1000
+
+# Con más cambios que estos desde un cursor conviene recargar todo
+MAX_CAMBIOS = 500
+
+# Órdenes de la paginación: columnas de la clave de orden (el id, orden de inserción, desempata).
+# Con '-' delante (p. ej. '-fecha') el orden es descendente.
+ORDENES = {
+    'fecha': ('fecha', 'id'),
+    'deteccion': ('id',)
+}
+ORDEN_POR_DEFECTO = '-fecha'
+MAX_LIMITE_PAGINA = 200
+
+def clave_partido(fecha, equipo_casa, equipo_visitante):
+    """Clave única de un partido: fecha + equipos"""
+    return (fecha, equipo_casa, equipo_visitante)
+
+def clave_de(partido):
+    return clave_partido(partido['fecha'], partido['equipo_casa'], partido['equipo_visitante'])
+
+def _ahora():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+def _cumple(partido, desde=None, hasta=None, estado=None, liga=None, supero_1_5=None):
+    """Filtro en memoria equivalente al de SQLite (fechas YYYY-MM-DD inclusivas)"""
+    if desde and partido['fecha'] < desde:
+        return False
+    if hasta and partido['fecha'] > hasta:
+        return False
+    if estado and partido.get('estado') != estado:
+        return False
+    if liga and (partido.get('liga') or '') != liga:
+        return False
+    if supero_1_5 is not None and partido.get('supero_1_5') is not supero_1_5:
+        return False
+    return True
+
+def _filtrar(partidos, desde=None, hasta=None, estado=None):
+    for partido in partidos:
+        if _cumple(partido, desde, hasta, estado):
+            yield partido
+
+def orden_paginacion(orden=None):
+    """(columnas de la clave, descendente) de un orden como '-fecha'; ValueError si no existe"""
+    orden = orden or ORDEN_POR_DEFECTO
+    nombre = orden.lstrip('-')
+    if nombre not in ORDENES:
+        raise ValueError(f"Orden desconocido: {orden} (opciones: {', '.join(ORDENES)}, con '-' para descendente)")
+    return ORDENES[nombre], orden.startswith('-')
+
+def codificar_cursor(valores):
+    """Cursor de página opaco: la clave de orden del último partido devuelto"""
+    return base64.urlsafe_b64encode(json.dumps(valores).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor, columnas=None):
+    """Valores de la clave de orden de un cursor de página; ValueError si no es válido"""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor de página inválido: {cursor}") from e
+    if not isinstance(valores, list) or (columnas is not None and len(valores) != len(columnas)):
+        raise ValueError(f"Cursor de página inválido: {cursor}")
+    return valores
+
+# ----------------------------------------------------------------------
+# Estadísticas preagregadas por (fecha, liga)
+# ----------------------------------------------------------------------
+
+def _contribucion(partido):
+    """Aporte de un partido a su cubo: (detectados, finalizados, supero, no_supero, sin_resultado)"""
+    supero = partido.get('supero_1_5')
+    return (
+        1,
+        1 if partido.get('estado') == 'FINALIZADO' else 0,
+        1 if supero is True else 0,
+        1 if supero is False else 0,
+        1 if partido.get('estado') == SIN_RESULTADO else 0
+    )
+
+def _respuesta_cambios(cursor, revision, limpieza, cambios, limite):
+    """Respuesta común de cambios_desde() a partir de [(revisión, partido), ...]"""
+    if cursor is None or cursor < limpieza or cursor > revision or len(cambios) > limite:
+        return {'cursor': revision, 'reiniciar': True, 'partidos': []}
+    cambios.sort(key=lambda c: c[0])
+    return {
+        'cursor': revision,
+        'reiniciar': False,
+        'partidos': [{**partido, 'revision': rev} for rev, partido in cambios]
+    }
+
+def _bloque_estadisticas(detectados, finalizados, supero, no_supero, sin_resultado=0, estado=None, supero_1_5=None):
+    """Bloque `estadisticas` de la API a partir de los totales de los cubos"""
+    # Los filtros por estado y por resultado se derivan de los mismos totales
+    if supero_1_5 is not None:
+        detectados = finalizados = supero if supero_1_5 else no_supero
+        sin_resultado = 0
+        if supero_1_5:
+            no_supero = 0
+        else:
+            supero = 0
+    if estado == 'FINALIZADO':
+        detectados = finalizados
+        sin_resultado = 0
+    elif estado == 'DETECTADO':
+        detectados = detectados - finalizados - sin_resultado
+        finalizados = supero = no_supero = sin_resultado = 0
+    elif estado == SIN_RESULTADO:
+        detectados = sin_resultado
+        finalizados = supero = no_supero = 0
+    elif estado:
+        detectados = finalizados = supero = no_supero = sin_resultado = 0
+    return {
+        'detectados': detectados,
+        'finalizados': finalizados,
+        'supero_1_5': supero,
+        'no_supero_1_5': no_supero,
+        'sin_resultado': sin_resultado,
+        'en_vivo': detectados - finalizados - sin_resultado
+    }
+
+def _tamano_archivos(*rutas):
+    return sum(os.path.getsize(ruta) for ruta in rutas if os.path.exists(ruta))
+
+class AlmacenPartidos:
+    """Interfaz común de los almacenes de partidos"""
+
+    def guardar_nuevos(self, partidos):
+        """Añade los partidos cuya clave no existe. Devuelve los insertados."""
+        raise NotImplementedError
+
+    def actualizar(self, partidos):
+        """Guarda los partidos modificados. Devuelve cuántos cambiaron."""
+        raise NotImplementedError
+
+    def pendientes(self):
+        """Copias de los partidos sin resultado final (ni marcados SIN_RESULTADO)"""
+        raise NotImplementedError
+
+    def listar(self, desde=None, hasta=None, estado=None):
+        """Partidos en orden de inserción, opcionalmente filtrados"""
+        raise NotImplementedError
+
+    def pagina(self, desde=None, hasta=None, estado=None, liga=None, supero_1_5=None,
+               orden=None, despues=None, limite=None, actualizado_desde=None):
+        """
+        Una página de partidos filtrados, en el orden `orden` (ver ORDENES), a partir
+        del cursor `despues` (paginación por clave: no se salta ni repite ningún partido
+        aunque se inserten otros entre dos páginas).
+        Cada partido lleva `actualizado`: cuándo se insertó o cambió por última vez
+        (YYYY-MM-DD HH:MM:SS); `actualizado_desde` deja solo los posteriores a ese instante.
+        Devuelve {'partidos': [...], 'siguiente': cursor de la página siguiente o None}.
+        Sin `limite` devuelve todos los partidos del filtro.
+        """
+        raise NotImplementedError
+
+    def total(self):
+        raise NotImplementedError
+
+    def estadisticas(self, desde=None, hasta=None, estado=None, liga=None, supero_1_5=None):
+        """
+        Totales mantenidos de forma incremental (no recorre los partidos):
+        detectados, finalizados, supero_1_5, no_supero_1_5 y en_vivo
+        """
+        raise NotImplementedError
+
+    def estadisticas_agrupadas(self, agrupar='fecha', desde=None, hasta=None):
+        """Totales por día (agrupar='fecha') o por liga (agrupar='liga')"""
+        raise NotImplementedError
+
+    def ultima_actualizacion(self):
+        """Fecha del último cambio en los datos (un ciclo sin cambios no la mueve)"""
+        raise NotImplementedError
+
+    def version(self):
+        """Identificador que cambia con cada escritura del almacén (sirve de ETag)"""
+        raise NotImplementedError
+
+    def revision(self):
+        """Contador monótono de escrituras; cada partido guarda la revisión en que cambió"""
+        raise NotImplementedError
+
+    def cambios_desde(self, cursor, limite=MAX_CAMBIOS):
+        """
+        Partidos insertados o modificados después de la revisión `cursor`.
+        Devuelve {'cursor': revisión actual, 'reiniciar': bool, 'partidos': [...]}.
+        'reiniciar' indica que el cliente debe recargar todo (almacén limpiado,
+        cursor desconocido o demasiados cambios).
+        """
+        raise NotImplementedError
+
+    def limpiar(self):
+        """Elimina todos los partidos"""
+        raise NotImplementedError
+
+    def tamano_bytes(self):
+        """Espacio que ocupan en disco los archivos del almacén"""
+        raise NotImplementedError
+
+class AlmacenJSONL(AlmacenPartidos):
+    """Log JSON Lines de partidos con índice por clave en memoria"""
+
+    def __init__(self, ruta, ruta_legacy=None):
+        self.ruta = ruta
+        self.ruta_legacy = ruta_legacy
+        self._lock = threading.RLock()
+        # Escrituras de otros procesos sobre el mismo log
+        self._bloqueo = BloqueoArchivo(f"{ruta}.lock")
+        self._archivo = None
+        self._inodo = None
+        self._reiniciar_cache()
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        with self._lock, self._bloqueo:
+            if not os.path.exists(ruta):
+                self._importar_legacy()
+
+    # ------------------------------------------------------------------
+    # Lectura incremental
+    # ------------------------------------------------------------------
+
+    def _importar_legacy(self):
+        """Importa el JSON original (si existe) al crear el log por primera vez"""
+        registros = []
+        ultima = None
+        if self.ruta_legacy and os.path.exists(self.ruta_legacy):
+            try:
+                with open(self.ruta_legacy, 'r', encoding='utf-8') as f:
+                    datos = json.load(f)
+                registros = datos.get('partidos', [])
+                ultima = datos.get('ultima_actualizacion')
+            except Exception as e:
+                print(f"⚠️ No se pudo importar {self.ruta_legacy}: {e}")
+
+        lineas = [json.dumps(p, ensure_ascii=False) for p in registros]
+        if ultima:
+            lineas.append(json.dumps({'_meta': {'ultima_actualizacion': ultima}}, ensure_ascii=False))
+        self._reescribir(lineas)
+
+        if registros:
+            print(f"📦 Importados {len(registros)} partidos desde {self.ruta_legacy}")
+
+    def _reiniciar_cache(self):
+        self._partidos = {}
+        # Claves en orden de inserción (la posición hace de id) y (fecha, posición)
+        # ordenado, para que cada página empiece en su cursor sin recorrer las anteriores
+        self._orden = []
+        self._por_fecha = []
+        self._revisiones = {}
+        self._actualizados = {}
+        self._cubos = {}
+        self._ultima_actualizacion = None
+        self._revision = 0
+        self._limpieza = 0
+        self._offset = 0
+        self._lineas = 0
+
+    def _aplicar_linea(self, linea):
+        registro = json.loads(linea)
+        meta = registro.get('_meta')
+        if meta is not None:
+            self._ultima_actualizacion = meta.get('ultima_actualizacion', self._ultima_actualizacion)
+            self._revision = max(self._revision, meta.get('revision', 0))
+            self._limpieza = max(self._limpieza, meta.get('limpieza', 0))
+            return
+        revision = registro.pop('_rev', 0)
+        actualizado = registro.pop('_act', None)
+        self._revision = max(self._revision, revision)
+        clave = clave_de(registro)
+        self._revisiones[clave] = revision
+        self._actualizados[clave] = actualizado
+        anterior = self._partidos.get(clave)
+        if anterior is not None:
+            self._sumar_cubo(anterior, -1)
+        else:
+            bisect.insort(self._por_fecha, (registro['fecha'], len(self._orden)))
+            self._orden.append(clave)
+        self._sumar_cubo(registro, 1)
+        self._partidos[clave] = registro
+
+    def _sumar_cubo(self, partido, signo):
+        cubo_clave = (partido['fecha'], partido.get('liga') or '')
+        cubo = self._cubos.setdefault(cubo_clave, [0, 0, 0, 0, 0])
+        for i, valor in enumerate(_contribucion(partido)):
+            cubo[i] += signo * valor
+
+    def _cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+        self._archivo = None
+        self._inodo = None
+
+    def _sincronizar(self):
+        """Lee solo lo que se añadió al log desde la última lectura"""
+        try:
+            estado = os.stat(self.ruta)
+        except FileNotFoundError:
+            self._cerrar()
+            self._reiniciar_cache()
+            return
+
+        # El archivo fue reemplazado (compactación/limpieza) o truncado: releer.
+        # El archivo leído se mantiene abierto para que el sistema no reutilice
+        # su inodo en otro log y la comparación nunca confunda dos archivos.
+        if self._inodo != estado.st_ino or estado.st_size < self._offset:
+            self._cerrar()
+            self._reiniciar_cache()
+            self._archivo = open(self.ruta, 'rb')
+            self._inodo = os.fstat(self._archivo.fileno()).st_ino
+
+        self._archivo.seek(self._offset)
+        nuevo = self._archivo.read()
+        if not nuevo:
+            return
+
+        # Ignorar una última línea incompleta (escritura en curso)
+        fin = nuevo.rfind(b'\n') + 1
+        for linea in nuevo[:fin].splitlines():
+            if not linea.strip():
+                continue
+            try:
+                self._aplicar_linea(linea)
+                self._lineas += 1
+            except Exception as e:
+                print(f"⚠️ Línea inválida en {self.ruta}: {e}")
+        self._offset += fin
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def _anexar(self, lineas):
+        if not lineas:
+            return
+        with open(self.ruta, 'a', encoding='utf-8') as f:
+            f.write(''.join(linea + '\n' for linea in lineas))
+        # Aplicar lo escrito (y lo que otro proceso hubiera añadido antes)
+        self._sincronizar()
+
+        if self._lineas - len(self._partidos) > MAX_LINEAS_OBSOLETAS:
+            self._compactar()
+
+    def _reescribir(self, lineas):
+        """Reescribe el log completo de forma atómica (temporal + rename)"""
+        temporal = f"{self.ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(''.join(linea + '\n' for linea in lineas))
+        os.replace(temporal, self.ruta)
+        self._sincronizar()
+
+    def _linea_partido(self, partido, revision, actualizado):
+        return json.dumps({**partido, '_rev': revision, '_act': actualizado}, ensure_ascii=False)
+
+    def _linea_meta(self, **cambios):
+        meta = {
+            'ultima_actualizacion': self._ultima_actualizacion,
+            'revision': self._revision,
+            'limpieza': self._limpieza
+        }
+        meta.update(cambios)
+        return json.dumps({'_meta': meta}, ensure_ascii=False)
+
+    def _compactar(self):
+        """Deja una sola línea por partido (conservando su revisión)"""
+        lineas = [
+            self._linea_partido(p, self._revisiones.get(clave, 0), self._actualizados.get(clave))
+            for clave, p in self._partidos.items()
+        ]
+        lineas.append(self._linea_meta())
+        self._reescribir(lineas)
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def guardar_nuevos(self, partidos):
+        with self._lock, self._bloqueo:
+            self._sincronizar()
+            insertados = []
+            vistos = set()
+            for partido in partidos:
+                clave = clave_de(partido)
+                if clave in self._partidos or clave in vistos:
+                    continue
+                vistos.add(clave)
+                insertados.append(partido)
+            if not insertados:
+                # Sin cambios no se escribe nada: la versión (y el ETag) se mantiene
+                return insertados
+
+            revision = self._revision + 1
+            ahora = _ahora()
+            lineas = [self._linea_partido(p, revision, ahora) for p in insertados]
+            lineas.append(self._linea_meta(ultima_actualizacion=ahora, revision=revision))
+            self._anexar(lineas)
+            return insertados
+
+    def actualizar(self, partidos):
+        with self._lock, self._bloqueo:
+            self._sincronizar()
+            revision = self._revision + 1
+            ahora = _ahora()
+            lineas = []
+            for partido in partidos:
+                actual = self._partidos.get(clave_de(partido))
+                if actual == partido:
+                    continue
+                lineas.append(self._linea_partido(partido, revision, ahora))
+            actualizados = len(lineas)
+            if lineas:
+                lineas.append(self._linea_meta(ultima_actualizacion=ahora, revision=revision))
+            self._anexar(lineas)
+            return actualizados
+
+    def pendientes(self):
+        with self._lock:
+            self._sincronizar()
+            return [
+                dict(p) for p in self._partidos.values()
+                if p.get('supero_1_5') is None and p.get('estado') != SIN_RESULTADO
+            ]
+
+    def listar(self, desde=None, hasta=None, estado=None):
+        with self._lock:
+            self._sincronizar()
+            return list(_filtrar(self._partidos.values(), desde, hasta, estado))
+
+    def pagina(self, desde=None, hasta=None, estado=None, liga=None, supero_1_5=None,
+               orden=None, despues=None, limite=None, actualizado_desde=None):
+        columnas, descendente = orden_paginacion(orden)
+        tope = decodificar_cursor(despues, columnas) if despues else None
+        with self._lock:
+            self._sincronizar()
+            partidos = []
+            # El recorrido ya va en el orden pedido: basta con llenar la página (más uno
+            # para saber si hay otra)
+            for valores, clave in self._recorrer(columnas, descendente, tope):
+                if limite is not None and len(partidos) > limite:
+                    break
+                partido = self._partidos[clave]
+                if not _cumple(partido, desde, hasta, estado, liga, supero_1_5):
+                    continue
+                actualizado = self._actualizados.get(clave)
+                if actualizado_desde and (actualizado is None or actualizado < actualizado_desde):
+                    continue
+                partidos.append((valores, partido, actualizado))
+
+        siguiente = None
+        if limite is not None and len(partidos) > limite:
+            siguiente = codificar_cursor(partidos[limite - 1][0])
+            partidos = partidos[:limite]
+        return {
+            'partidos': [{**p, 'actualizado': actualizado} for _, p, actualizado in partidos],
+            'siguiente': siguiente
+        }
+
+    def _recorrer(self, columnas, descendente, tope=None):
+        """(valores de la clave de orden, clave) en el orden pedido, a partir del cursor `tope`"""
+        if columnas == ('id',):
+            # La posición en el índice (orden de inserción) hace de id
+            if descendente:
+                inicio = len(self._orden) - 1 if tope is None else min(tope[0], len(self._orden)) - 1
+                posiciones = range(inicio, -1, -1)
+            else:
+                posiciones = range(0 if tope is None else max(tope[0] + 1, 0), len(self._orden))
+            for posicion in posiciones:
+                yield [posicion], self._orden[posicion]
+            return
+
+        if descendente:
+            inicio = len(self._por_fecha) if tope is None else bisect.bisect_left(self._por_fecha, tuple(tope))
+            indices = range(inicio - 1, -1, -1)
+        else:
+            inicio = 0 if tope is None else bisect.bisect_right(self._por_fecha, tuple(tope))
+            indices = range(inicio, len(self._por_fecha))
+        for indice in indices:
+            fecha, posicion = self._por_fecha[indice]
+            yield [fecha, posicion], self._orden[posicion]
+
+    def total(self):
+        with self._lock:
+            self._sincronizar()
+            return len(self._partidos)
+
+    def _cubos_en_rango(self, desde, hasta, liga=None):
+        for (fecha, liga_cubo), cubo in self._cubos.items():
+            if desde and fecha < desde:
+                continue
+            if hasta and fecha > hasta:
+                continue
+            if liga and liga_cubo != liga:
+                continue
+            yield fecha, liga_cubo, cubo
+
+    def estadisticas(self, desde=None, hasta=None, estado=None, liga=None, supero_1_5=None):
+        with self._lock:
+            self._sincronizar()
+            totales = [0, 0, 0, 0, 0]
+            for _, _, cubo in self._cubos_en_rango(desde, hasta, liga):
+                for i, valor in enumerate(cubo):
+                    totales[i] += valor
+            return _bloque_estadisticas(*totales, estado=estado, supero_1_5=supero_1_5)
+
+    def estadisticas_agrupadas(self, agrupar='fecha', desde=None, hasta=None):
+        with self._lock:
+            self._sincronizar()
+            grupos = {}
+            for fecha, liga, cubo in self._cubos_en_rango(desde, hasta):
+                grupo = grupos.setdefault(fecha if agrupar == 'fecha' else liga, [0, 0, 0, 0, 0])
+                for i, valor in enumerate(cubo):
+                    grupo[i] += valor
+            return [
+                {agrupar: nombre, **_bloque_estadisticas(*grupo)}
+                for nombre, grupo in sorted(grupos.items())
+                if grupo[0]
+            ]
+
+    def ultima_actualizacion(self):
+        with self._lock:
+            self._sincronizar()
+            return self._ultima_actualizacion
+
+    def version(self):
+        # El log solo crece o se reemplaza: inodo + bytes leídos identifican el contenido
+        with self._lock:
+            self._sincronizar()
+            return f"{self._inodo}-{self._offset}"
+
+    def revision(self):
+        with self._lock:
+            self._sincronizar()
+            return self._revision
+
+    def cambios_desde(self, cursor, limite=MAX_CAMBIOS):
+        with self._lock:
+            self._sincronizar()
+            cambios = []
+            if cursor is not None:
+                cambios = [
+                    (self._revisiones[clave], partido)
+                    for clave, partido in self._partidos.items()
+                    if self._revisiones[clave] > cursor
+                ]
+            return _respuesta_cambios(cursor, self._revision, self._limpieza, cambios, limite)
+
+    def limpiar(self):
+        with self._lock, self._bloqueo:
+            self._sincronizar()
+            revision = self._revision + 1
+            self._reescribir([
+                self._linea_meta(ultima_actualizacion=_ahora(), revision=revision, limpieza=revision)
+            ])
+
+    def tamano_bytes(self):
+        return _tamano_archivos(self.ruta)
+
+class AlmacenSQLite(AlmacenPartidos):
+    """Partidos en SQLite, con índices para filtrar por fecha, estado, liga y supero_1_5"""
+
+    def __init__(self, ruta, rutas_legacy=()):
+        self.ruta = ruta
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        # Varios workers arrancando a la vez: solo uno crea, migra el esquema e importa
+        with BloqueoArchivo(f"{ruta}.lock"):
+            nueva = not os.path.exists(ruta)
+            self._crear_esquema()
+
+            if nueva:
+                for ruta_legacy in rutas_legacy:
+                    if os.path.exists(ruta_legacy):
+                        try:
+                            migrar(ruta_legacy, self)
+                        except Exception as e:
+                            print(f"⚠️ No se pudo migrar {ruta_legacy}: {e}")
+                        break
+
+    def _conexion(self):
+        """Una conexión por hilo"""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30)
+            conexion.row_factory = sqlite3.Row
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexion = conexion
+        return conexion
+
+    def _crear_esquema(self):
+        columnas = ', '.join(
+            f"{campo} {'INTEGER' if campo in CAMPOS_ENTEROS else 'TEXT'}" for campo in CAMPOS
+        )
+        with self._conexion() as conexion:
+            conexion.executescript(f"""
+                CREATE TABLE IF NOT EXISTS partidos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    {columnas},
+                    revision INTEGER NOT NULL DEFAULT 0,
+                    actualizado TEXT,
+                    UNIQUE (fecha, equipo_casa, equipo_visitante)
+                );
+                CREATE INDEX IF NOT EXISTS idx_partidos_fecha ON partidos (fecha);
+                CREATE INDEX IF NOT EXISTS idx_partidos_estado ON partidos (estado);
+                CREATE INDEX IF NOT EXISTS idx_partidos_supero ON partidos (supero_1_5);
+                CREATE TABLE IF NOT EXISTS meta (
+                    clave TEXT PRIMARY KEY,
+                    valor TEXT
+                );
+            """)
+            self._crear_estadisticas(conexion)
+            self._migrar_esquema(conexion)
+
+    def _crear_estadisticas(self, conexion):
+        """
+        Cubos (fecha, liga) mantenidos por triggers en la misma transacción
+        que cada INSERT/UPDATE/DELETE de partidos
+        """
+        aporte = lambda fila: (
+            f"1, IFNULL({fila}.estado = 'FINALIZADO', 0), "
+            f"IFNULL({fila}.supero_1_5 = 1, 0), IFNULL({fila}.supero_1_5 = 0, 0), "
+            f"IFNULL({fila}.estado = '{SIN_RESULTADO}', 0)"
+        )
+        sumar_nuevo = f"""
+            INSERT INTO estadisticas (fecha, liga, detectados, finalizados, supero, no_supero, sin_resultado)
+            VALUES (NEW.fecha, IFNULL(NEW.liga, ''), {aporte('NEW')})
+            ON CONFLICT (fecha, liga) DO UPDATE SET
+                detectados = detectados + excluded.detectados,
+                finalizados = finalizados + excluded.finalizados,
+                supero = supero + excluded.supero,
+                no_supero = no_supero + excluded.no_supero,
+                sin_resultado = sin_resultado + excluded.sin_resultado;
+        """
+        restar_anterior = f"""
+            UPDATE estadisticas SET
+                detectados = detectados - 1,
+                finalizados = finalizados - IFNULL(OLD.estado = 'FINALIZADO', 0),
+                supero = supero - IFNULL(OLD.supero_1_5 = 1, 0),
+                no_supero = no_supero - IFNULL(OLD.supero_1_5 = 0, 0),
+                sin_resultado = sin_resultado - IFNULL(OLD.estado = '{SIN_RESULTADO}', 0)
+            WHERE fecha = OLD.fecha AND liga = IFNULL(OLD.liga, '');
+        """
+        conexion.executescript(f"""
+            CREATE TABLE IF NOT EXISTS estadisticas (
+                fecha TEXT NOT NULL,
+                liga TEXT NOT NULL,
+                detectados INTEGER NOT NULL DEFAULT 0,
+                finalizados INTEGER NOT NULL DEFAULT 0,
+                supero INTEGER NOT NULL DEFAULT 0,
+                no_supero INTEGER NOT NULL DEFAULT 0,
+                sin_resultado INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (fecha, liga)
+            );
+            CREATE TRIGGER IF NOT EXISTS trg_estadisticas_insert AFTER INSERT ON partidos BEGIN
+                {sumar_nuevo}
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_estadisticas_update AFTER UPDATE ON partidos BEGIN
+                {restar_anterior}
+                {sumar_nuevo}
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_estadisticas_delete AFTER DELETE ON partidos BEGIN
+                {restar_anterior}
+            END;
+        """)
+
+    def _migrar_esquema(self, conexion):
+        """Pone al día bases creadas con versiones anteriores del esquema"""
+        version = conexion.execute('PRAGMA user_version').fetchone()[0]
+
+        # v1: cubos de estadísticas, recalculados una vez desde los partidos
+        if version < 1:
+            conexion.executescript("""
+                DELETE FROM estadisticas;
+                INSERT INTO estadisticas (fecha, liga, detectados, finalizados, supero, no_supero)
+                SELECT fecha, IFNULL(liga, ''), COUNT(*),
+                       SUM(IFNULL(estado = 'FINALIZADO', 0)),
+                       SUM(IFNULL(supero_1_5 = 1, 0)),
+                       SUM(IFNULL(supero_1_5 = 0, 0))
+                FROM partidos GROUP BY fecha, IFNULL(liga, '');
+            """)
+
+        columnas = [c[1] for c in conexion.execute('PRAGMA table_info(partidos)')]
+
+        # v2: revisión por partido para el feed de cambios
+        if version < 2 and 'revision' not in columnas:
+            conexion.execute('ALTER TABLE partidos ADD COLUMN revision INTEGER NOT NULL DEFAULT 0')
+
+        # v3: instante de la última inserción o cambio (exportación incremental)
+        if version < 3 and 'actualizado' not in columnas:
+            conexion.execute('ALTER TABLE partidos ADD COLUMN actualizado TEXT')
+
+        # v4: cubo de partidos SIN_RESULTADO (no existían antes: empieza en 0); los
+        # triggers se recrean para mantenerlo
+        columnas_estadisticas = [c[1] for c in conexion.execute('PRAGMA table_info(estadisticas)')]
+        if version < 4 and 'sin_resultado' not in columnas_estadisticas:
+            conexion.executescript("""
+                ALTER TABLE estadisticas ADD COLUMN sin_resultado INTEGER NOT NULL DEFAULT 0;
+                DROP TRIGGER IF EXISTS trg_estadisticas_insert;
+                DROP TRIGGER IF EXISTS trg_estadisticas_update;
+                DROP TRIGGER IF EXISTS trg_estadisticas_delete;
+            """)
+            self._crear_estadisticas(conexion)
+
+        conexion.executescript(f"""
+            CREATE INDEX IF NOT EXISTS idx_partidos_revision ON partidos (revision);
+            CREATE INDEX IF NOT EXISTS idx_partidos_liga ON partidos (liga, fecha);
+            PRAGMA user_version = {ESQUEMA_VERSION};
+        """)
+
+    @staticmethod
+    def _a_fila(partido):
+        valores = [partido.get(campo) for campo in CAMPOS]
+        supero = partido.get('supero_1_5')
+        valores[CAMPOS.index('supero_1_5')] = None if supero is None else int(bool(supero))
+        return valores
+
+    @staticmethod
+    def _a_partido(fila):
+        partido = {campo: fila[campo] for campo in CAMPOS}
+        if partido['supero_1_5'] is not None:
+            partido['supero_1_5'] = bool(partido['supero_1_5'])
+        return partido
+
+    @staticmethod
+    def _leer_meta(conexion, clave, defecto=None):
+        fila = conexion.execute('SELECT valor FROM meta WHERE clave = ?', (clave,)).fetchone()
+        return fila[0] if fila else defecto
+
+    @staticmethod
+    def _escribir_meta(conexion, clave, valor):
+        conexion.execute('INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)', (clave, str(valor)))
+
+    @contextmanager
+    def _escritura(self):
+        """
+        Transacción de escritura: BEGIN IMMEDIATE toma el bloqueo de escritura
+        antes de leer la revisión, así dos escritores nunca reparten la misma
+        """
+        with self._lock:
+            conexion = self._conexion()
+            conexion.execute('BEGIN IMMEDIATE')
+            try:
+                yield conexion
+                conexion.commit()
+            except Exception:
+                conexion.rollback()
+                raise
+
+    def guardar_nuevos(self, partidos):
+        marcadores = ', '.join('?' for _ in CAMPOS)
+        insertados = []
+        ahora = _ahora()
+        with self._escritura() as conexion:
+            revision = int(self._leer_meta(conexion, 'revision', 0)) + 1
+            for partido in partidos:
+                cursor = conexion.execute(
+                    f"INSERT OR IGNORE INTO partidos ({', '.join(CAMPOS)}, revision, actualizado) "
+                    f"VALUES ({marcadores}, ?, ?)",
+                    self._a_fila(partido) + [revision, ahora]
+                )
+                if cursor.rowcount:
+                    insertados.append(partido)
+            if insertados:
+                self._escribir_meta(conexion, 'ultima_actualizacion', ahora)
+                self._escribir_meta(conexion, 'revision', revision)
+        return insertados
+
+    def actualizar(self, partidos):
+        campos_valor = [c for c in CAMPOS if c not in ('fecha', 'equipo_casa', 'equipo_visitante')]
+        asignaciones = ', '.join(f"{c} = ?" for c in campos_valor)
+        # Solo cuenta (y escribe) las filas que realmente cambian
+        cambios = ' OR '.join(f"{c} IS NOT ?" for c in campos_valor)
+        actualizados = 0
+        ahora = _ahora()
+        with self._escritura() as conexion:
+            revision = int(self._leer_meta(conexion, 'revision', 0)) + 1
+            for partido in partidos:
+                fila = dict(zip(CAMPOS, self._a_fila(partido)))
+                valores = [fila[c] for c in campos_valor]
+                cursor = conexion.execute(
+                    f"UPDATE partidos SET {asignaciones}, revision = ?, actualizado = ? "
+                    f"WHERE fecha = ? AND equipo_casa = ? AND equipo_visitante = ? AND ({cambios})",
+                    valores + [revision, ahora, fila['fecha'], fila['equipo_casa'], fila['equipo_visitante']] + valores
+                )
+                actualizados += cursor.rowcount
+            if actualizados:
+                self._escribir_meta(conexion, 'ultima_actualizacion', ahora)
+                self._escribir_meta(conexion, 'revision', revision)
+        return actualizados
+
+    def pendientes(self):
+        filas = self._conexion().execute(
+            f"SELECT {', '.join(CAMPOS)} FROM partidos "
+            f"WHERE supero_1_5 IS NULL AND IFNULL(estado, '') != ? ORDER BY id", (SIN_RESULTADO,)
+        ).fetchall()
+        return [self._a_partido(f) for f in filas]
+
+    def listar(self, desde=None, hasta=None, estado=None):
+        where, parametros = self._rango(desde, hasta, estado)
+        filas = self._conexion().execute(
+            f"SELECT {', '.join(CAMPOS)} FROM partidos {where} ORDER BY id", parametros
+        ).fetchall()
+        return [self._a_partido(f) for f in filas]
+
+    def pagina(self, desde=None, hasta=None, estado=None, liga=None, supero_1_5=None,
+               orden=None, despues=None, limite=None, actualizado_desde=None):
+        columnas, descendente = orden_paginacion(orden)
+        where, parametros = self._rango(desde, hasta, estado, liga, supero_1_5)
+        if actualizado_desde:
+            where = f"{where} AND actualizado >= ?" if where else "WHERE actualizado >= ?"
+            parametros.append(actualizado_desde)
+        if despues:
+            # Comparación de filas: sigue el índice (fecha, id) sin OFFSET
+            valores = decodificar_cursor(despues, columnas)
+            condicion = f"({', '.join(columnas)}) {'<' if descendente else '>'} ({', '.join('?' for _ in columnas)})"
+            where = f"{where} AND {condicion}" if where else f"WHERE {condicion}"
+            parametros.extend(valores)
+        sentido = 'DESC' if descendente else 'ASC'
+        consulta = (
+            f"SELECT id, {', '.join(CAMPOS)}, actualizado FROM partidos {where} "
+            f"ORDER BY {', '.join(f'{c} {sentido}' for c in columnas)}"
+        )
+        if limite is not None:
+            consulta += ' LIMIT ?'
+            parametros.append(limite + 1)
+        filas = self._conexion().execute(consulta, parametros).fetchall()
+
+        siguiente = None
+        if limite is not None and len(filas) > limite:
+            filas = filas[:limite]
+            siguiente = codificar_cursor([filas[-1][c] for c in columnas])
+        return {
+            'partidos': [{**self._a_partido(f), 'actualizado': f['actualizado']} for f in filas],
+            'siguiente': siguiente
+        }
+
+    def total(self):
+        return self._conexion().execute('SELECT COUNT(*) FROM partidos').fetchone()[0]
+
+    @staticmethod
+    def _rango(desde, hasta, estado=None, liga=None, supero_1_5=None):
+        """
+        Cláusula WHERE para el rango de fechas (y el estado, la liga y el resultado,
+        si se indican; la tabla estadisticas no tiene supero_1_5)
+        """
+        condiciones = []
+        parametros = []
+        if desde:
+            condiciones.append('fecha >= ?')
+            parametros.append(desde)
+        if hasta:
+            condiciones.append('fecha <= ?')
+            parametros.append(hasta)
+        if estado:
+            condiciones.append('estado = ?')
+            parametros.append(estado)
+        if liga:
+            condiciones.append('liga = ?')
+            parametros.append(liga)
+        if supero_1_5 is not None:
+            condiciones.append('supero_1_5 = ?')
+            parametros.append(int(supero_1_5))
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        return where, parametros
+
+    def estadisticas(self, desde=None, hasta=None, estado=None, liga=None, supero_1_5=None):
+        where, parametros = self._rango(desde, hasta, liga=liga)
+        fila = self._conexion().execute(
+            "SELECT IFNULL(SUM(detectados), 0), IFNULL(SUM(finalizados), 0), "
+            "IFNULL(SUM(supero), 0), IFNULL(SUM(no_supero), 0), "
+            f"IFNULL(SUM(sin_resultado), 0) FROM estadisticas {where}",
+            parametros
+        ).fetchone()
+        return _bloque_estadisticas(*fila, estado=estado, supero_1_5=supero_1_5)
+
+    def estadisticas_agrupadas(self, agrupar='fecha', desde=None, hasta=None):
+        columna = 'fecha' if agrupar == 'fecha' else 'liga'
+        where, parametros = self._rango(desde, hasta)
+        filas = self._conexion().execute(
+            f"SELECT {columna}, SUM(detectados), SUM(finalizados), SUM(supero), SUM(no_supero), SUM(sin_resultado) "
+            f"FROM estadisticas {where} GROUP BY {columna} HAVING SUM(detectados) > 0 ORDER BY {columna}",
+            parametros
+        ).fetchall()
+        return [{columna: f[0], **_bloque_estadisticas(*f[1:])} for f in filas]
+
+    def ultima_actualizacion(self):
+        return self._leer_meta(self._conexion(), 'ultima_actualizacion')
+
+    def version(self):
+        return str(self.revision())
+
+    def revision(self):
+        return int(self._leer_meta(self._conexion(), 'revision', 0))
+
+    def cambios_desde(self, cursor, limite=MAX_CAMBIOS):
+        conexion = self._conexion()
+        revision = self.revision()
+        limpieza = int(self._leer_meta(conexion, 'limpieza', 0))
+        cambios = []
+        if cursor is not None and limpieza <= cursor <= revision:
+            # Acotado por la revisión leída: lo que se escriba después llega en la próxima consulta
+            filas = conexion.execute(
+                f"SELECT {', '.join(CAMPOS)}, revision FROM partidos "
+                "WHERE revision > ? AND revision <= ? ORDER BY revision, id LIMIT ?",
+                (cursor, revision, limite + 1)
+            ).fetchall()
+            cambios = [(f['revision'], self._a_partido(f)) for f in filas]
+        return _respuesta_cambios(cursor, revision, limpieza, cambios, limite)
+
+    def limpiar(self):
+        with self._escritura() as conexion:
+            revision = int(self._leer_meta(conexion, 'revision', 0)) + 1
+            conexion.execute('DELETE FROM partidos')
+            conexion.execute('DELETE FROM estadisticas')
+            self._escribir_meta(conexion, 'ultima_actualizacion', _ahora())
+            self._escribir_meta(conexion, 'revision', revision)
+            self._escribir_meta(conexion, 'limpieza', revision)
+
+    def tamano_bytes(self):
+        # Con WAL las escrituras recientes están en el -wal hasta el checkpoint
+        return _tamano_archivos(self.ruta, f"{self.ruta}-wal")
+
+def leer_json_legacy(ruta):
+    """Lee partidos del JSON original (documento) o de un log JSON Lines"""
+    if ruta.endswith('.jsonl'):
+        return AlmacenJSONL(ruta).listar()
+
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f).get('partidos', [])
+
+def migrar(origen, destino):
+    """Copia los partidos de un JSON/JSONL existente a otro almacén (sin duplicar)"""
+    partidos = leer_json_legacy(origen)
+    insertados = destino.guardar_nuevos(partidos)
+    print(f"📦 Migrados {len(insertados)} de {len(partidos)} partidos desde {origen}")
+    return len(insertados)
+
+_almacenes = {}
+_almacenes_lock = threading.Lock()
+
+def obtener_almacen(detector=DETECTOR_PRINCIPAL):
+    """
+    Devuelve el almacén compartido del proceso según DETECTOR_ALMACEN.
+    Cada detector (detectores.py) tiene el suyo; el principal conserva los
+    nombres de archivo originales y la migración del JSON.
+    """
+    if detector == DETECTOR_PRINCIPAL:
+        legacy = os.path.join(DATA_DIR, ARCHIVO_JSON_LEGACY)
+        log = os.path.join(DATA_DIR, ARCHIVO_LOG)
+        ruta = os.path.join(DATA_DIR, ARCHIVO_DB)
+    else:
+        legacy = None
+        log = os.path.join(DATA_DIR, f"partidos_{detector}_detectados.jsonl")
+        ruta = os.path.join(DATA_DIR, f"partidos_{detector}.db")
+
+    with _almacenes_lock:
+        if BACKEND == 'jsonl':
+            if log not in _almacenes:
+                _almacenes[log] = AlmacenJSONL(log, legacy)
+            return _almacenes[log]
+
+        if ruta not in _almacenes:
+            # Al crear la base se migra el log JSON Lines o, si no existe, el JSON original
+            _almacenes[ruta] = AlmacenSQLite(ruta, rutas_legacy=tuple(r for r in (log, legacy) if r))
+        return _almacenes[ruta]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Almacén de partidos detectados')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    parser_migrar = subparsers.add_parser('migrar', help='Migra un JSON/JSONL existente al almacén configurado')
+    parser_migrar.add_argument('--origen', help='Archivo de origen (por defecto el log JSONL o el JSON original)')
+    args = parser.parse_args()
+
+    if args.comando == 'migrar':
+        origen = args.origen
+        if not origen:
+            candidatos = [os.path.join(DATA_DIR, ARCHIVO_LOG), os.path.join(DATA_DIR, ARCHIVO_JSON_LEGACY)]
+            origen = next((c for c in candidatos if os.path.exists(c)), None)
+        if not origen:
+            print("❌ No hay ningún archivo para migrar")
+        else:
+            migrar(origen, obtener_almacen())
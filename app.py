@@ -1,48 +1,104 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, g, stream_with_context
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
+from collections import OrderedDict
 import atexit
+import gzip
+import json
+import hashlib
+import threading
+import time
 from datetime import datetime
 import scrape_un_gol_live
+import almacen_partidos
+import cliente_http
+import detectores
+import eventos
+import metricas
+import programador
 
 app = Flask(__name__)
 
+# Respuestas JSON ya serializadas (y comprimidas), válidas mientras no cambie el almacén
+MAX_RESPUESTAS_CACHEADAS = 64
+MIN_BYTES_GZIP = 1024
+_respuestas_cacheadas = OrderedDict()
+_respuestas_lock = threading.Lock()
+
+LATENCIA_API = metricas.histograma(
+    'detector_api_peticion_segundos', 'Latencia de la API por ruta, método y código de estado',
+    ['ruta', 'metodo', 'estado'])
+ALMACEN_BYTES = metricas.medidor(
+    'detector_almacen_bytes', 'Espacio en disco del almacén de partidos de cada detector', ['detector', 'backend'])
+ALMACEN_PARTIDOS = metricas.medidor(
+    'detector_almacen_partidos', 'Partidos guardados por detector y estado (DETECTADO, FINALIZADO, SIN_RESULTADO)', ['detector', 'estado'])
+
 # Configurar scheduler
 scheduler = BackgroundScheduler()
 scheduler.start()
 
-def ejecutar_scraping_un_gol():
-    """Función que ejecuta el scraping automático"""
-    print(f"\n{'='*60}")
-    print(f"🤖 Scraping automático - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"{'='*60}")
-    
-    resultado = scrape_un_gol_live.scrape_partidos_un_gol_live()
+# Cada worker publica sus métricas para que /metrics sume las de todos
+metricas.programar_publicacion(scheduler)
+
+# Scraping programado: solo en el worker elegido (ver programador.py)
+if programador.MODO == 'auto':
+    programador.iniciar(scheduler)
+
+def respuesta_cacheada(construir, detector=almacen_partidos.DETECTOR_PRINCIPAL):
+    """
+    Sirve el JSON de `construir()` con ETag ligado a la versión del almacén del detector.
+    - If-None-Match con la versión actual: 304 sin cuerpo.
+    - Misma versión y mismos parámetros: cuerpo ya serializado (gzip si el cliente lo acepta).
+    - Versión nueva: se construye, serializa y comprime una sola vez.
+    """
+    firma = hashlib.md5(request.full_path.encode('utf-8')).hexdigest()[:12]
+    etag = f"{scrape_un_gol_live.obtener_version(detector)}-{firma}"
     
-    if resultado['exito']:
-        print(f"✅ Nuevos detectados: {resultado['nuevos_detectados']}")
-        print(f"💾 Total guardados: {resultado['total_guardados']}")
-        
-        # Actualizar resultados finales
-        actualizacion = scrape_un_gol_live.actualizar_resultados_finales()
-        print(f"🔄 Partidos actualizados: {actualizacion.get('actualizados', 0)}")
+    if request.if_none_match.contains_weak(etag):
+        respuesta = Response(status=304)
     else:
-        print(f"❌ Error: {resultado.get('error', 'Desconocido')}")
+        with _respuestas_lock:
+            entrada = _respuestas_cacheadas.get(firma)
+            if entrada and entrada['etag'] == etag:
+                _respuestas_cacheadas.move_to_end(firma)
+            else:
+                entrada = None
+        
+        if entrada is None:
+            cuerpo = json.dumps(construir(), ensure_ascii=False).encode('utf-8')
+            entrada = {
+                'etag': etag,
+                'cuerpo': cuerpo,
+                'gzip': gzip.compress(cuerpo, compresslevel=6) if len(cuerpo) >= MIN_BYTES_GZIP else None
+            }
+            with _respuestas_lock:
+                _respuestas_cacheadas[firma] = entrada
+                _respuestas_cacheadas.move_to_end(firma)
+                while len(_respuestas_cacheadas) > MAX_RESPUESTAS_CACHEADAS:
+                    _respuestas_cacheadas.popitem(last=False)
+        
+        if entrada['gzip'] and 'gzip' in request.accept_encodings:
+            respuesta = Response(entrada['gzip'], mimetype='application/json')
+            respuesta.headers['Content-Encoding'] = 'gzip'
+        else:
+            respuesta = Response(entrada['cuerpo'], mimetype='application/json')
     
-    print(f"{'='*60}\n")
+    respuesta.set_etag(etag, weak=True)
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    respuesta.headers['Vary'] = 'Accept-Encoding'
+    return respuesta
 
-# Programar scraping cada 5 minutos
-scheduler.add_job(
-    func=ejecutar_scraping_un_gol,
-    trigger=IntervalTrigger(minutes=5),
-    id='scraping_un_gol',
-    name='Scraping Detector 1 Gol',
-    replace_existing=True
-)
+@app.before_request
+def iniciar_cronometro():
+    g.inicio_peticion = time.perf_counter()
 
-# Ejecutar scraping inicial al arrancar (compatible con Flask 3.0+)
-print("\n🚀 Ejecutando scraping inicial...")
-ejecutar_scraping_un_gol()
+@app.after_request
+def medir_peticion(respuesta):
+    inicio = g.pop('inicio_peticion', None)
+    if inicio is not None:
+        # Plantilla de la ruta (no la URL) para no crear una serie por parámetro
+        ruta = request.url_rule.rule if request.url_rule else 'sin_ruta'
+        LATENCIA_API.observar(time.perf_counter() - inicio, ruta=ruta, metodo=request.method, estado=respuesta.status_code)
+    return respuesta
 
 @app.route('/')
 def index():
@@ -140,7 +196,7 @@ def index():
             <div class="info">
                 <h3>📋 Características:</h3>
                 <ul>
-                    <li>Detección automática cada 5 minutos</li>
+                    <li>Detección automática con frecuencia adaptada a los partidos en vivo</li>
                     <li>Partidos con 1 gol después del minuto 60</li>
                     <li>Seguimiento de resultados finales</li>
                     <li>Estadísticas de partidos que superaron +1.5 goles</li>
@@ -152,6 +208,53 @@ def index():
     </html>
     '''
 
+def _parametros_listado(paginado=True, detector=almacen_partidos.DETECTOR_PRINCIPAL):
+    """
+    Filtros (desde, hasta, estado, liga, supero_linea) y, si `paginado`, orden, limite
+    y pagina de la query string. Devuelve (parámetros, None) o (None, mensaje de error).
+    supero_1_5 se acepta como alias de supero_linea en los detectores con línea 1.5.
+    """
+    parametros = {
+        'desde': request.args.get('desde') or None,
+        'hasta': request.args.get('hasta') or None,
+        'estado': request.args.get('estado') or None,
+        'liga': request.args.get('liga') or None,
+        'supero_1_5': None
+    }
+    linea = detectores.obtener(detector).linea
+    supero = request.args.get('supero_linea') or None
+    if request.args.get('supero_1_5'):
+        if linea != 1.5:
+            return None, f"Este detector evalúa la línea {linea:g}: usa supero_linea"
+        supero = supero or request.args.get('supero_1_5')
+    if supero not in (None, 'true', 'false'):
+        return None, "supero_linea debe ser 'true' o 'false'"
+    if supero is not None:
+        parametros['supero_1_5'] = supero == 'true'
+    if not paginado:
+        return parametros, None
+    
+    orden = request.args.get('orden') or None
+    limite = request.args.get('limite') or None
+    pagina = request.args.get('pagina') or None
+    try:
+        columnas, _ = almacen_partidos.orden_paginacion(orden)
+        if pagina:
+            almacen_partidos.decodificar_cursor(pagina, columnas)
+    except ValueError as e:
+        return None, str(e)
+    if limite is not None:
+        try:
+            limite = int(limite)
+        except ValueError:
+            return None, 'limite debe ser un entero'
+        if not 1 <= limite <= almacen_partidos.MAX_LIMITE_PAGINA:
+            return None, f"limite debe estar entre 1 y {almacen_partidos.MAX_LIMITE_PAGINA}"
+    elif pagina:
+        limite = almacen_partidos.MAX_LIMITE_PAGINA
+    parametros.update(orden=orden, limite=limite, pagina=pagina)
+    return parametros, None
+
 @app.route('/detector-un-gol')
 def detector_un_gol():
     """Página del detector de 1 gol"""
@@ -159,19 +262,211 @@ def detector_un_gol():
 
 @app.route('/api/detector/un-gol')
 def api_partidos_un_gol():
-    """API que devuelve los partidos detectados"""
-    datos = scrape_un_gol_live.obtener_partidos_detectados()
-    return jsonify(datos)
+    """
+    API que devuelve los partidos detectados.
+    Filtros opcionales: desde, hasta, estado, liga, supero_linea (o supero_1_5); paginación: orden, limite, pagina.
+    """
+    parametros, error = _parametros_listado()
+    if error:
+        return jsonify({'error': error}), 400
+    return respuesta_cacheada(lambda: scrape_un_gol_live.obtener_partidos_detectados(**parametros))
+
+@app.route('/api/detector/cambios')
+def api_cambios():
+    """API de cambios desde un cursor (partidos insertados o actualizados después de él)"""
+    cursor = request.args.get('cursor')
+    try:
+        cursor = int(cursor) if cursor not in (None, '') else None
+    except ValueError:
+        return jsonify({'error': 'cursor debe ser un entero'}), 400
+    
+    parametros, error = _parametros_listado(paginado=False)
+    if error:
+        return jsonify({'error': error}), 400
+    return respuesta_cacheada(lambda: scrape_un_gol_live.obtener_cambios(cursor, **parametros))
+
+@app.route('/api/detector/eventos')
+def api_eventos():
+    """
+    Canal SSE con nuevas detecciones y resultados finales.
+    Eventos: detectado, finalizado, sin_resultado (el partido con su revisión) y reiniciar (recargar todo).
+    Al reconectar, EventSource envía Last-Event-ID y se reenvía lo que falte.
+    """
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+    try:
+        cursor = int(cursor) if cursor not in (None, '') else None
+    except ValueError:
+        return jsonify({'error': 'cursor debe ser un entero'}), 400
+    
+    if not eventos.canal.reservar():
+        # Sin hueco: el cliente sigue con polling de /api/detector/cambios
+        return jsonify({'error': 'demasiados suscriptores'}), 503
+    
+    respuesta = Response(eventos.canal.suscribir(cursor), mimetype='text/event-stream')
+    respuesta.call_on_close(eventos.canal.liberar)
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    respuesta.headers['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+@app.route('/api/detector/un-gol/estadisticas')
+def api_estadisticas_un_gol():
+    """API de estadísticas preagregadas (agrupar=fecha|liga, desde, hasta)"""
+    agrupar = request.args.get('agrupar') or None
+    if agrupar not in (None, 'fecha', 'liga'):
+        return jsonify({'error': "agrupar debe ser 'fecha' o 'liga'"}), 400
+    
+    return respuesta_cacheada(lambda: scrape_un_gol_live.obtener_estadisticas(
+        agrupar=agrupar,
+        desde=request.args.get('desde') or None,
+        hasta=request.args.get('hasta') or None
+    ))
+
+@app.route('/api/detectores')
+def api_detectores():
+    """Detectores activos con su regla y sus estadísticas"""
+    return jsonify({'detectores': scrape_un_gol_live.listar_detectores()})
+
+def _detector_desconocido(detector_id):
+    """Respuesta 404 si `detector_id` no es un detector activo, None si lo es"""
+    if detector_id in detectores.POR_ID:
+        return None
+    return jsonify({'error': f"Detector desconocido: {detector_id}", 'detectores': list(detectores.POR_ID)}), 404
+
+@app.route('/api/detectores/<detector_id>')
+def api_partidos_detector(detector_id):
+    """Partidos detectados por un detector (mismo formato y filtros que /api/detector/un-gol)"""
+    error = _detector_desconocido(detector_id)
+    if error:
+        return error
+    
+    parametros, error = _parametros_listado(detector=detector_id)
+    if error:
+        return jsonify({'error': error}), 400
+    return respuesta_cacheada(lambda: {
+        'detector': detectores.obtener(detector_id).descripcion(),
+        **scrape_un_gol_live.obtener_partidos_detectados(detector=detector_id, **parametros)
+    }, detector_id)
+
+@app.route('/api/detectores/<detector_id>/cambios')
+def api_cambios_detector(detector_id):
+    """Cambios desde un cursor en el almacén de un detector"""
+    error = _detector_desconocido(detector_id)
+    if error:
+        return error
+    
+    cursor = request.args.get('cursor')
+    try:
+        cursor = int(cursor) if cursor not in (None, '') else None
+    except ValueError:
+        return jsonify({'error': 'cursor debe ser un entero'}), 400
+    
+    parametros, error = _parametros_listado(paginado=False, detector=detector_id)
+    if error:
+        return jsonify({'error': error}), 400
+    return respuesta_cacheada(lambda: scrape_un_gol_live.obtener_cambios(
+        cursor, detector=detector_id, **parametros
+    ), detector_id)
+
+@app.route('/api/detectores/<detector_id>/estadisticas')
+def api_estadisticas_detector(detector_id):
+    """Estadísticas preagregadas de un detector (agrupar=fecha|liga, desde, hasta)"""
+    error = _detector_desconocido(detector_id)
+    if error:
+        return error
+    
+    agrupar = request.args.get('agrupar') or None
+    if agrupar not in (None, 'fecha', 'liga'):
+        return jsonify({'error': "agrupar debe ser 'fecha' o 'liga'"}), 400
+    
+    return respuesta_cacheada(lambda: scrape_un_gol_live.obtener_estadisticas(
+        agrupar=agrupar,
+        desde=request.args.get('desde') or None,
+        hasta=request.args.get('hasta') or None,
+        detector=detector_id
+    ), detector_id)
+
+@app.route('/api/detectores/<detector_id>/limpiar', methods=['POST'])
+def api_limpiar_detector(detector_id):
+    """Limpia los partidos detectados por un detector"""
+    error = _detector_desconocido(detector_id)
+    if error:
+        return error
+    return jsonify(scrape_un_gol_live.limpiar_partidos_detectados(detector_id))
+
+def respuesta_exportacion(detector):
+    """
+    Historial en NDJSON o CSV generado por lotes mientras se envía (memoria constante).
+    La cabecera X-Exportacion-Inicio es el `actualizado_desde` de la siguiente exportación incremental.
+    """
+    parametros, error = _parametros_listado(paginado=False, detector=detector)
+    if error:
+        return jsonify({'error': error}), 400
+    formato = request.args.get('formato') or 'ndjson'
+    if formato not in scrape_un_gol_live.FORMATOS_EXPORTACION:
+        return jsonify({'error': f"formato debe ser {' o '.join(scrape_un_gol_live.FORMATOS_EXPORTACION)}"}), 400
+    actualizado_desde = request.args.get('actualizado_desde') or None
+    if actualizado_desde:
+        try:
+            actualizado_desde = scrape_un_gol_live.normalizar_instante(actualizado_desde)
+        except ValueError:
+            return jsonify({'error': 'actualizado_desde debe ser un instante YYYY-MM-DD HH:MM:SS'}), 400
+    
+    # Tomado antes de leer: lo que cambie durante la exportación entra en la siguiente
+    inicio = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    trozos = scrape_un_gol_live.exportar_partidos(
+        formato, actualizado_desde=actualizado_desde, detector=detector, **parametros
+    )
+    tipos = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+    respuesta = Response(stream_with_context(trozos), mimetype=tipos[formato])
+    respuesta.headers['Content-Disposition'] = f"attachment; filename=partidos_{detector}.{formato}"
+    respuesta.headers['X-Exportacion-Inicio'] = inicio
+    respuesta.headers['Cache-Control'] = 'no-store'
+    return respuesta
+
+@app.route('/api/detector/exportar')
+def api_exportar():
+    """Exportación del historial (formato=ndjson|csv, filtros del listado, actualizado_desde)"""
+    return respuesta_exportacion(almacen_partidos.DETECTOR_PRINCIPAL)
+
+@app.route('/api/detectores/<detector_id>/exportar')
+def api_exportar_detector(detector_id):
+    """Exportación del historial de un detector"""
+    error = _detector_desconocido(detector_id)
+    if error:
+        return error
+    return respuesta_exportacion(detector_id)
+
+@app.route('/api/detector/cronologia')
+def api_cronologia():
+    """Observaciones en vivo de un partido detectado (fecha, equipo_casa, equipo_visitante)"""
+    fecha = request.args.get('fecha')
+    equipo_casa = request.args.get('equipo_casa')
+    equipo_visitante = request.args.get('equipo_visitante')
+    if not (fecha and equipo_casa and equipo_visitante):
+        return jsonify({'error': 'fecha, equipo_casa y equipo_visitante son obligatorios'}), 400
+    
+    # Cambia en cada ciclo aunque el almacén no cambie: sin la caché ligada a su versión
+    return jsonify(scrape_un_gol_live.obtener_cronologia(fecha, equipo_casa, equipo_visitante))
+
+@app.route('/api/detector/planificador')
+def api_planificador():
+    """Decisiones del planificador adaptativo (la más reciente primero)"""
+    # Publicadas por el proceso que ejecuta el scraping, sea este worker u otro
+    datos = programador.leer_decisiones()
+    segundos = None
+    if datos['proxima_ejecucion']:
+        proxima = datetime.strptime(datos['proxima_ejecucion'], '%Y-%m-%d %H:%M:%S')
+        # Relativo al reloj del servidor, para que el cliente no dependa del suyo
+        segundos = max(int((proxima - datetime.now()).total_seconds()), 0)
+    return jsonify({**datos, 'segundos_restantes': segundos})
 
 @app.route('/api/detector/actualizar', methods=['POST'])
 def api_actualizar():
     """API para ejecutar scraping manual"""
-    resultado = scrape_un_gol_live.scrape_partidos_un_gol_live()
-    
-    # También actualizar resultados
-    scrape_un_gol_live.actualizar_resultados_finales()
+    # Detección y resultados comparten la misma descarga
+    ciclo = scrape_un_gol_live.ejecutar_ciclo()
     
-    return jsonify(resultado)
+    return jsonify(ciclo['deteccion'])
 
 @app.route('/api/detector/actualizar-resultados', methods=['POST'])
 def api_actualizar_resultados():
@@ -187,13 +482,63 @@ def api_limpiar():
 
 @app.route('/health')
 def health():
-    """Endpoint de salud para Render"""
+    """Endpoint de salud para Render (liveness: el proceso responde, sin tocar red ni disco)"""
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'scheduler_running': scheduler.running
+        'scheduler_running': scheduler.running,
+        'lider_scraping': programador.liderazgo.es_lider,
+        'primatips': cliente_http.obtener_cliente().resumen()
     })
 
+@app.route('/ready')
+def ready():
+    """
+    Readiness: el almacén responde y hay datos que servir, ya sea porque tiene partidos
+    (de este arranque o persistidos de uno anterior) o porque este proceso completó un
+    scraping correcto. 503 mientras no lo esté: un primer ciclo fallido o un
+    planificador.json de otra ejecución no cuentan.
+    """
+    try:
+        almacen = almacen_partidos.obtener_almacen()
+        ultima_actualizacion = almacen.ultima_actualizacion()
+        hay_partidos = almacen.total() > 0
+    except Exception as e:
+        return jsonify({'ready': False, 'motivo': f"Almacén no disponible: {e}"}), 503
+    
+    decisiones = programador.leer_decisiones()
+    listo = hay_partidos or scrape_un_gol_live.ultimo_ciclo_correcto is not None
+    # La hora del último ciclo sale del planificador, no del almacén: un ciclo sin
+    # cambios no escribe en el almacén ni invalida el ETag de la API
+    ultima_comprobacion = decisiones['decisiones'][0]['calculado'] if decisiones['decisiones'] else None
+    estado = {
+        'ready': listo,
+        'ultima_actualizacion': ultima_actualizacion,
+        'ultima_comprobacion': ultima_comprobacion,
+        'proxima_ejecucion': decisiones['proxima_ejecucion']
+    }
+    if not listo:
+        estado['motivo'] = 'Esperando el primer scraping'
+        return jsonify(estado), 503
+    return jsonify(estado)
+
+@app.route('/metrics')
+def metrics():
+    """Métricas de todos los workers en el formato de texto de Prometheus"""
+    # Tamaño de los almacenes leído en el momento: es el mismo para todos los workers
+    for detector in detectores.ACTIVOS:
+        try:
+            almacen = almacen_partidos.obtener_almacen(detector.id)
+            ALMACEN_BYTES.fijar(almacen.tamano_bytes(), detector=detector.id, backend=almacen_partidos.BACKEND)
+            estadisticas = almacen.estadisticas()
+            ALMACEN_PARTIDOS.fijar(estadisticas['en_vivo'], detector=detector.id, estado='DETECTADO')
+            ALMACEN_PARTIDOS.fijar(estadisticas['finalizados'], detector=detector.id, estado='FINALIZADO')
+            ALMACEN_PARTIDOS.fijar(estadisticas['sin_resultado'], detector=detector.id, estado=almacen_partidos.SIN_RESULTADO)
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el almacén de {detector.id} para las métricas: {e}")
+    
+    return Response(metricas.texto_prometheus(), mimetype='text/plain; version=0.0.4')
+
 # Cerrar scheduler limpiamente al terminar
 atexit.register(lambda: scheduler.shutdown())
 
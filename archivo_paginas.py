@@ -0,0 +1,247 @@
+"""
+Archivo de las páginas de Primatips descargadas (opcional, DETECTOR_ARCHIVO=on).
+
+Cada descarga se registra para poder repetir la detección más tarde sin red
+(cambios en el parser, benchmarks con datos reales):
+
+    data/archivo/<día de captura>/
+        indice.jsonl          una línea por descarga: capturado, fecha, hash, bytes
+        <sha1>.html.zst|gz    contenido, una sola vez por día aunque se descargue N veces
+
+- Deduplicación por hash SHA-1 del contenido dentro de cada partición diaria: una
+  página que no cambia entre ciclos solo añade una línea al índice.
+- Compresión zstd si el paquete `zstandard` está instalado, gzip si no
+  (DETECTOR_ARCHIVO_COMPRESION fuerza una de las dos).
+- Retención: las particiones con más de DETECTOR_ARCHIVO_DIAS días se borran
+  (como mucho una vez al día, después de archivar).
+
+Uso como script:
+    python archivo_paginas.py resumen
+    python archivo_paginas.py purgar [--dias 30]
+
+Para repetir el archivo sobre un almacén temporal: benchmarks/bench_replay.py
+"""
+import os
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta
+import almacen_partidos
+from bloqueo import BloqueoArchivo
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ACTIVADO = os.environ.get('DETECTOR_ARCHIVO', 'off') == 'on'
+DIRECTORIO = os.path.join(almacen_partidos.DATA_DIR, 'archivo')
+DIAS_RETENCION = int(os.environ.get('DETECTOR_ARCHIVO_DIAS', 30))
+COMPRESION = os.environ.get('DETECTOR_ARCHIVO_COMPRESION') or ('zstd' if zstandard else 'gzip')
+
+ARCHIVO_INDICE = 'indice.jsonl'
+EXTENSIONES = {'zstd': '.html.zst', 'gzip': '.html.gz'}
+
+def _comprimir(contenido, compresion):
+    if compresion == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(contenido)
+    return gzip.compress(contenido, compresslevel=6)
+
+def _descomprimir(ruta):
+    with open(ruta, 'rb') as f:
+        datos = f.read()
+    if ruta.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"{ruta} está comprimido con zstd: instala el paquete zstandard")
+        return zstandard.ZstdDecompressor().decompress(datos)
+    return gzip.decompress(datos)
+
+class ArchivoPaginas:
+    """Páginas descargadas particionadas por día de captura"""
+
+    def __init__(self, directorio=DIRECTORIO, compresion=COMPRESION, dias_retencion=DIAS_RETENCION):
+        if compresion not in EXTENSIONES:
+            raise ValueError(f"Compresión desconocida: {compresion} (opciones: {', '.join(EXTENSIONES)})")
+        if compresion == 'zstd' and zstandard is None:
+            raise ValueError("La compresión zstd necesita el paquete zstandard")
+        self.directorio = directorio
+        self.compresion = compresion
+        self.dias_retencion = dias_retencion
+        self._lock = threading.Lock()
+        # Descargas de varias fechas en paralelo y otros workers escribiendo a la vez
+        self._bloqueo = BloqueoArchivo(os.path.join(directorio, 'archivo.lock'))
+        self._ultima_purga = None
+
+    def _particion(self, dia):
+        return os.path.join(self.directorio, dia)
+
+    def _ruta_contenido(self, dia, huella):
+        # Una página pudo archivarse con otra compresión antes de cambiar la configuración
+        for extension in EXTENSIONES.values():
+            ruta = os.path.join(self._particion(dia), huella + extension)
+            if os.path.exists(ruta):
+                return ruta
+        return None
+
+    def guardar(self, fecha, contenido, estado=200):
+        """
+        Registra una descarga de la página de `fecha`. El contenido solo se escribe
+        si no estaba ya en la partición del día. Devuelve True si era nuevo.
+        """
+        capturado = datetime.now()
+        dia = capturado.strftime('%Y-%m-%d')
+        huella = hashlib.sha1(contenido).hexdigest()
+        particion = self._particion(dia)
+
+        with self._lock, self._bloqueo:
+            os.makedirs(particion, exist_ok=True)
+            nuevo = self._ruta_contenido(dia, huella) is None
+            if nuevo:
+                ruta = os.path.join(particion, huella + EXTENSIONES[self.compresion])
+                temporal = f"{ruta}.tmp"
+                with open(temporal, 'wb') as f:
+                    f.write(_comprimir(contenido, self.compresion))
+                os.replace(temporal, ruta)
+
+            registro = {
+                'capturado': capturado.isoformat(timespec='seconds'),
+                'fecha': fecha,
+                'hash': huella,
+                'estado': estado,
+                'bytes': len(contenido)
+            }
+            with open(os.path.join(particion, ARCHIVO_INDICE), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro) + '\n')
+
+        if self._ultima_purga != dia:
+            self._ultima_purga = dia
+            self.purgar()
+        return nuevo
+
+    def dias(self, desde=None, hasta=None):
+        """Particiones (días de captura YYYY-MM-DD) en orden, opcionalmente en un rango"""
+        try:
+            nombres = os.listdir(self.directorio)
+        except FileNotFoundError:
+            return []
+        dias = []
+        for nombre in sorted(nombres):
+            if not os.path.isfile(os.path.join(self.directorio, nombre, ARCHIVO_INDICE)):
+                continue
+            if (desde and nombre < desde) or (hasta and nombre > hasta):
+                continue
+            dias.append(nombre)
+        return dias
+
+    def registros(self, dia):
+        """Descargas registradas en la partición `dia`, en orden de captura"""
+        registros = []
+        with open(os.path.join(self._particion(dia), ARCHIVO_INDICE), 'r', encoding='utf-8') as f:
+            for linea in f:
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    registros.append(json.loads(linea))
+                except json.JSONDecodeError:
+                    # Línea a medio escribir si el proceso murió
+                    continue
+        return registros
+
+    def leer(self, dia, huella):
+        ruta = self._ruta_contenido(dia, huella)
+        if ruta is None:
+            raise FileNotFoundError(f"No está archivada la página {huella} del {dia}")
+        return _descomprimir(ruta)
+
+    def capturas(self, desde=None, hasta=None):
+        """
+        Genera (registro, contenido) de cada descarga en orden de captura.
+        Cada contenido se descomprime una sola vez por racha de descargas iguales.
+        """
+        for dia in self.dias(desde, hasta):
+            anterior = None
+            contenido = None
+            for registro in self.registros(dia):
+                if registro['hash'] != anterior:
+                    try:
+                        contenido = self.leer(dia, registro['hash'])
+                    except (OSError, RuntimeError) as e:
+                        print(f"⚠️ Captura omitida ({dia} {registro['hash'][:8]}): {e}")
+                        anterior = None
+                        continue
+                    anterior = registro['hash']
+                yield registro, contenido
+
+    def purgar(self, dias_retencion=None):
+        """Borra las particiones con más de `dias_retencion` días. Devuelve los días borrados."""
+        dias_retencion = self.dias_retencion if dias_retencion is None else dias_retencion
+        limite = (datetime.now() - timedelta(days=dias_retencion)).strftime('%Y-%m-%d')
+        borrados = []
+        with self._lock, self._bloqueo:
+            for dia in self.dias(hasta=limite):
+                if dia < limite:
+                    shutil.rmtree(self._particion(dia), ignore_errors=True)
+                    borrados.append(dia)
+        if borrados:
+            print(f"🧹 Archivo: {len(borrados)} días anteriores a {limite} eliminados")
+        return borrados
+
+    def resumen(self):
+        """Descargas, páginas distintas y bytes (originales y en disco) por día"""
+        dias = []
+        for dia in self.dias():
+            registros = self.registros(dia)
+            particion = self._particion(dia)
+            en_disco = sum(
+                os.path.getsize(os.path.join(particion, nombre))
+                for nombre in os.listdir(particion)
+                if nombre.endswith(tuple(EXTENSIONES.values()))
+            )
+            unicos = {r['hash']: r['bytes'] for r in registros}
+            dias.append({
+                'dia': dia,
+                'descargas': len(registros),
+                'paginas_distintas': len(unicos),
+                'bytes_descargados': sum(r['bytes'] for r in registros),
+                'bytes_distintos': sum(unicos.values()),
+                'bytes_en_disco': en_disco
+            })
+        return dias
+
+_archivo = None
+_archivo_lock = threading.Lock()
+
+def obtener_archivo():
+    """Archivo compartido del proceso, o None si DETECTOR_ARCHIVO no está activado"""
+    global _archivo
+    if not ACTIVADO:
+        return None
+    with _archivo_lock:
+        if _archivo is None:
+            _archivo = ArchivoPaginas()
+        return _archivo
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Archivo de páginas de Primatips')
+    parser.add_argument('--directorio', default=DIRECTORIO)
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    subparsers.add_parser('resumen', help='Descargas, deduplicación y compresión por día')
+    parser_purgar = subparsers.add_parser('purgar', help='Borra los días fuera de la retención')
+    parser_purgar.add_argument('--dias', type=int, default=DIAS_RETENCION)
+    args = parser.parse_args()
+
+    archivo = ArchivoPaginas(args.directorio)
+    if args.comando == 'resumen':
+        dias = archivo.resumen()
+        if not dias:
+            print(f"📭 No hay páginas archivadas en {args.directorio}")
+        for d in dias:
+            ratio = d['bytes_descargados'] / d['bytes_en_disco'] if d['bytes_en_disco'] else 0
+            print(f"📦 {d['dia']}: {d['descargas']} descargas, {d['paginas_distintas']} páginas distintas, "
+                  f"{d['bytes_descargados'] / 1024:.0f} KB descargados → {d['bytes_en_disco'] / 1024:.0f} KB en disco ({ratio:.0f}x)")
+    else:
+        archivo.purgar(args.dias)
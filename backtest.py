@@ -0,0 +1,399 @@
+"""
+Backtest del criterio de detección sobre el historial y el archivo de páginas.
+
+Carga en arrays columnares de NumPy:
+- los partidos del almacén (una observación por partido: minuto y marcador al
+  detectarlo, y su resultado final),
+- las observaciones minuto a minuto de todos los partidos de las páginas archivadas
+  (archivo_paginas.py), con su resultado final cuando la página lo muestra.
+
+y evalúa de una vez todas las combinaciones de variantes de la regla:
+- minuto mínimo (60 en la regla actual) y goles totales en algún ciclo a partir de
+  ese minuto (1 en la regla actual),
+- bandas de cuotas y probabilidades (cuota_*, prob_*),
+- liga y tip (opcional, una variante por valor),
+
+calculando para cada una cuántos partidos terminados cumplen la regla y en
+cuántos se superó la línea de goles (+1.5 por defecto). El recuento de cada
+(minuto, goles) es un único np.bincount sobre todas las celdas de la rejilla,
+y los comodines ('*', sin filtrar por esa columna) se obtienen sumando ejes.
+
+El parseo del archivo se hace una vez por día: las observaciones se guardan en
+data/archivo/<día>/observaciones.npz y solo se recalculan si el día recibe descargas nuevas.
+
+Con solo el historial (sin archivo), un partido cuenta para un minuto mínimo m si
+se detectó en el minuto m o después: es una aproximación, porque no se sabe el
+marcador en los minutos en los que no se observó.
+
+NumPy es una dependencia opcional (pip install -r requirements-analisis.txt): la app
+web no la necesita.
+
+Uso:
+    python backtest.py
+    python backtest.py --minutos 55 60 65 70 75 80 --goles 0 1 --cuota-casa 1 1.5 2 3 10 --por-liga --top 30
+    python backtest.py --prob-casa 0 30 45 60 100 --min-partidos 50 --csv variantes.csv
+"""
+import os
+import csv
+import sys
+import time
+import argparse
+import contextlib
+import almacen_partidos
+import archivo_paginas
+import extraccion
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ARCHIVO_CACHE = 'observaciones.npz'
+
+# Columnas numéricas que admiten bandas, en el orden de la matriz `valores`
+COLUMNAS_BANDAS = ['cuota_casa', 'cuota_empate', 'cuota_visitante', 'prob_casa', 'prob_empate', 'prob_visitante']
+
+COMODIN = '*'
+
+def _numero(texto):
+    """'1.85', '1,85' o '48%' como float; NaN si no es un número"""
+    try:
+        return float(str(texto).replace(',', '.').rstrip('%'))
+    except (TypeError, ValueError):
+        return float('nan')
+
+class _Tabla:
+    """Acumula partidos y observaciones en listas antes de pasarlas a arrays"""
+
+    def __init__(self):
+        self.ids = {}
+        self.claves = []
+        self.ligas = []
+        self.tips = []
+        self.valores = []
+        self.finales = []
+        self.obs_partido = []
+        self.obs_minuto = []
+        self.obs_goles = []
+
+    def partido(self, clave, liga, tip, valores):
+        # Atributos de la primera vez que se ve el partido (cuotas previas al partido)
+        indice = self.ids.get(clave)
+        if indice is None:
+            indice = self.ids[clave] = len(self.claves)
+            self.claves.append(clave)
+            self.ligas.append(liga or '')
+            self.tips.append(tip or '')
+            self.valores.append(valores)
+            self.finales.append(-1)
+        return indice
+
+    def observar(self, indice, minuto, goles):
+        self.obs_partido.append(indice)
+        self.obs_minuto.append(minuto)
+        self.obs_goles.append(goles)
+
+    def a_arrays(self, **extra):
+        return {
+            'claves': np.array(self.claves, dtype=str),
+            'ligas': np.array(self.ligas, dtype=str),
+            'tips': np.array(self.tips, dtype=str),
+            'valores': np.array(self.valores, dtype=np.float64).reshape(-1, len(COLUMNAS_BANDAS)),
+            'finales': np.array(self.finales, dtype=np.int16),
+            'obs_partido': np.array(self.obs_partido, dtype=np.int32),
+            'obs_minuto': np.array(self.obs_minuto, dtype=np.int16),
+            'obs_goles': np.array(self.obs_goles, dtype=np.int16),
+            **extra
+        }
+
+def observaciones_dia(archivo, dia, motor=None):
+    """
+    Observaciones de todos los partidos en vivo de las páginas archivadas el día `dia`.
+    Se cachean en la partición y se recalculan si el día tiene descargas nuevas.
+    """
+    registros = archivo.registros(dia)
+    cache = os.path.join(archivo.directorio, dia, ARCHIVO_CACHE)
+    if os.path.exists(cache):
+        with np.load(cache, allow_pickle=False) as datos:
+            if int(datos['registros']) == len(registros):
+                return {nombre: datos[nombre] for nombre in datos.files}
+
+    tabla = _Tabla()
+    vistas = set()
+    for registro in registros:
+        # Una página ya vista no aporta observaciones nuevas
+        if registro['hash'] in vistas:
+            continue
+        vistas.add(registro['hash'])
+        try:
+            contenido = archivo.leer(dia, registro['hash'])
+        except (OSError, RuntimeError) as e:
+            print(f"⚠️ Captura omitida ({dia} {registro['hash'][:8]}): {e}")
+            continue
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            filas = extraccion.extraer_filas(contenido, motor)
+
+        for fila in filas:
+            clave = almacen_partidos.clave_partido(registro['fecha'], fila.equipo_casa, fila.equipo_visitante)
+            indice = tabla.partido(
+                '|'.join(clave), fila.liga, fila.tip,
+                [_numero(getattr(fila, columna)) for columna in COLUMNAS_BANDAS]
+            )
+            if fila.en_vivo and fila.minuto and fila.goles_casa is not None:
+                tabla.observar(indice, fila.minuto, fila.goles_casa + fila.goles_visitante)
+            if fila.finalizado:
+                tabla.finales[indice] = fila.goles_finales_casa + fila.goles_finales_visitante
+
+    datos = tabla.a_arrays(registros=np.array(len(registros)))
+    try:
+        temporal = f"{cache}.tmp.npz"
+        np.savez_compressed(temporal, **datos)
+        os.replace(temporal, cache)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar la caché de {dia}: {e}")
+    return datos
+
+def observaciones_historial(partidos):
+    """Una observación por partido guardado: el minuto y marcador con que se detectó"""
+    tabla = _Tabla()
+    for partido in partidos:
+        clave = almacen_partidos.clave_de(partido)
+        indice = tabla.partido(
+            '|'.join(clave), partido.get('liga'), partido.get('tip'),
+            [_numero(partido.get(columna)) for columna in COLUMNAS_BANDAS]
+        )
+        if partido.get('minuto') and partido.get('goles_casa') is not None:
+            tabla.observar(indice, partido['minuto'], partido['goles_casa'] + (partido.get('goles_visitante') or 0))
+        if partido.get('estado') == 'FINALIZADO' and partido.get('goles_finales_casa') is not None:
+            tabla.finales[indice] = partido['goles_finales_casa'] + partido['goles_finales_visitante']
+    return tabla.a_arrays()
+
+def combinar(fuentes):
+    """
+    Une varias fuentes en un único conjunto de partidos (por clave fecha|casa|visitante).
+    Los atributos salen de la primera fuente que tiene el partido; el resultado
+    final, de cualquiera que lo conozca.
+    """
+    claves = np.concatenate([f['claves'] for f in fuentes])
+    unicas, primeros, inversa = np.unique(claves, return_index=True, return_inverse=True)
+
+    desplazamientos = np.cumsum([0] + [len(f['claves']) for f in fuentes])[:-1]
+    obs_partido = np.concatenate([inversa[d + f['obs_partido']] for d, f in zip(desplazamientos, fuentes)])
+
+    finales = np.full(len(unicas), -1, dtype=np.int16)
+    np.maximum.at(finales, inversa, np.concatenate([f['finales'] for f in fuentes]))
+
+    return {
+        'claves': unicas,
+        'ligas': np.concatenate([f['ligas'] for f in fuentes])[primeros],
+        'tips': np.concatenate([f['tips'] for f in fuentes])[primeros],
+        'valores': np.concatenate([f['valores'] for f in fuentes])[primeros],
+        'finales': finales,
+        'obs_partido': obs_partido,
+        'obs_minuto': np.concatenate([f['obs_minuto'] for f in fuentes]),
+        'obs_goles': np.concatenate([f['obs_goles'] for f in fuentes])
+    }
+
+def cargar_datos(desde=None, hasta=None, usar_historial=True, directorio_archivo=None, motor=None):
+    """Historial del almacén y observaciones del archivo de páginas, combinados"""
+    fuentes = []
+    if usar_historial:
+        partidos = almacen_partidos.obtener_almacen().listar(desde=desde, hasta=hasta)
+        fuentes.append(observaciones_historial(partidos))
+
+    if directorio_archivo:
+        archivo = archivo_paginas.ArchivoPaginas(directorio_archivo)
+        for dia in archivo.dias(desde, hasta):
+            fuentes.append(observaciones_dia(archivo, dia, motor))
+
+    if not fuentes:
+        return None
+    return combinar(fuentes)
+
+def _dimension_bandas(datos, columna, cortes):
+    """Índice de banda de cada partido; los que quedan fuera van a un cubo extra"""
+    valores = datos['valores'][:, COLUMNAS_BANDAS.index(columna)]
+    cortes = np.asarray(sorted(cortes), dtype=np.float64)
+    indice = np.digitize(valores, cortes) - 1
+    # El último corte es inclusivo: prob 100 entra en la banda 70-100
+    indice[valores == cortes[-1]] = len(cortes) - 2
+    bandas = len(cortes) - 1
+    indice[(indice < 0) | (indice >= bandas) | np.isnan(valores)] = bandas
+    etiquetas = [f"{a:g}-{b:g}" for a, b in zip(cortes[:-1], cortes[1:])]
+    return {'nombre': columna, 'etiquetas': etiquetas, 'indice': indice, 'fuera': True}
+
+def _dimension_categorias(datos, nombre, columna):
+    etiquetas, indice = np.unique(datos[columna], return_inverse=True)
+    return {'nombre': nombre, 'etiquetas': list(etiquetas), 'indice': indice, 'fuera': False}
+
+def evaluar(datos, minutos=(60,), goles=(1,), bandas=None, por_liga=False, por_tip=False, linea=1.5):
+    """
+    Recuentos de todas las variantes de la regla.
+    Devuelve {'dimensiones', 'partidos', 'aciertos'}: arrays con forma
+    (minutos, goles, *dimensiones), donde el último índice de cada dimensión es
+    el comodín ('*') y, en las bandas, el penúltimo los partidos fuera de las bandas.
+    """
+    dimensiones = [_dimension_bandas(datos, columna, cortes) for columna, cortes in (bandas or {}).items()]
+    if por_liga:
+        dimensiones.append(_dimension_categorias(datos, 'liga', 'ligas'))
+    if por_tip:
+        dimensiones.append(_dimension_categorias(datos, 'tip', 'tips'))
+
+    forma = tuple(len(d['etiquetas']) + int(d['fuera']) for d in dimensiones)
+    celdas = int(np.prod(forma)) if forma else 1
+
+    finales = datos['finales']
+    terminado = finales >= 0
+    acierto = (finales > linea).astype(np.float64)
+
+    obs_partido = datos['obs_partido']
+    obs_minuto = datos['obs_minuto']
+    obs_goles = datos['obs_goles']
+
+    partidos = np.zeros((len(minutos), len(goles)) + forma, dtype=np.int64)
+    aciertos = np.zeros((len(minutos), len(goles)) + forma, dtype=np.int64)
+
+    for i, minuto in enumerate(minutos):
+        en_ventana = obs_minuto >= minuto
+        for j, g in enumerate(goles):
+            # Como el detector: algún ciclo a partir del minuto mínimo con exactamente g goles
+            elegidos = np.unique(obs_partido[en_ventana & (obs_goles == g)])
+            elegidos = elegidos[terminado[elegidos]]
+            if dimensiones:
+                celda = np.ravel_multi_index([d['indice'][elegidos] for d in dimensiones], forma)
+            else:
+                celda = np.zeros(len(elegidos), dtype=np.int64)
+            partidos[i, j] = np.bincount(celda, minlength=celdas).reshape(forma)
+            aciertos[i, j] = np.bincount(celda, weights=acierto[elegidos], minlength=celdas).reshape(forma)
+
+    # Comodines: la suma de cada eje (incluidos los partidos fuera de las bandas)
+    for eje in range(2, 2 + len(dimensiones)):
+        partidos = np.concatenate([partidos, partidos.sum(axis=eje, keepdims=True)], axis=eje)
+        aciertos = np.concatenate([aciertos, aciertos.sum(axis=eje, keepdims=True)], axis=eje)
+
+    return {
+        'minutos': list(minutos),
+        'goles': list(goles),
+        'dimensiones': dimensiones,
+        'partidos': partidos,
+        'aciertos': aciertos
+    }
+
+def variantes(resultado, min_partidos=1):
+    """
+    Índices planos de las variantes válidas (sin el cubo 'fuera de bandas' y con
+    al menos `min_partidos`), ordenadas por tasa de acierto y tamaño de muestra.
+    """
+    partidos = resultado['partidos']
+    valida = partidos >= max(min_partidos, 1)
+    for eje, dimension in enumerate(resultado['dimensiones'], start=2):
+        if dimension['fuera']:
+            fuera = [slice(None)] * partidos.ndim
+            fuera[eje] = len(dimension['etiquetas'])
+            valida[tuple(fuera)] = False
+
+    indices = np.flatnonzero(valida)
+    n = partidos.ravel()[indices]
+    tasa = resultado['aciertos'].ravel()[indices] / n
+    orden = np.lexsort((-n, -tasa))
+    return indices[orden]
+
+def describir(resultado, indice_plano):
+    """Fila legible de una variante a partir de su índice plano"""
+    posicion = np.unravel_index(indice_plano, resultado['partidos'].shape)
+    fila = {'minuto_min': resultado['minutos'][posicion[0]], 'goles': resultado['goles'][posicion[1]]}
+    for dimension, indice in zip(resultado['dimensiones'], posicion[2:]):
+        etiquetas = dimension['etiquetas']
+        fila[dimension['nombre']] = etiquetas[indice] if indice < len(etiquetas) else COMODIN
+    n = int(resultado['partidos'][posicion])
+    aciertos = int(resultado['aciertos'][posicion])
+    fila.update({'partidos': n, 'aciertos': aciertos, 'tasa': round(aciertos / n * 100, 1) if n else None})
+    return fila
+
+def regla_actual(resultado):
+    """Variante con minuto 60, 1 gol y sin filtros, si está en la rejilla"""
+    if 60 not in resultado['minutos'] or 1 not in resultado['goles']:
+        return None
+    posicion = (resultado['minutos'].index(60), resultado['goles'].index(1))
+    posicion += tuple(resultado['partidos'].shape[2:][k] - 1 for k in range(len(resultado['dimensiones'])))
+    return describir(resultado, np.ravel_multi_index(posicion, resultado['partidos'].shape))
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest de variantes de la regla de detección')
+    parser.add_argument('--minutos', type=int, nargs='+', default=[55, 60, 65, 70, 75, 80])
+    parser.add_argument('--goles', type=int, nargs='+', default=[1], help='Goles totales a partir del minuto mínimo')
+    for columna in COLUMNAS_BANDAS:
+        parser.add_argument(f"--{columna.replace('_', '-')}", type=float, nargs='+', metavar='CORTE',
+                            help=f"Cortes de las bandas de {columna} (p. ej. 1 1.5 2 3 10)")
+    parser.add_argument('--por-liga', action='store_true', help='Una variante por liga')
+    parser.add_argument('--por-tip', action='store_true', help='Una variante por tip')
+    parser.add_argument('--linea', type=float, default=1.5, help='Acierto: goles finales por encima de esta línea')
+    parser.add_argument('--desde', help='Primera fecha YYYY-MM-DD')
+    parser.add_argument('--hasta', help='Última fecha YYYY-MM-DD')
+    parser.add_argument('--archivo', default=archivo_paginas.DIRECTORIO, help='Directorio del archivo de páginas')
+    parser.add_argument('--sin-archivo', action='store_true', help='Solo el historial del almacén')
+    parser.add_argument('--sin-historial', action='store_true', help='Solo el archivo de páginas')
+    parser.add_argument('--motor', help='Motor de extracción para parsear el archivo')
+    parser.add_argument('--min-partidos', type=int, default=20, help='Muestra mínima para listar una variante')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--csv', help='Guardar todas las variantes válidas en un CSV')
+    args = parser.parse_args()
+
+    if np is None:
+        print("❌ El backtest necesita NumPy: pip install -r requirements-analisis.txt")
+        sys.exit(1)
+
+    inicio = time.perf_counter()
+    datos = cargar_datos(
+        args.desde, args.hasta,
+        usar_historial=not args.sin_historial,
+        directorio_archivo=None if args.sin_archivo else args.archivo,
+        motor=args.motor
+    )
+    if datos is None or not len(datos['claves']):
+        print("📭 No hay partidos para el backtest")
+        sys.exit(1)
+    carga = time.perf_counter() - inicio
+
+    bandas = {}
+    for columna in COLUMNAS_BANDAS:
+        cortes = getattr(args, columna)
+        if cortes:
+            if len(cortes) < 2:
+                parser.error(f"--{columna.replace('_', '-')} necesita al menos dos cortes")
+            bandas[columna] = cortes
+
+    inicio = time.perf_counter()
+    resultado = evaluar(datos, args.minutos, args.goles, bandas, args.por_liga, args.por_tip, args.linea)
+    ordenadas = variantes(resultado, args.min_partidos)
+    evaluacion = time.perf_counter() - inicio
+
+    terminados = int((datos['finales'] >= 0).sum())
+    print(f"📦 {len(datos['claves'])} partidos ({terminados} terminados), {len(datos['obs_minuto'])} observaciones "
+          f"cargados en {carga:.2f}s")
+    print(f"⚡ {resultado['partidos'].size} variantes evaluadas en {evaluacion * 1000:.0f} ms "
+          f"({len(ordenadas)} con al menos {args.min_partidos} partidos)")
+
+    actual = regla_actual(resultado)
+    if actual:
+        print(f"🎯 Regla actual (minuto 60+, 1 gol): {actual['aciertos']}/{actual['partidos']} "
+              f"superaron +{args.linea:g} ({actual['tasa']}%)")
+
+    columnas = ['minuto_min', 'goles'] + [d['nombre'] for d in resultado['dimensiones']] + ['partidos', 'aciertos', 'tasa']
+    if len(ordenadas):
+        print()
+        print('  '.join(f"{c:>14}" for c in columnas))
+        for indice in ordenadas[:args.top]:
+            fila = describir(resultado, indice)
+            print('  '.join(f"{str(fila[c])[:14]:>14}" for c in columnas))
+
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            escritor = csv.DictWriter(f, fieldnames=columnas)
+            escritor.writeheader()
+            for indice in ordenadas:
+                escritor.writerow(describir(resultado, indice))
+        print(f"\n💾 {len(ordenadas)} variantes guardadas en {args.csv}")
+
+if __name__ == '__main__':
+    main()
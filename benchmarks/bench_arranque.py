@@ -0,0 +1,115 @@
+"""
+Benchmark del arranque de la app.
+
+Importa app.py en un proceso nuevo (como un worker de gunicorn) con un
+directorio de datos temporal y mide:
+- importación: hasta que el módulo está cargado y el scheduler programado
+- /health: primera respuesta de liveness
+- /ready: hasta que la app tiene datos que servir (almacén con datos persistidos
+  o primer scraping terminado, aunque haya fallado)
+
+Por defecto Primatips apunta a un puerto local cerrado para simular que no hay
+red: la importación no debe depender de ella. Con --con-datos el almacén se
+siembra antes de arrancar, como en un reinicio con el disco ya poblado.
+
+Uso:
+    python benchmarks/bench_arranque.py
+    python benchmarks/bench_arranque.py --con-datos --repeticiones 10
+    python benchmarks/bench_arranque.py --url 'https://es.primatips.com/tips/{fecha}'
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Se ejecuta en el proceso hijo; imprime los tiempos en JSON
+CODIGO_ARRANQUE = """
+import os, sys, json, time
+inicio = time.perf_counter()
+import app
+importacion = time.perf_counter() - inicio
+
+cliente = app.app.test_client()
+respuesta = cliente.get('/health')
+health = time.perf_counter() - inicio
+estado_health = respuesta.status_code
+
+ready = None
+limite = inicio + float(sys.argv[1])
+while time.perf_counter() < limite:
+    if cliente.get('/ready').status_code == 200:
+        ready = time.perf_counter() - inicio
+        break
+    time.sleep(0.02)
+
+print(json.dumps({'importacion': importacion, 'health': health,
+                  'estado_health': estado_health, 'ready': ready}))
+sys.stdout.flush()
+# Sin esperar al scraping en curso (atexit haría shutdown del scheduler)
+os._exit(0)
+"""
+
+CODIGO_SIEMBRA = """
+import almacen_partidos
+almacen_partidos.obtener_almacen().guardar_nuevos([{
+    'fecha': '2026-01-13', 'equipo_casa': 'Casa', 'equipo_visitante': 'Fuera',
+    'estado': 'DETECTADO', 'minuto_deteccion': 65, 'supero_1_5': None
+}])
+"""
+
+def ejecutar(codigo, entorno, *argumentos):
+    salida = subprocess.run([sys.executable, '-c', codigo, *argumentos], cwd=RAIZ, env=entorno,
+                            capture_output=True, text=True, timeout=120)
+    if salida.returncode != 0:
+        raise RuntimeError(salida.stderr.strip().splitlines()[-1] if salida.stderr.strip() else 'proceso fallido')
+    return salida.stdout
+
+def arrancar(url, con_datos, espera_ready):
+    with tempfile.TemporaryDirectory() as directorio:
+        entorno = dict(os.environ, DETECTOR_DATA_DIR=directorio, DETECTOR_URL_PRIMATIPS=url,
+                       DETECTOR_SCHEDULER='auto', PYTHONDONTWRITEBYTECODE='1')
+        if con_datos:
+            ejecutar(CODIGO_SIEMBRA, entorno)
+        salida = ejecutar(CODIGO_ARRANQUE, entorno, str(espera_ready))
+        # La última línea es el JSON; el resto son los prints del arranque
+        return json.loads(salida.strip().splitlines()[-1])
+
+def ms(valores):
+    valores = [v for v in valores if v is not None]
+    if not valores:
+        return '   -   '
+    return f"{statistics.median(valores) * 1000:>7.0f}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del arranque de la app')
+    parser.add_argument('--url', default='http://127.0.0.1:9/tips/{fecha}',
+                        help='Plantilla de URL de Primatips (por defecto, un puerto cerrado: sin red)')
+    parser.add_argument('--con-datos', action='store_true', help='Sembrar el almacén antes de arrancar')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--espera-ready', type=float, default=60, help='Segundos máximos esperando /ready')
+    args = parser.parse_args()
+
+    resultados = [arrancar(args.url, args.con_datos, args.espera_ready) for _ in range(args.repeticiones)]
+
+    print(f"Arranques: {len(resultados)} ({'con' if args.con_datos else 'sin'} datos persistidos, Primatips: {args.url})")
+    print(f"{'medida':<14} {'mediana (ms)':>12}")
+    print(f"{'importación':<14} {ms([r['importacion'] for r in resultados]):>12}")
+    print(f"{'/health':<14} {ms([r['health'] for r in resultados]):>12}")
+    print(f"{'/ready':<14} {ms([r['ready'] for r in resultados]):>12}")
+
+    if any(r['estado_health'] != 200 for r in resultados):
+        print("❌ /health no respondió 200")
+        sys.exit(1)
+    sin_ready = sum(1 for r in resultados if r['ready'] is None)
+    if sin_ready:
+        print(f"❌ {sin_ready} arranques sin /ready en {args.espera_ready:.0f}s")
+        sys.exit(1)
+    print("✅ La app responde sin esperar al scraping inicial")
+
+if __name__ == '__main__':
+    main()
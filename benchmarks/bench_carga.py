@@ -0,0 +1,484 @@
+"""
+Prueba de carga y de regresión del ciclo completo de scraping y de la API.
+
+Levanta un Primatips local (servidor HTTP en 127.0.0.1 que sirve /tips/{fecha}
+con la jornada sintética de pagina_sintetica.py; la página de hoy avanza un
+ciclo en cada POST /avanzar y responde 304 a If-None-Match) y, para cada tamaño
+de historial, un proceso nuevo con un directorio de datos temporal que:
+
+- arranca con el almacén sembrado con N partidos finalizados de días anteriores
+  (sembrados en otro proceso, como un worker que se reinicia con el disco poblado)
+- sirve app.py con el servidor threaded de Werkzeug (DETECTOR_SCHEDULER=off)
+- ejecuta --ciclos veces programador.ejecutar_scraping_un_gol() contra el
+  Primatips local: descarga, detección, resultados finales, cronología y planificador
+- mientras tanto, --pollers hilos consultan la API como el panel: listado con
+  ETag, cambios desde su cursor, estadísticas, planificador y listados filtrados
+
+Informe por historial: tiempo de ciclo (mediana y máximo), pico de RSS del
+proceso, latencia p50/p99 de la API (total y por ruta), peticiones/s y
+crecimiento del almacén (bytes por partido sembrado y KB añadidos por la jornada).
+
+--guardar escribe el informe en JSON; --referencia lo compara con uno anterior y
+termina con código 1 si alguna medida empeora más de --tolerancia (y más del
+margen absoluto de MEDIDAS, para no saltar por ruido), así que sirve de
+comprobación antes de desplegar.
+
+Uso:
+    python benchmarks/bench_carga.py
+    python benchmarks/bench_carga.py --historiales 0 10000 100000 --partidos 600 --en-vivo 120 --pollers 16
+    python benchmarks/bench_carga.py --almacen jsonl --guardar referencia.json
+    python benchmarks/bench_carga.py --referencia referencia.json --tolerancia 0.25
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+import contextlib
+from datetime import date, datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from pagina_sintetica import LIGAS, simular_jornada, envolver_filas
+
+# Medida: margen absoluto por debajo del cual una diferencia se considera ruido
+MEDIDAS = {
+    'ciclo_p50_ms': 5,
+    'ciclo_max_ms': 20,
+    'rss_pico_mb': 5,
+    'api_p50_ms': 2,
+    'api_p99_ms': 10,
+    'bytes_por_partido': 16,
+    'crecimiento_kb': 16
+}
+
+# Orden de las consultas de cada poller (como el panel: sobre todo cambios)
+CONSULTAS = ['cambios', 'listado', 'cambios', 'estadisticas', 'filtrado', 'cambios', 'planificador']
+
+# Partidos históricos sembrados por día
+PARTIDOS_POR_DIA = 40
+LOTE_SIEMBRA = 1000
+
+class PrimatipsLocal:
+    """Primatips de prueba: hoy, la jornada sintética; cualquier otra fecha, una página vacía"""
+
+    def __init__(self, n_partidos, en_vivo, n_ciclos):
+        self.n_partidos = n_partidos
+        self.en_vivo = en_vivo
+        self.n_ciclos = n_ciclos
+        self._lock = threading.Lock()
+        self._vacia = self._pagina(envolver_filas([]))
+        self.reiniciar()
+
+        primatips = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                primatips._servir(self)
+
+            def do_POST(self):
+                if self.path != '/avanzar':
+                    self.send_error(404)
+                    return
+                primatips.avanzar()
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        self._servidor.daemon_threads = True
+        puerto = self._servidor.server_address[1]
+        self.url = f"http://127.0.0.1:{puerto}/tips/{{fecha}}"
+        self.url_avanzar = f"http://127.0.0.1:{puerto}/avanzar"
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+
+    @staticmethod
+    def _pagina(html):
+        contenido = html.encode('utf-8')
+        return contenido, f'"{hashlib.sha1(contenido).hexdigest()[:16]}"'
+
+    def reiniciar(self):
+        """Vuelve al principio de la jornada (cada historial ve las mismas páginas)"""
+        with self._lock:
+            self._jornada = simular_jornada(self.n_partidos, self.n_ciclos, en_vivo=self.en_vivo)
+            self._actual = self._vacia
+            self.descargas = {200: 0, 304: 0}
+
+    def avanzar(self):
+        with self._lock:
+            html = next(self._jornada, None)
+            if html is not None:
+                self._actual = self._pagina(html)
+
+    def _servir(self, peticion):
+        fecha = peticion.path.rstrip('/').rsplit('/', 1)[-1]
+        with self._lock:
+            contenido, etag = self._actual if fecha == date.today().isoformat() else self._vacia
+            estado = 304 if peticion.headers.get('If-None-Match') == etag else 200
+            self.descargas[estado] += 1
+        peticion.send_response(estado)
+        peticion.send_header('ETag', etag)
+        if estado == 304:
+            peticion.end_headers()
+            return
+        peticion.send_header('Content-Type', 'text/html; charset=utf-8')
+        peticion.send_header('Content-Length', str(len(contenido)))
+        peticion.end_headers()
+        peticion.wfile.write(contenido)
+
+    def cerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+# ----------------------------------------------------------------------
+# Procesos hijos (con DETECTOR_DATA_DIR temporal)
+# ----------------------------------------------------------------------
+
+def sembrar(historial):
+    """N partidos finalizados del detector principal, repartidos en los días anteriores a hoy"""
+    import almacen_partidos
+
+    almacen = almacen_partidos.obtener_almacen()
+    rng = random.Random(7)
+    hoy = date.today()
+    lote = []
+    for i in range(historial):
+        fecha = (hoy - timedelta(days=1 + i // PARTIDOS_POR_DIA)).isoformat()
+        goles_casa, goles_visitante = rng.choice([(1, 0), (0, 1)])
+        extra_casa, extra_visitante = rng.randint(0, 2), rng.randint(0, 1)
+        goles_finales = goles_casa + goles_visitante + extra_casa + extra_visitante
+        minuto = rng.randint(60, 85)
+        # Como el scraper: hora de inicio HH:MM y hora de detección HH:MM:SS (minuto de
+        # juego + descanso después del inicio)
+        inicio = datetime.strptime(fecha, '%Y-%m-%d').replace(hour=12 + i % 10, minute=(i * 5) % 60)
+        deteccion = inicio + timedelta(minutes=minuto + 15, seconds=rng.randint(0, 59))
+        lote.append({
+            'fecha': fecha,
+            'hora': inicio.strftime('%H:%M'),
+            'liga': LIGAS[i % len(LIGAS)],
+            'equipo_casa': f"Histórico local {i}",
+            'equipo_visitante': f"Histórico visitante {i}",
+            'goles_casa': goles_casa,
+            'goles_visitante': goles_visitante,
+            'minuto': minuto,
+            'cuota_casa': f"{rng.uniform(1.2, 6.0):.2f}",
+            'cuota_empate': f"{rng.uniform(2.5, 4.5):.2f}",
+            'cuota_visitante': f"{rng.uniform(1.2, 6.0):.2f}",
+            'prob_casa': str(rng.randint(10, 70)),
+            'prob_empate': str(rng.randint(10, 40)),
+            'prob_visitante': str(rng.randint(10, 70)),
+            'tip': rng.choice(['1', 'X', '2', '1X', 'X2']),
+            'hora_deteccion': deteccion.strftime('%H:%M:%S'),
+            'estado': 'FINALIZADO',
+            'goles_finales_casa': goles_casa + extra_casa,
+            'goles_finales_visitante': goles_visitante + extra_visitante,
+            'supero_1_5': goles_finales > 1.5
+        })
+        if len(lote) == LOTE_SIEMBRA:
+            almacen.guardar_nuevos(lote)
+            lote = []
+    if lote:
+        almacen.guardar_nuevos(lote)
+
+def tamano_almacen():
+    """Bytes en disco de los almacenes de todos los detectores y de la cronología"""
+    import almacen_partidos
+    import cronologia
+    import detectores
+
+    total = sum(almacen_partidos.obtener_almacen(d.id).tamano_bytes() for d in detectores.ACTIVOS)
+    return total + cronologia.obtener_cronologia().tamano_bytes()
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p), len(ordenados) - 1)]
+
+def sondear(base, parar, semilla, espera, latencias, errores):
+    """Un cliente del panel: consultas en bucle hasta `parar`, con ETag y cursor como el navegador"""
+    import requests
+
+    sesion = requests.Session()
+    rng = random.Random(semilla)
+    etags = {}
+    cursor = ''
+    i = semilla
+    while not parar.is_set():
+        consulta = CONSULTAS[i % len(CONSULTAS)]
+        i += 1
+        if consulta == 'listado':
+            ruta = '/api/detector/un-gol?limite=30'
+        elif consulta == 'filtrado':
+            ruta = f"/api/detector/un-gol?limite=30&orden=fecha&liga={rng.choice(LIGAS)}"
+        elif consulta == 'cambios':
+            ruta = f"/api/detector/cambios?cursor={cursor}"
+        elif consulta == 'estadisticas':
+            ruta = '/api/detector/un-gol/estadisticas'
+        else:
+            ruta = '/api/detector/planificador'
+
+        cabeceras = {'If-None-Match': etags[ruta]} if ruta in etags else {}
+        inicio = time.perf_counter()
+        try:
+            respuesta = sesion.get(base + ruta, headers=cabeceras, timeout=30)
+            cuerpo = respuesta.content
+        except requests.RequestException:
+            errores.append(consulta)
+            continue
+        latencias.setdefault(consulta, []).append(time.perf_counter() - inicio)
+
+        if respuesta.status_code not in (200, 304):
+            errores.append(consulta)
+        elif respuesta.status_code == 200:
+            if respuesta.headers.get('ETag'):
+                etags[ruta] = respuesta.headers['ETag']
+            if consulta == 'cambios':
+                cursor = json.loads(cuerpo).get('cursor') or ''
+        if espera:
+            time.sleep(espera)
+
+def ejecutar_escenario(parametros):
+    """Ciclos de scraping con pollers concurrentes; devuelve el informe del escenario"""
+    import logging
+    import resource
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from werkzeug.serving import make_server
+    import requests
+
+    # Los prints de la app y del ciclo no interesan aquí: el informe va a la salida original
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        import almacen_partidos
+        import programador
+        import app
+
+        bytes_inicio = tamano_almacen()
+        historial = almacen_partidos.obtener_almacen().estadisticas()['detectados']
+
+        servidor = make_server('127.0.0.1', 0, app.app, threaded=True)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{servidor.server_port}"
+
+        # Scheduler en pausa: el ciclo programa el siguiente como en producción, pero
+        # los ciclos los lanza el benchmark
+        scheduler = BackgroundScheduler()
+        scheduler.start(paused=True)
+        programador.iniciar(scheduler)
+
+        parar = threading.Event()
+        latencias = [{} for _ in range(parametros['pollers'])]
+        errores = []
+        pollers = [
+            threading.Thread(target=sondear, args=(base, parar, n, parametros['espera'], latencias[n], errores), daemon=True)
+            for n in range(parametros['pollers'])
+        ]
+        inicio = time.perf_counter()
+        for poller in pollers:
+            poller.start()
+
+        ciclos = []
+        for _ in range(parametros['ciclos']):
+            requests.post(parametros['url_avanzar'], timeout=10)
+            marca = time.perf_counter()
+            programador.ejecutar_scraping_un_gol()
+            ciclos.append(time.perf_counter() - marca)
+            if parametros['pausa']:
+                time.sleep(parametros['pausa'])
+
+        parar.set()
+        for poller in pollers:
+            poller.join()
+        duracion = time.perf_counter() - inicio
+        servidor.shutdown()
+
+        bytes_fin = tamano_almacen()
+        estadisticas = almacen_partidos.obtener_almacen().estadisticas()
+
+    por_consulta = {}
+    for latencias_poller in latencias:
+        for consulta, valores in latencias_poller.items():
+            por_consulta.setdefault(consulta, []).extend(valores)
+    todas = [v for valores in por_consulta.values() for v in valores]
+
+    # ru_maxrss: KB en Linux, bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return {
+        'historial': historial,
+        'ciclos': len(ciclos),
+        'ciclo_p50_ms': percentil(ciclos, 0.5) * 1000,
+        'ciclo_max_ms': max(ciclos) * 1000,
+        'rss_pico_mb': rss / 1024 / 1024,
+        'peticiones': len(todas),
+        'errores': len(errores),
+        'peticiones_s': len(todas) / duracion,
+        'api_p50_ms': percentil(todas, 0.5) * 1000 if todas else None,
+        'api_p99_ms': percentil(todas, 0.99) * 1000 if todas else None,
+        'rutas': {
+            consulta: {
+                'peticiones': len(valores),
+                'p50_ms': percentil(valores, 0.5) * 1000,
+                'p99_ms': percentil(valores, 0.99) * 1000
+            }
+            for consulta, valores in sorted(por_consulta.items())
+        },
+        'bytes_almacen': bytes_inicio,
+        'bytes_por_partido': bytes_inicio / historial if historial else None,
+        'crecimiento_kb': (bytes_fin - bytes_inicio) / 1024,
+        'detectados_jornada': estadisticas['detectados'] - historial
+    }
+
+# ----------------------------------------------------------------------
+# Proceso principal
+# ----------------------------------------------------------------------
+
+def ejecutar_fase(fase, entorno, parametros):
+    salida = subprocess.run([sys.executable, os.path.abspath(__file__), '--fase', fase, json.dumps(parametros)],
+                            cwd=RAIZ, env=entorno, capture_output=True, text=True)
+    if salida.returncode != 0:
+        raise RuntimeError(salida.stderr.strip().splitlines()[-1] if salida.stderr.strip() else f"fase {fase} fallida")
+    return salida.stdout
+
+def medir(primatips, historial, args):
+    primatips.reiniciar()
+    with tempfile.TemporaryDirectory() as directorio:
+        entorno = dict(os.environ, DETECTOR_DATA_DIR=directorio, DETECTOR_URL_PRIMATIPS=primatips.url,
+                       DETECTOR_SCHEDULER='off', PYTHONDONTWRITEBYTECODE='1')
+        if args.almacen:
+            entorno['DETECTOR_ALMACEN'] = args.almacen
+        if historial:
+            ejecutar_fase('siembra', entorno, {'historial': historial})
+        salida = ejecutar_fase('escenario', entorno, {
+            'ciclos': args.ciclos,
+            'pollers': args.pollers,
+            'espera': args.espera,
+            'pausa': args.pausa,
+            'url_avanzar': primatips.url_avanzar
+        })
+    resultado = json.loads(salida.strip().splitlines()[-1])
+    resultado['descargas'] = dict(primatips.descargas)
+    return resultado
+
+def comparar(resultados, referencia, tolerancia):
+    """Medidas que empeoran respecto a la referencia: [(historial, medida, antes, ahora)]"""
+    previos = {r['historial']: r for r in referencia['resultados']}
+    regresiones = []
+    for resultado in resultados:
+        previo = previos.get(resultado['historial'])
+        if previo is None:
+            continue
+        for medida, margen in MEDIDAS.items():
+            antes, ahora = previo.get(medida), resultado.get(medida)
+            if antes is None or ahora is None:
+                continue
+            if ahora > antes * (1 + tolerancia) and ahora - antes > margen:
+                regresiones.append((resultado['historial'], medida, antes, ahora))
+    return regresiones
+
+def formato(valor, decimales=0):
+    return '-' if valor is None else f"{valor:.{decimales}f}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga y de regresión con un Primatips local')
+    parser.add_argument('--historiales', type=int, nargs='+', default=[0, 10000, 50000],
+                        help='Partidos finalizados sembrados en el almacén antes de cada escenario')
+    parser.add_argument('--partidos', type=int, default=400, help='Partidos de la jornada de hoy')
+    parser.add_argument('--en-vivo', type=int, default=80, help='Partidos en juego en cada ciclo')
+    parser.add_argument('--ciclos', type=int, default=40, help='Ciclos de scraping por escenario')
+    parser.add_argument('--pollers', type=int, default=8, help='Clientes consultando la API a la vez')
+    parser.add_argument('--espera', type=float, default=0.02, help='Segundos entre consultas de cada poller')
+    parser.add_argument('--pausa', type=float, default=0.25, help='Segundos entre ciclos')
+    parser.add_argument('--almacen', choices=['sqlite', 'jsonl'], help='Backend del almacén temporal')
+    parser.add_argument('--guardar', metavar='JSON', help='Guardar el informe para usarlo como referencia')
+    parser.add_argument('--referencia', metavar='JSON', help='Informe anterior con el que comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='Empeoramiento relativo admitido (0.25 = 25%%)')
+    parser.add_argument('--fase', choices=['siembra', 'escenario'], help=argparse.SUPPRESS)
+    parser.add_argument('parametros', nargs='?', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.fase == 'siembra':
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            sembrar(json.loads(args.parametros)['historial'])
+        return
+    if args.fase == 'escenario':
+        print(json.dumps(ejecutar_escenario(json.loads(args.parametros))))
+        sys.stdout.flush()
+        # Sin esperar al apagado del scheduler ni de los hilos de la app
+        os._exit(0)
+
+    primatips = PrimatipsLocal(args.partidos, args.en_vivo, args.ciclos)
+    print(f"🧪 Jornada: {args.partidos} partidos, ~{args.en_vivo} en vivo por ciclo, {args.ciclos} ciclos | "
+          f"{args.pollers} pollers | almacén {args.almacen or os.environ.get('DETECTOR_ALMACEN', 'sqlite')}")
+    resultados = []
+    try:
+        for historial in args.historiales:
+            print(f"⏳ Historial de {historial} partidos...")
+            resultados.append(medir(primatips, historial, args))
+    finally:
+        primatips.cerrar()
+
+    print(f"{'historial':>9} {'ciclo p50':>10} {'ciclo max':>10} {'RSS (MB)':>9} {'API p50':>8} {'API p99':>8} "
+          f"{'req/s':>7} {'almacén (MB)':>13} {'B/partido':>10} {'+jornada (KB)':>14} {'detectados':>11}")
+    for r in resultados:
+        print(f"{r['historial']:>9} {formato(r['ciclo_p50_ms']):>10} {formato(r['ciclo_max_ms']):>10} "
+              f"{formato(r['rss_pico_mb'], 1):>9} {formato(r['api_p50_ms'], 1):>8} {formato(r['api_p99_ms'], 1):>8} "
+              f"{formato(r['peticiones_s']):>7} {formato(r['bytes_almacen'] / 1024 / 1024, 2):>13} "
+              f"{formato(r['bytes_por_partido']):>10} {formato(r['crecimiento_kb']):>14} {r['detectados_jornada']:>11}")
+
+    consultas = sorted({c for r in resultados for c in r['rutas']})
+    print(f"\n{'p50/p99 (ms)':<14}" + ''.join(f"{r['historial']:>16}" for r in resultados))
+    for consulta in consultas:
+        celdas = []
+        for r in resultados:
+            ruta = r['rutas'].get(consulta)
+            celdas.append(f"{formato(ruta['p50_ms'], 1)}/{formato(ruta['p99_ms'], 1)}" if ruta else '-')
+        print(f"{consulta:<14}" + ''.join(f"{c:>16}" for c in celdas))
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as f:
+            json.dump({
+                'fecha': datetime.now().isoformat(timespec='seconds'),
+                'configuracion': {k: v for k, v in vars(args).items()
+                                  if k not in ('guardar', 'referencia', 'fase', 'parametros')},
+                'resultados': resultados
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Informe guardado en {args.guardar}")
+
+    fallos = []
+    for r in resultados:
+        if r['errores']:
+            fallos.append(f"{r['errores']} peticiones fallidas con historial {r['historial']}")
+        if not r['detectados_jornada']:
+            fallos.append(f"la jornada no detectó ningún partido con historial {r['historial']}")
+        if not r['descargas'][200]:
+            fallos.append(f"el ciclo no descargó la página con historial {r['historial']}")
+
+    if args.referencia:
+        with open(args.referencia, 'r', encoding='utf-8') as f:
+            referencia = json.load(f)
+        regresiones = comparar(resultados, referencia, args.tolerancia)
+        for historial, medida, antes, ahora in regresiones:
+            aumento = f" (+{(ahora / antes - 1) * 100:.0f}%)" if antes else ''
+            print(f"⚠️ Historial {historial}: {medida} {antes:.1f} → {ahora:.1f}{aumento}")
+        if regresiones:
+            fallos.append(f"{len(regresiones)} medidas empeoran más de un {args.tolerancia * 100:.0f}% "
+                          f"respecto a {args.referencia}")
+        else:
+            print(f"✅ Sin regresiones respecto a {args.referencia} (tolerancia {args.tolerancia * 100:.0f}%)")
+
+    if fallos:
+        for fallo in fallos:
+            print(f"❌ {fallo}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
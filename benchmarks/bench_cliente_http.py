@@ -0,0 +1,220 @@
+"""
+Comprobación y benchmark del cliente HTTP (cliente_http.py) contra un servidor local.
+
+Un servidor en 127.0.0.1 responde lo que cada caso le programa (estados, ETag,
+cuerpo) y cuenta las peticiones que recibe, así que no hace falta red. Casos:
+- revalidación: la segunda petición lleva If-None-Match, recibe 304 y devuelve
+  el contenido anterior marcado `sin_cambios`
+- reintentos: dos 503 seguidos de un 200 se resuelven en una llamada con 3 intentos
+- 4xx: varios 404 seguidos (fechas sin publicar) no abren el circuito
+- circuito: UMBRAL fallos seguidos lo abren y las peticiones fallan sin llegar al
+  servidor; pasado el tiempo de apertura, una sola petición de prueba (semiabierto)
+  lo vuelve a abrir si falla o lo cierra si va bien
+
+Después mide la duración de una descarga completa frente a una revalidación con 304
+para una página de --partidos filas. Termina con código 1 si algún caso falla.
+
+Uso:
+    python benchmarks/bench_cliente_http.py
+    python benchmarks/bench_cliente_http.py --partidos 1500 --repeticiones 200
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import requests
+import cliente_http
+from pagina_sintetica import generar_pagina
+
+class ServidorPrueba:
+    """Servidor local: por ruta, una cola de estados programados (y 200 cuando se acaba)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.programados = {}
+        self.cuerpos = {}
+        self.peticiones = {}
+        servidor_prueba = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor_prueba._responder(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        self._servidor.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self._servidor.server_address[1]}"
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+
+    def programar(self, ruta, estados=(), cuerpo=b'<html>ok</html>'):
+        with self._lock:
+            self.programados[ruta] = deque(estados)
+            self.cuerpos[ruta] = cuerpo
+            self.peticiones[ruta] = 0
+
+    def _responder(self, peticion):
+        with self._lock:
+            ruta = peticion.path
+            self.peticiones[ruta] = self.peticiones.get(ruta, 0) + 1
+            cola = self.programados.get(ruta)
+            estado = cola.popleft() if cola else 200
+            cuerpo = self.cuerpos.get(ruta, b'')
+        etag = f'"{hash(cuerpo) & 0xFFFFFFFF:x}"'
+        if estado == 200 and peticion.headers.get('If-None-Match') == etag:
+            estado = 304
+        peticion.send_response(estado)
+        peticion.send_header('ETag', etag)
+        if estado == 304:
+            peticion.end_headers()
+            return
+        cuerpo = cuerpo if estado == 200 else b'error'
+        peticion.send_header('Content-Length', str(len(cuerpo)))
+        peticion.end_headers()
+        peticion.wfile.write(cuerpo)
+
+    def cerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+class Reloj:
+    """Reloj manual para el circuit breaker: el tiempo de apertura pasa sin esperar"""
+
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+def cliente(reloj=None, umbral=3):
+    circuito = cliente_http.CircuitBreaker(umbral=umbral, tiempo_apertura=60, reloj=reloj or time.monotonic)
+    # Sin esperas entre reintentos: el caso no mide el backoff
+    return cliente_http.ClienteHTTP(circuito=circuito, dormir=lambda segundos: None)
+
+def falla(funcion, excepcion):
+    try:
+        funcion()
+    except excepcion:
+        return True
+    return False
+
+def caso_revalidacion(servidor):
+    servidor.programar('/revalidacion', cuerpo=b'<html>pagina</html>')
+    c = cliente()
+    primera = c.obtener(servidor.base + '/revalidacion')
+    segunda = c.obtener(servidor.base + '/revalidacion')
+    return [
+        ('primera descarga 200', primera.estado == 200 and not primera.sin_cambios),
+        ('revalidación 304 sin_cambios', segunda.estado == 304 and segunda.sin_cambios),
+        ('304 devuelve el contenido anterior', segunda.contenido == primera.contenido)
+    ]
+
+def caso_reintentos(servidor):
+    servidor.programar('/reintentos', [503, 503])
+    c = cliente()
+    respuesta = c.obtener(servidor.base + '/reintentos')
+    servidor.programar('/agotados', [500, 500, 500])
+    agotados = falla(lambda: c.obtener(servidor.base + '/agotados'), requests.HTTPError)
+    return [
+        ('503, 503, 200 en una llamada', respuesta.estado == 200 and respuesta.intentos == 3),
+        ('reintentos agotados propagan el error', agotados and servidor.peticiones['/agotados'] == 3)
+    ]
+
+def caso_4xx(servidor):
+    servidor.programar('/no-publicada', [404] * 10)
+    c = cliente()
+    errores = sum(falla(lambda: c.obtener(servidor.base + '/no-publicada'), requests.HTTPError) for _ in range(10))
+    return [
+        ('404 se propaga sin reintentos', errores == 10 and servidor.peticiones['/no-publicada'] == 10),
+        ('404 seguidos no abren el circuito', c.circuito.estado == 'cerrado')
+    ]
+
+def caso_circuito(servidor):
+    reloj = Reloj()
+    c = cliente(reloj, umbral=3)
+    url = servidor.base + '/caida'
+    # 3 llamadas × 3 intentos fallidos
+    servidor.programar('/caida', [500] * 9)
+    for _ in range(3):
+        falla(lambda: c.obtener(url), requests.HTTPError)
+    abierto = c.circuito.estado == 'abierto'
+    antes = servidor.peticiones['/caida']
+    bloqueada = falla(lambda: c.obtener(url), cliente_http.CircuitoAbierto)
+    sin_red = servidor.peticiones['/caida'] == antes
+
+    # Semiabierto: la prueba falla y vuelve a abrir
+    reloj.ahora += 60
+    servidor.programar('/caida', [500] * 3)
+    falla(lambda: c.obtener(url), requests.HTTPError)
+    reabierto = c.circuito.estado == 'abierto'
+
+    # Semiabierto: solo pasa una prueba a la vez
+    reloj.ahora += 60
+    semiabierto = c.circuito.estado == 'semiabierto'
+    c.circuito.permitir()
+    segunda_bloqueada = falla(c.circuito.permitir, cliente_http.CircuitoAbierto)
+    c.circuito.fallo()
+
+    # Prueba correcta: se cierra
+    reloj.ahora += 60
+    servidor.programar('/caida')
+    respuesta = c.obtener(url)
+    return [
+        ('fallos seguidos abren el circuito', abierto),
+        ('abierto: falla sin llegar al servidor', bloqueada and sin_red),
+        ('prueba fallida en semiabierto lo reabre', reabierto),
+        ('semiabierto deja pasar una sola prueba', semiabierto and segunda_bloqueada),
+        ('prueba correcta cierra el circuito', respuesta.estado == 200 and c.circuito.estado == 'cerrado')
+    ]
+
+def medir(servidor, n_partidos, repeticiones):
+    servidor.programar('/pagina', cuerpo=generar_pagina(n_partidos).encode('utf-8'))
+    url = servidor.base + '/pagina'
+    completas, revalidadas = [], []
+    for _ in range(repeticiones):
+        # Cliente nuevo: sin validadores, descarga completa
+        c = cliente()
+        completas.append(c.obtener(url).duracion)
+        revalidadas.append(c.obtener(url).duracion)
+    return statistics.median(completas), statistics.median(revalidadas), len(servidor.cuerpos['/pagina'])
+
+def main():
+    parser = argparse.ArgumentParser(description='Comprobación del cliente HTTP contra un servidor local')
+    parser.add_argument('--partidos', type=int, default=500, help='Filas de la página del benchmark')
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+
+    servidor = ServidorPrueba()
+    try:
+        resultados = []
+        for caso in (caso_revalidacion, caso_reintentos, caso_4xx, caso_circuito):
+            try:
+                resultados.extend(caso(servidor))
+            except Exception as e:
+                resultados.append((f"{caso.__name__}: {type(e).__name__}: {e}", False))
+        completa, revalidada, tamano = medir(servidor, args.partidos, args.repeticiones)
+    finally:
+        servidor.cerrar()
+
+    for nombre, correcto in resultados:
+        print(f"{'✅' if correcto else '❌'} {nombre}")
+    print(f"\n📦 Página de {args.partidos} partidos ({tamano / 1024:.0f} KB), mediana de {args.repeticiones}:")
+    print(f"{'descarga completa':<20} {completa * 1000:>8.2f} ms")
+    print(f"{'revalidación 304':<20} {revalidada * 1000:>8.2f} ms")
+
+    fallidos = [nombre for nombre, correcto in resultados if not correcto]
+    if fallidos:
+        print(f"❌ {len(fallidos)} casos fallidos")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark de los motores de extracción (extraccion.py).
+
+Mide cada motor sobre páginas sintéticas de distintos tamaños y sobre los
+fixtures de Primatips que se pasen con --fixture, y comprueba que todos
+devuelven exactamente las mismas filas, campo por campo, que la extracción
+original (BeautifulSoup + html.parser, motor 'bs4').
+
+Uso:
+    python benchmarks/bench_parser.py
+    python benchmarks/bench_parser.py --partidos 300 1500 --fixture pagina_guardada.html
+"""
+import os
+import sys
+import time
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extraccion
+from pagina_sintetica import generar_pagina, fila_html
+
+# Filas con las particularidades que ha mostrado la página real
+CASOS_LIMITE = [
+    # Espacios, saltos de línea y entidades alrededor de los textos
+    '<a class="game live" href="/m/1"><span class="tm">\n 20:45 </span>'
+    '<span class="cn"> ESP </span><span class="nms"><span class="nm"> Atl&eacute;tico&nbsp;B </span>'
+    '<span class="nm">Rayo <b>Vallecano</b></span></span>'
+    '<span class="o"> 1.90 </span><span class="o">3.10</span><span class="o">4.00</span>'
+    '<span class="t">48</span><span class="t">27</span><span class="t">25</span><span class="tip"> 1 </span>'
+    '<span class="res lv"><span class="lvs">90\'+3</span><span class="l"> 1 </span><span class="l">0</span></span></a>',
+    # Descanso: minuto sin número
+    '<a class="game" href="/m/2"><span class="tm">21:00</span><span class="fl"><img title=""></span>'
+    '<span class="cn">ITA</span><span class="nms"><span class="nm">Casa HT</span><span class="nm">Fuera HT</span></span>'
+    '<span class="res lv"><span class="lvs">HT</span><span class="l">0</span><span class="l"></span></span></a>',
+    # Sin cuotas, sin probabilidades ni resultado
+    '<a class="game" href="/m/3"><span class="nms"><span class="nm">Solo</span><span class="nm">Nombres</span></span></a>',
+    # Un solo equipo: la fila se descarta
+    '<a class="game" href="/m/4"><span class="nms"><span class="nm">Incompleto</span></span></a>',
+    # Marcador no numérico: la fila se avisa y se salta
+    '<a class="game" href="/m/5"><span class="nms"><span class="nm">Roto</span><span class="nm">Marcador</span></span>'
+    '<span class="res rsl"><span class="r">-</span><span class="r">1</span></span></a>',
+    # Comentarios HTML dentro de los textos
+    '<a class="game" href="/m/6"><span class="nms"><span class="nm">Con <!-- x -->Comentario</span>'
+    '<span class="nm">Otro</span></span><span class="res rsl"><span class="r">2</span><span class="r">2</span></span></a>',
+]
+
+def pagina_casos_limite():
+    filas = ''.join(CASOS_LIMITE) + fila_html(7, 'finalizado', None, 3, 1)
+    return f'<html><head><meta charset="utf-8"></head><body><div>{filas}</div></body></html>'.encode('utf-8')
+
+def extraer(html, motor):
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        return extraccion.extraer_filas(html, motor)
+
+def diferencias(referencia, filas):
+    """Primeras diferencias campo por campo entre dos listas de FilaPartido"""
+    if len(referencia) != len(filas):
+        return [f"{len(filas)} filas en lugar de {len(referencia)}"]
+    errores = []
+    for i, (esperada, obtenida) in enumerate(zip(referencia, filas)):
+        for campo in extraccion.FilaPartido._fields:
+            a, b = getattr(esperada, campo), getattr(obtenida, campo)
+            if a != b or type(a) is not type(b):
+                errores.append(f"fila {i} campo {campo}: {a!r} != {b!r}")
+    return errores[:5]
+
+def medir(html, motor, repeticiones):
+    mejor = None
+    filas = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        filas = extraer(html, motor)
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, filas
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de los motores de extracción')
+    parser.add_argument('--partidos', type=int, nargs='+', default=[100, 300, 1500])
+    parser.add_argument('--fixture', nargs='*', default=[], help='HTML de Primatips guardados')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    paginas = [('casos límite', pagina_casos_limite())]
+    for n in args.partidos:
+        html = generar_pagina(n, n_en_vivo=n // 8, n_finalizados=n // 3).encode('utf-8')
+        paginas.append((f"sintética {n}", html))
+    for ruta in args.fixture:
+        with open(ruta, 'rb') as f:
+            paginas.append((os.path.basename(ruta), f.read()))
+
+    motores = [m for m in extraccion.MOTORES if m != 'bs4']
+    print(f"{'página':<22} {'filas':>6} {'bs4 (ms)':>9} " + ' '.join(f"{m + ' (ms)':>14} {'speedup':>8}" for m in motores))
+
+    correcto = True
+    for nombre, html in paginas:
+        t_referencia, referencia = medir(html, 'bs4', args.repeticiones)
+        columnas = []
+        for motor in motores:
+            t_motor, filas = medir(html, motor, args.repeticiones)
+            errores = diferencias(referencia, filas)
+            if errores:
+                correcto = False
+                print(f"❌ {nombre} / {motor}: " + '; '.join(errores))
+            columnas.append(f"{t_motor * 1000:>14.2f} {t_referencia / t_motor:>7.1f}x")
+        print(f"{nombre:<22} {len(referencia):>6} {t_referencia * 1000:>9.2f} " + ' '.join(columnas))
+
+    if not correcto:
+        sys.exit(1)
+    print("✅ Todos los motores devuelven las mismas filas que la extracción original")
+
+if __name__ == '__main__':
+    main()
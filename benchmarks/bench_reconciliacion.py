@@ -0,0 +1,145 @@
+"""
+Benchmark de la actualización de resultados finales.
+
+Compara el recorrido anidado original (partidos guardados × filas de la página,
+con find/find_all repetidos) contra la resolución por índice
+(fecha, equipo_casa, equipo_visitante) de actualizar_resultados_finales().
+
+Uso:
+    python benchmarks/bench_reconciliacion.py
+    python benchmarks/bench_reconciliacion.py --backlog 100 1000 --pagina 200 1000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import almacen_partidos
+import scrape_un_gol_live
+from pagina_sintetica import generar_pagina, nombres_equipos
+
+FECHA = '2026-01-13'
+ARCHIVO_JSON = 'data/partidos_un_gol_detectados.json'
+
+def crear_backlog(n_backlog, n_finalizados_pagina):
+    """Partidos pendientes: los primeros están finalizados en la página, el resto no aparece"""
+    partidos = []
+    for i in range(n_backlog):
+        indice = i if i < n_finalizados_pagina else 100000 + i
+        casa, visitante = nombres_equipos(indice)
+        partidos.append({
+            'fecha': FECHA,
+            'equipo_casa': casa,
+            'equipo_visitante': visitante,
+            'estado': 'DETECTADO',
+            'goles_finales_casa': None,
+            'goles_finales_visitante': None,
+            'supero_1_5': None
+        })
+    return {'partidos': partidos, 'total_partidos': len(partidos)}
+
+def escribir_backlog(datos):
+    """Deja el mismo backlog en el JSON original y en el almacén actual"""
+    os.makedirs('data', exist_ok=True)
+    with open(ARCHIVO_JSON, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    
+    almacen = almacen_partidos.obtener_almacen()
+    almacen.limpiar()
+    almacen.guardar_nuevos([dict(p) for p in datos['partidos']])
+
+def reconciliar_anidado(html):
+    """Implementación original: parseo propio y bucle anidado sobre el DOM"""
+    with open(ARCHIVO_JSON, 'r', encoding='utf-8') as f:
+        datos = json.load(f)
+    
+    soup = BeautifulSoup(html, 'html.parser')
+    partidos_pagina = soup.find_all('a', class_='game')
+    
+    actualizados = 0
+    for partido_guardado in datos['partidos']:
+        if partido_guardado.get('supero_1_5') is not None:
+            continue
+        for partido_web in partidos_pagina:
+            equipos = partido_web.find('span', class_='nms')
+            if not equipos:
+                continue
+            nombres = equipos.find_all('span', class_='nm')
+            if len(nombres) < 2:
+                continue
+            if (nombres[0].get_text(strip=True) == partido_guardado['equipo_casa'] and
+                nombres[1].get_text(strip=True) == partido_guardado['equipo_visitante']):
+                resultado = partido_web.find('span', class_='res')
+                if resultado and 'rsl' in resultado.get('class', []):
+                    goles = resultado.find_all('span', class_='r')
+                    if len(goles) >= 2:
+                        casa = int(goles[0].get_text(strip=True) or 0)
+                        visitante = int(goles[1].get_text(strip=True) or 0)
+                        partido_guardado['goles_finales_casa'] = casa
+                        partido_guardado['goles_finales_visitante'] = visitante
+                        partido_guardado['supero_1_5'] = casa + visitante > 1
+                        partido_guardado['estado'] = 'FINALIZADO'
+                        actualizados += 1
+                break
+    
+    with open(ARCHIVO_JSON, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    return actualizados
+
+def reconciliar_indexado(html):
+    """Implementación actual: un parseo, índice por clave y resolución O(1) por pendiente"""
+    snapshot = scrape_un_gol_live.obtener_snapshot(FECHA, html)
+    return scrape_un_gol_live.actualizar_resultados_finales(snapshot)['actualizados']
+
+def medir(funcion, html, datos, repeticiones):
+    mejor = None
+    resultado = None
+    for _ in range(repeticiones):
+        escribir_backlog(datos)
+        inicio = time.perf_counter()
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            resultado = funcion(html)
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de reconciliación de resultados')
+    parser.add_argument('--backlog', type=int, nargs='+', default=[50, 200, 800])
+    parser.add_argument('--pagina', type=int, nargs='+', default=[100, 400, 1600])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--sin-anidado', action='store_true', help='No medir la versión original (lenta)')
+    args = parser.parse_args()
+    
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            print(f"{'backlog':>8} {'página':>8} {'anidado (s)':>12} {'indexado (s)':>13} {'speedup':>8} {'resueltos':>10}")
+            for n_pagina in args.pagina:
+                n_finalizados = n_pagina // 2
+                html = generar_pagina(n_pagina, n_en_vivo=n_pagina // 10, n_finalizados=n_finalizados)
+                for n_backlog in args.backlog:
+                    datos = crear_backlog(n_backlog, n_finalizados)
+                    
+                    t_indexado, resueltos = medir(reconciliar_indexado, html, datos, args.repeticiones)
+                    
+                    if args.sin_anidado:
+                        print(f"{n_backlog:>8} {n_pagina:>8} {'-':>12} {t_indexado:>13.4f} {'-':>8} {resueltos:>10}")
+                        continue
+                    
+                    t_anidado, resueltos_anidado = medir(reconciliar_anidado, html, datos, 1)
+                    assert resueltos == resueltos_anidado, 'Las dos implementaciones difieren'
+                    print(f"{n_backlog:>8} {n_pagina:>8} {t_anidado:>12.4f} {t_indexado:>13.4f} "
+                          f"{t_anidado / t_indexado:>7.1f}x {resueltos:>10}")
+        finally:
+            os.chdir(directorio_original)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Repetición offline del archivo de páginas (archivo_paginas.py).
+
+Pasa cada descarga archivada, en orden de captura, por la misma detección,
+actualización de resultados y cronología que el ciclo de scraping, sobre un almacén temporal
+(los datos reales no se tocan). Sirve para comprobar un cambio del parser o del
+criterio con páginas reales y como benchmark con un corpus realista.
+
+Como en producción, una página idéntica a la anterior de su fecha no se vuelve
+a parsear (se reutiliza el snapshot).
+
+Uso:
+    python benchmarks/bench_replay.py                              # data/archivo
+    python benchmarks/bench_replay.py --archivo /ruta/archivo --desde 2026-01-01 --motor bs4
+    python benchmarks/bench_replay.py --sintetico 300 --ciclos 80  # jornada sintética, sin archivo
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+def crear_archivo_sintetico(archivo_paginas, directorio, n_partidos, n_ciclos):
+    from pagina_sintetica import simular_jornada
+
+    archivo = archivo_paginas.ArchivoPaginas(directorio)
+    fecha = time.strftime('%Y-%m-%d')
+    for html in simular_jornada(n_partidos, n_ciclos):
+        archivo.guardar(fecha, html.encode('utf-8'))
+    return archivo
+
+def repetir(archivo, desde, hasta, motor):
+    import almacen_partidos
+    import scrape_un_gol_live
+
+    tiempos = {'lectura': 0.0, 'parseo': 0.0, 'deteccion': 0.0, 'reconciliacion': 0.0, 'cronologia': 0.0}
+    capturas = parseadas = filas = 0
+    ultimo = {}
+
+    inicio = time.perf_counter()
+    marca = inicio
+    for registro, contenido in archivo.capturas(desde, hasta):
+        tiempos['lectura'] += time.perf_counter() - marca
+        capturas += 1
+
+        fecha = registro['fecha']
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            t0 = time.perf_counter()
+            if fecha in ultimo and ultimo[fecha][0] == registro['hash']:
+                snapshot = {**ultimo[fecha][1], 'sin_cambios': True}
+            else:
+                snapshot = scrape_un_gol_live.obtener_snapshot(fecha, html=contenido, motor=motor)
+                ultimo[fecha] = (registro['hash'], snapshot)
+                parseadas += 1
+                filas += len(snapshot['filas'])
+            t1 = time.perf_counter()
+            deteccion = scrape_un_gol_live.scrape_partidos_un_gol_live(snapshot)
+            t2 = time.perf_counter()
+            if deteccion['exito']:
+                scrape_un_gol_live.actualizar_resultados_finales(snapshot, descargar=False)
+            t3 = time.perf_counter()
+            if deteccion['exito'] and not snapshot['sin_cambios']:
+                scrape_un_gol_live.registrar_cronologia(snapshot)
+            t4 = time.perf_counter()
+
+        tiempos['parseo'] += t1 - t0
+        tiempos['deteccion'] += t2 - t1
+        tiempos['reconciliacion'] += t3 - t2
+        tiempos['cronologia'] += t4 - t3
+        marca = time.perf_counter()
+
+    total = time.perf_counter() - inicio
+    estadisticas = almacen_partidos.obtener_almacen().estadisticas()
+    return {
+        'capturas': capturas,
+        'parseadas': parseadas,
+        'filas': filas,
+        'total': total,
+        'tiempos': tiempos,
+        'estadisticas': estadisticas
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Repetición offline del archivo de páginas')
+    parser.add_argument('--archivo', help='Directorio del archivo (por defecto <DETECTOR_DATA_DIR>/archivo)')
+    parser.add_argument('--desde', help='Primer día de captura YYYY-MM-DD')
+    parser.add_argument('--hasta', help='Último día de captura YYYY-MM-DD')
+    parser.add_argument('--motor', help='Motor de extracción (lxml, strainer, bs4)')
+    parser.add_argument('--almacen', choices=['sqlite', 'jsonl'], help='Backend del almacén temporal')
+    parser.add_argument('--sintetico', type=int, metavar='PARTIDOS',
+                        help='Generar antes una jornada sintética con este número de partidos')
+    parser.add_argument('--ciclos', type=int, default=60, help='Ciclos de la jornada sintética')
+    args = parser.parse_args()
+
+    archivo_real = args.archivo or os.path.join(os.environ.get('DETECTOR_DATA_DIR', 'data'), 'archivo')
+    temporal = tempfile.TemporaryDirectory()
+    # Antes de importar: el almacén y el resto de data/ se crean en el temporal
+    os.environ['DETECTOR_DATA_DIR'] = temporal.name
+    if args.almacen:
+        os.environ['DETECTOR_ALMACEN'] = args.almacen
+    sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+    import archivo_paginas
+
+    with temporal:
+        if args.sintetico:
+            print(f"🧪 Generando jornada sintética: {args.sintetico} partidos × {args.ciclos} ciclos")
+            archivo = crear_archivo_sintetico(archivo_paginas, os.path.join(temporal.name, 'archivo'),
+                                              args.sintetico, args.ciclos)
+        else:
+            archivo = archivo_paginas.ArchivoPaginas(archivo_real)
+
+        if not archivo.dias(args.desde, args.hasta):
+            print(f"📭 No hay páginas archivadas en {archivo.directorio} (activa DETECTOR_ARCHIVO=on o usa --sintetico)")
+            sys.exit(1)
+
+        resultado = repetir(archivo, args.desde, args.hasta, args.motor)
+
+    tiempos = resultado['tiempos']
+    estadisticas = resultado['estadisticas']
+    capturas = resultado['capturas']
+    print(f"📦 Capturas: {capturas} ({resultado['parseadas']} parseadas, {resultado['filas']} filas)")
+    print(f"{'etapa':<16} {'total (s)':>10} {'por captura (ms)':>17}")
+    for etapa, segundos in tiempos.items():
+        print(f"{etapa:<16} {segundos:>10.3f} {segundos / max(capturas, 1) * 1000:>17.2f}")
+    print(f"{'total':<16} {resultado['total']:>10.3f} {resultado['total'] / max(capturas, 1) * 1000:>17.2f}")
+    print(f"⚡ {capturas / resultado['total']:.1f} capturas/s")
+    print(f"🎯 Detectados: {estadisticas['detectados']} | Finalizados: {estadisticas['finalizados']} | "
+          f"+1.5: {estadisticas['supero_1_5']} | No +1.5: {estadisticas['no_supero_1_5']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Generador de páginas sintéticas con la estructura de Primatips (/tips/{fecha}).
+Se usa en los benchmarks para no depender de la red.
+"""
+import random
+import argparse
+
+LIGAS = [
+    'España - LaLiga', 'Inglaterra - Premier League', 'Italia - Serie A',
+    'Alemania - Bundesliga', 'Francia - Ligue 1', 'Argentina - Liga Profesional',
+    'Brasil - Serie A', 'México - Liga MX', 'Portugal - Primeira Liga'
+]
+
+def nombres_equipos(i):
+    """Nombres deterministas para el partido número i"""
+    return f"Local {i}", f"Visitante {i}"
+
+def fila_html(i, estado='programado', minuto=None, goles_casa=0, goles_visitante=0, rng=None):
+    """
+    HTML de una fila `a.game`.
+    estado: 'programado', 'vivo' (clase lv) o 'finalizado' (clase rsl)
+    """
+    rng = rng or random.Random(i)
+    casa, visitante = nombres_equipos(i)
+    liga = LIGAS[i % len(LIGAS)]
+    cuotas = [f"{rng.uniform(1.2, 6.0):.2f}" for _ in range(3)]
+    probs = [str(rng.randint(10, 70)) for _ in range(3)]
+    tip = rng.choice(['1', 'X', '2', '1X', 'X2'])
+    
+    if estado == 'vivo':
+        res = (f'<span class="res lv"><span class="lvs">{minuto}\'</span>'
+               f'<span class="l">{goles_casa}</span><span class="l">{goles_visitante}</span></span>')
+    elif estado == 'finalizado':
+        res = (f'<span class="res rsl"><span class="r">{goles_casa}</span>'
+               f'<span class="r">{goles_visitante}</span></span>')
+    else:
+        res = '<span class="res"><span class="r"></span><span class="r"></span></span>'
+    
+    return (
+        f'<a class="game" href="/match/{i}">'
+        f'<span class="tm">{(12 + i % 10):02d}:{(i * 5) % 60:02d}</span>'
+        f'<span class="fl"><img src="/flags/{i % 9}.png" title="{liga}"></span>'
+        f'<span class="cn">{liga[:3].upper()}</span>'
+        f'<span class="nms"><span class="nm">{casa}</span><span class="nm">{visitante}</span></span>'
+        + ''.join(f'<span class="o">{c}</span>' for c in cuotas)
+        + ''.join(f'<span class="t">{p}</span>' for p in probs)
+        + f'<span class="tip">{tip}</span>'
+        + res
+        + '</a>\n'
+    )
+
+def generar_pagina(n_partidos=300, n_en_vivo=40, n_finalizados=100, semilla=42, minuto_base=None):
+    """
+    Página completa con n_partidos filas: primero los finalizados,
+    luego los que están en vivo y el resto programados.
+    minuto_base fija el minuto de todos los partidos en vivo (por defecto aleatorio).
+    """
+    rng = random.Random(semilla)
+    filas = []
+    for i in range(n_partidos):
+        if i < n_finalizados:
+            filas.append(fila_html(i, 'finalizado', None, rng.randint(0, 3), rng.randint(0, 3), rng))
+        elif i < n_finalizados + n_en_vivo:
+            minuto = minuto_base if minuto_base is not None else rng.randint(1, 95)
+            filas.append(fila_html(i, 'vivo', minuto, rng.randint(0, 2), rng.randint(0, 1), rng))
+        else:
+            filas.append(fila_html(i, 'programado', rng=rng))
+    return envolver_filas(filas)
+
+def simular_jornada(n_partidos=200, n_ciclos=60, minutos_por_ciclo=3, semilla=42, en_vivo=None):
+    """
+    Páginas sucesivas de un mismo día, una por ciclo de scraping: cada partido
+    empieza en un ciclo al azar, avanza `minutos_por_ciclo` minutos por ciclo,
+    marca sus goles en minutos fijados de antemano y termina pasado el 90.
+    Con `en_vivo`, los inicios se reparten para que haya unos `en_vivo` partidos
+    en juego en cada ciclo (el resto, programados o finalizados).
+    Genera el HTML de cada ciclo.
+    """
+    rng = random.Random(semilla)
+    # Ciclos que un partido pasa en vivo
+    duracion = 95 // minutos_por_ciclo + 1
+    partidos = []
+    for i in range(n_partidos):
+        if en_vivo:
+            ventana = max(n_partidos * duracion // en_vivo, 1)
+            inicio = rng.randint(-duracion, ventana - duracion)
+        else:
+            inicio = rng.randint(-40, n_ciclos - 1)
+        # (minuto, marca el local)
+        goles = sorted((rng.randint(1, 90), rng.random() < 0.55) for _ in range(rng.choice([0, 1, 1, 2, 2, 3, 4])))
+        partidos.append((i, inicio, goles))
+    
+    for ciclo in range(n_ciclos):
+        filas = []
+        for i, inicio, goles in partidos:
+            minuto = (ciclo - inicio) * minutos_por_ciclo
+            if minuto <= 0:
+                filas.append(fila_html(i, 'programado'))
+                continue
+            marcados = [local for m, local in goles if m <= minuto]
+            goles_casa = sum(marcados)
+            goles_visitante = len(marcados) - goles_casa
+            estado = 'finalizado' if minuto > 95 else 'vivo'
+            filas.append(fila_html(i, estado, min(minuto, 90), goles_casa, goles_visitante))
+        yield envolver_filas(filas)
+
+def envolver_filas(filas):
+    # Cabecera y relleno parecidos a la página real para que el parseo no sea trivial
+    relleno = '<div class="ad"><p>publicidad</p><ul>' + '<li><a href="#">enlace</a></li>' * 30 + '</ul></div>'
+    return (
+        '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8"><title>Tips</title>'
+        '<script>var x = 1;</script></head><body>'
+        + relleno
+        + '<div class="games">' + ''.join(filas) + '</div>'
+        + relleno
+        + '</body></html>'
+    )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera una página sintética de Primatips')
+    parser.add_argument('salida', help='Archivo HTML de salida')
+    parser.add_argument('--partidos', type=int, default=300)
+    parser.add_argument('--en-vivo', type=int, default=40)
+    parser.add_argument('--finalizados', type=int, default=100)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+    
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        f.write(generar_pagina(args.partidos, args.en_vivo, args.finalizados, args.semilla))
+    print(f"✅ Página generada: {args.salida}")
@@ -0,0 +1,100 @@
+"""
+Bloqueos de archivo entre procesos (varios workers de gunicorn).
+
+BloqueoArchivo serializa escrituras entre procesos y entre hilos del mismo
+proceso, y es reentrante dentro de un hilo. Usa fcntl.flock (Linux, Render)
+o msvcrt.locking (Windows); sin ninguno de los dos solo protege entre hilos.
+"""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+def _bloquear(descriptor, esperar):
+    if fcntl is not None:
+        modo = fcntl.LOCK_EX if esperar else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(descriptor, modo)
+            return True
+        except BlockingIOError:
+            return False
+    if msvcrt is not None:
+        modo = msvcrt.LK_LOCK if esperar else msvcrt.LK_NBLCK
+        try:
+            msvcrt.locking(descriptor, modo, 1)
+            return True
+        except OSError:
+            return False
+    return True
+
+def _desbloquear(descriptor):
+    if fcntl is not None:
+        fcntl.flock(descriptor, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        os.lseek(descriptor, 0, os.SEEK_SET)
+        msvcrt.locking(descriptor, msvcrt.LK_UNLCK, 1)
+
+class BloqueoArchivo:
+    """Lock exclusivo sobre `ruta` compartido por todos los procesos que la usen"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._hilos = threading.RLock()
+        self._profundidad = 0
+        self._descriptor = None
+
+    def adquirir(self, esperar=True):
+        """Devuelve False si esperar=False y otro proceso o hilo lo tiene"""
+        if not self._hilos.acquire(blocking=esperar):
+            return False
+        if self._profundidad == 0:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            descriptor = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+            if not _bloquear(descriptor, esperar):
+                os.close(descriptor)
+                self._hilos.release()
+                return False
+            self._descriptor = descriptor
+        self._profundidad += 1
+        return True
+
+    def liberar(self):
+        self._profundidad -= 1
+        if self._profundidad == 0:
+            _desbloquear(self._descriptor)
+            os.close(self._descriptor)
+            self._descriptor = None
+        self._hilos.release()
+
+    def __enter__(self):
+        self.adquirir()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.liberar()
+
+class Liderazgo:
+    """
+    Elección de un único proceso líder (el que ejecuta el scheduler).
+    El lock se mantiene mientras el proceso vive; si muere, el sistema operativo
+    lo libera y otro candidato puede tomarlo en su siguiente intento.
+    """
+
+    def __init__(self, ruta):
+        self._bloqueo = BloqueoArchivo(ruta)
+        self.es_lider = False
+
+    def intentar(self):
+        if not self.es_lider:
+            self.es_lider = self._bloqueo.adquirir(esperar=False)
+        return self.es_lider
@@ -0,0 +1,276 @@
+"""
+Cliente HTTP compartido para las descargas de Primatips.
+
+- Una sesión requests con conexiones keep-alive reutilizadas (sin handshake TCP+TLS
+  en cada ciclo) y compresión gzip negociada.
+- Revalidación condicional: se reenvían ETag / Last-Modified de la última respuesta;
+  con 304, o con un cuerpo idéntico al anterior, la respuesta se marca `sin_cambios`
+  para que quien llama pueda saltarse el parseo.
+- Reintentos con espera exponencial (y jitter) ante errores de red, 429 y 5xx.
+- Circuit breaker: tras varios fallos seguidos las peticiones fallan al instante
+  durante un tiempo, en vez de ocupar el hilo del scheduler esperando timeouts.
+  Solo cuentan como fallo los errores de red, los timeouts, 429 y 5xx: un 404 (la
+  página de una fecha aún no publicada) es una respuesta del servidor y no lo abre.
+
+Comprobación contra un servidor local: benchmarks/bench_cliente_http.py
+"""
+import time
+import random
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+import requests
+from requests.adapters import HTTPAdapter
+import metricas
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept-Encoding': 'gzip, deflate'
+}
+
+# (conexión, lectura) en segundos
+TIMEOUT = (5, 10)
+REINTENTOS = 2
+ESPERA_BASE = 0.5
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+UMBRAL_FALLOS = 5
+TIEMPO_APERTURA = 120
+
+# URLs de las que se recuerdan validadores y contenido
+MAX_URLS_CACHEADAS = 32
+
+PETICIONES = metricas.contador(
+    'detector_primatips_peticiones_total',
+    'Descargas de Primatips por resultado (descargada, sin_cambios, error, circuito_abierto)',
+    ['resultado'])
+DURACION_PETICION = metricas.histograma(
+    'detector_primatips_peticion_segundos',
+    'Duración de cada descarga de Primatips, reintentos incluidos',
+    ['resultado'])
+BYTES_RECIBIDOS = metricas.contador(
+    'detector_primatips_bytes_total',
+    'Bytes recibidos de Primatips (comprimidos si el servidor usó gzip)')
+REINTENTOS_HECHOS = metricas.contador(
+    'detector_primatips_reintentos_total',
+    'Reintentos de descargas de Primatips')
+ERRORES = metricas.contador(
+    'detector_primatips_errores_total',
+    'Errores de Primatips por tipo (conexion, timeout, http_<estado>, circuito_abierto)',
+    ['tipo'])
+CIRCUITO_ABIERTO = metricas.medidor(
+    'detector_primatips_circuito_abierto',
+    '1 si el circuit breaker de Primatips no deja pasar peticiones')
+
+def _tipo_error(error):
+    if isinstance(error, requests.HTTPError):
+        return f"http_{error.response.status_code}"
+    if isinstance(error, requests.Timeout):
+        return 'timeout'
+    return 'conexion'
+
+class CircuitoAbierto(Exception):
+    """El circuito está abierto: no se hace la petición"""
+
+class Respuesta(NamedTuple):
+    contenido: bytes
+    sin_cambios: bool
+    estado: int
+    bytes_recibidos: int
+    intentos: int
+    duracion: float
+
+class CircuitBreaker:
+    """
+    cerrado: las peticiones pasan; `umbral` fallos seguidos lo abren.
+    abierto: las peticiones fallan sin salir a la red durante `tiempo_apertura`.
+    semiabierto: pasado ese tiempo se deja pasar una petición de prueba;
+    si va bien se cierra, si falla vuelve a abrirse.
+    """
+
+    def __init__(self, umbral=UMBRAL_FALLOS, tiempo_apertura=TIEMPO_APERTURA, reloj=time.monotonic):
+        self.umbral = umbral
+        self.tiempo_apertura = tiempo_apertura
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._fallos = 0
+        self._abierto_desde = None
+        self._prueba_en_curso = False
+
+    @property
+    def estado(self):
+        with self._lock:
+            return self._estado()
+
+    def _estado(self):
+        if self._abierto_desde is None:
+            return 'cerrado'
+        if self._reloj() - self._abierto_desde >= self.tiempo_apertura:
+            return 'semiabierto'
+        return 'abierto'
+
+    def permitir(self):
+        """Lanza CircuitoAbierto si la petición no debe hacerse"""
+        with self._lock:
+            estado = self._estado()
+            if estado == 'cerrado':
+                return
+            if estado == 'semiabierto' and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return
+            restante = self.tiempo_apertura - (self._reloj() - self._abierto_desde)
+            raise CircuitoAbierto(f"Circuito abierto tras {self._fallos} fallos seguidos (reintento en {max(restante, 0):.0f}s)")
+
+    def exito(self):
+        with self._lock:
+            self._fallos = 0
+            self._abierto_desde = None
+            self._prueba_en_curso = False
+
+    def neutra(self):
+        """
+        Respuesta de error del servidor que no es un fallo (404, 403...): no suma ni
+        descuenta fallos seguidos, pero si era la prueba del semiabierto el servidor
+        está respondiendo y el circuito se cierra.
+        """
+        with self._lock:
+            if self._prueba_en_curso:
+                self._fallos = 0
+                self._abierto_desde = None
+                self._prueba_en_curso = False
+
+    def fallo(self):
+        with self._lock:
+            self._fallos += 1
+            if self._prueba_en_curso or self._fallos >= self.umbral:
+                self._abierto_desde = self._reloj()
+            self._prueba_en_curso = False
+
+    def resumen(self):
+        with self._lock:
+            return {'estado': self._estado(), 'fallos_seguidos': self._fallos}
+
+class ClienteHTTP:
+    """Sesión HTTP reutilizable con revalidación, reintentos y circuit breaker"""
+
+    def __init__(self, timeout=TIMEOUT, reintentos=REINTENTOS, espera_base=ESPERA_BASE,
+                 circuito=None, tamano_pool=10, dormir=time.sleep):
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.circuito = circuito or CircuitBreaker()
+        self._dormir = dormir
+
+        self.sesion = requests.Session()
+        self.sesion.headers.update(HEADERS)
+        adaptador = HTTPAdapter(pool_connections=tamano_pool, pool_maxsize=tamano_pool)
+        self.sesion.mount('http://', adaptador)
+        self.sesion.mount('https://', adaptador)
+
+        # url -> {'etag', 'last_modified', 'hash', 'contenido'}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _validadores(self, url):
+        with self._lock:
+            entrada = self._cache.get(url)
+            if entrada:
+                self._cache.move_to_end(url)
+            return entrada
+
+    def _recordar(self, url, respuesta, huella):
+        with self._lock:
+            self._cache[url] = {
+                'etag': respuesta.headers.get('ETag'),
+                'last_modified': respuesta.headers.get('Last-Modified'),
+                'hash': huella,
+                'contenido': respuesta.content
+            }
+            self._cache.move_to_end(url)
+            while len(self._cache) > MAX_URLS_CACHEADAS:
+                self._cache.popitem(last=False)
+
+    def _espera(self, intento):
+        base = self.espera_base * 2 ** intento
+        return base + random.uniform(0, base / 2)
+
+    def obtener(self, url):
+        """
+        GET con revalidación condicional. Devuelve una Respuesta; `sin_cambios`
+        indica que el contenido es el mismo que en la petición anterior a esa URL.
+        Lanza CircuitoAbierto o la excepción de requests del último intento.
+        """
+        try:
+            self.circuito.permitir()
+        except CircuitoAbierto:
+            PETICIONES.inc(resultado='circuito_abierto')
+            ERRORES.inc(tipo='circuito_abierto')
+            CIRCUITO_ABIERTO.fijar(1)
+            raise
+
+        cacheada = self._validadores(url)
+        headers = {}
+        if cacheada:
+            if cacheada['etag']:
+                headers['If-None-Match'] = cacheada['etag']
+            if cacheada['last_modified']:
+                headers['If-Modified-Since'] = cacheada['last_modified']
+
+        inicio = time.perf_counter()
+        intento = 0
+        while True:
+            try:
+                respuesta = self.sesion.get(url, headers=headers, timeout=self.timeout)
+                respuesta.raise_for_status()
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                ERRORES.inc(tipo=_tipo_error(e))
+                reintentable = not isinstance(e, requests.HTTPError) or e.response.status_code in ESTADOS_REINTENTABLES
+                if not reintentable:
+                    # El servidor respondió (404, 403...): error para quien llama, no fallo del circuito
+                    self.circuito.neutra()
+                    self._registrar_metricas('error', time.perf_counter() - inicio)
+                    raise
+                if intento >= self.reintentos:
+                    self.circuito.fallo()
+                    self._registrar_metricas('error', time.perf_counter() - inicio)
+                    raise
+                self._dormir(self._espera(intento))
+                intento += 1
+                REINTENTOS_HECHOS.inc()
+
+        self.circuito.exito()
+        duracion = time.perf_counter() - inicio
+        # Bytes transferidos (comprimidos si el servidor usó gzip)
+        recibidos = int(respuesta.headers.get('Content-Length') or len(respuesta.content))
+        BYTES_RECIBIDOS.inc(recibidos)
+
+        if respuesta.status_code == 304 and cacheada:
+            self._registrar_metricas('sin_cambios', duracion)
+            return Respuesta(cacheada['contenido'], True, 304, recibidos, intento + 1, duracion)
+
+        huella = hashlib.sha1(respuesta.content).hexdigest()
+        sin_cambios = bool(cacheada) and cacheada['hash'] == huella
+        self._recordar(url, respuesta, huella)
+        self._registrar_metricas('sin_cambios' if sin_cambios else 'descargada', duracion)
+        return Respuesta(respuesta.content, sin_cambios, respuesta.status_code, recibidos, intento + 1, duracion)
+
+    def _registrar_metricas(self, resultado, duracion):
+        PETICIONES.inc(resultado=resultado)
+        DURACION_PETICION.observar(duracion, resultado=resultado)
+        CIRCUITO_ABIERTO.fijar(int(self.circuito.estado == 'abierto'))
+
+    def resumen(self):
+        return {'circuito': self.circuito.resumen(), 'urls_cacheadas': len(self._cache)}
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+def obtener_cliente():
+    """Cliente compartido del proceso"""
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = ClienteHTTP()
+        return _cliente
@@ -0,0 +1,202 @@
+"""
+Cronología en vivo de los partidos detectados.
+
+Entre la detección y el resultado final, cada ciclo de scraping añade una
+observación compacta (minuto, marcador y cuotas 1X2) a cada partido pendiente que
+sigue en juego, para ver por ejemplo en qué minuto llegó el segundo gol.
+
+Se guarda fuera del almacén de partidos, en archivos append-only por fecha del partido:
+
+    data/cronologia/<fecha>.claves   un partido por línea (casa<TAB>visitante); su número de línea es su id
+    data/cronologia/<fecha>.bin      registros binarios de tamaño fijo (REGISTRO, 17 bytes):
+                                     instante, id, minuto, goles casa/visitante y cuotas en centésimas
+
+Cientos de partidos en vivo × ~20 observaciones al día ocupan unos cientos de KB y no
+tocan la base de datos ni /api/detector/un-gol. Solo se escribe una observación cuando
+algo cambió respecto a la anterior del mismo partido.
+
+Uso como script:
+    python cronologia.py 2026-01-13 "Equipo Casa" "Equipo Visitante"
+"""
+import os
+import struct
+import argparse
+import threading
+from datetime import datetime
+import almacen_partidos
+import metricas
+from almacen_partidos import clave_partido
+from bloqueo import BloqueoArchivo
+
+DIRECTORIO = os.path.join(almacen_partidos.DATA_DIR, 'cronologia')
+
+# instante (s), id del partido, minuto, goles casa, goles visitante, cuotas 1 X 2 (centésimas, 0 = sin cuota)
+REGISTRO = struct.Struct('<IIBBBHHH')
+
+OBSERVACIONES = metricas.contador(
+    'detector_cronologia_observaciones_total', 'Observaciones añadidas a la cronología de los partidos en seguimiento')
+
+def _centesimas(cuota):
+    try:
+        return min(round(float(cuota.replace(',', '.')) * 100), 0xFFFF)
+    except (AttributeError, ValueError):
+        return 0
+
+def _cuota(centesimas):
+    return centesimas / 100 if centesimas else None
+
+class Cronologia:
+    """Observaciones en vivo por partido, en registros de tamaño fijo por fecha"""
+
+    def __init__(self, directorio=DIRECTORIO):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        # Otro worker puede añadir partidos (actualización manual)
+        self._bloqueo = BloqueoArchivo(os.path.join(directorio, 'cronologia.lock'))
+        # Por fecha: {(casa, visitante): id} y bytes del archivo de claves ya leídos
+        self._ids = {}
+        self._leido = {}
+        # Última observación escrita de cada partido seguido en el ciclo anterior
+        self._ultimas = {}
+
+    def _ruta(self, fecha, extension):
+        return os.path.join(self.directorio, f"{fecha}{extension}")
+
+    def _cargar_ids(self, fecha):
+        """Ids de la fecha, leyendo solo las claves añadidas desde la última vez"""
+        ids = self._ids.setdefault(fecha, {})
+        try:
+            with open(self._ruta(fecha, '.claves'), 'rb') as f:
+                f.seek(self._leido.get(fecha, 0))
+                for linea in f:
+                    if not linea.endswith(b'\n'):
+                        # Línea a medio escribir por otro proceso
+                        break
+                    casa, visitante = linea[:-1].decode('utf-8').split('\t')
+                    ids[(casa, visitante)] = len(ids)
+                    self._leido[fecha] = self._leido.get(fecha, 0) + len(linea)
+        except FileNotFoundError:
+            pass
+        return ids
+
+    def registrar(self, snapshot, claves_seguidas):
+        """
+        Añade una observación por cada fila en vivo del snapshot cuyo partido está
+        en `claves_seguidas` (pendientes de resultado final). Devuelve las escritas.
+        """
+        fecha = snapshot['fecha']
+        observadas = {}
+        for fila in snapshot['filas']:
+            if not fila.en_vivo or fila.minuto is None or fila.goles_casa is None:
+                continue
+            clave = clave_partido(fecha, fila.equipo_casa, fila.equipo_visitante)
+            if clave in claves_seguidas:
+                observadas[clave] = (
+                    fila.minuto, fila.goles_casa, fila.goles_visitante,
+                    _centesimas(fila.cuota_casa), _centesimas(fila.cuota_empate), _centesimas(fila.cuota_visitante)
+                )
+
+        with self._lock:
+            nuevas = {c: o for c, o in observadas.items() if self._ultimas.get(c) != o}
+            if nuevas:
+                instante = int(datetime.now().timestamp())
+                with self._bloqueo:
+                    os.makedirs(self.directorio, exist_ok=True)
+                    ids = self._cargar_ids(fecha)
+                    claves_nuevas = []
+                    for (_, casa, visitante) in nuevas:
+                        if (casa, visitante) not in ids:
+                            ids[(casa, visitante)] = len(ids)
+                            claves_nuevas.append(f"{casa}\t{visitante}\n".encode('utf-8'))
+                    if claves_nuevas:
+                        contenido = b''.join(claves_nuevas)
+                        with open(self._ruta(fecha, '.claves'), 'ab') as f:
+                            f.write(contenido)
+                        self._leido[fecha] = self._leido.get(fecha, 0) + len(contenido)
+
+                    registros = b''.join(
+                        REGISTRO.pack(instante, ids[(casa, visitante)], *observacion)
+                        for (_, casa, visitante), observacion in nuevas.items()
+                    )
+                    with open(self._ruta(fecha, '.bin'), 'ab') as f:
+                        f.write(registros)
+                OBSERVACIONES.inc(len(nuevas))
+            # Solo se recuerdan los partidos de este ciclo: la memoria no crece con el día
+            self._ultimas = observadas
+        return len(nuevas)
+
+    def observaciones(self, fecha, equipo_casa, equipo_visitante):
+        """Observaciones de un partido en orden de captura"""
+        with self._lock, self._bloqueo:
+            id_partido = self._cargar_ids(fecha).get((equipo_casa, equipo_visitante))
+        if id_partido is None:
+            return []
+
+        try:
+            with open(self._ruta(fecha, '.bin'), 'rb') as f:
+                datos = f.read()
+        except FileNotFoundError:
+            return []
+        # Un registro incompleto al final (proceso interrumpido) se ignora
+        datos = memoryview(datos)[:len(datos) - len(datos) % REGISTRO.size]
+
+        resultado = []
+        for instante, id_registro, minuto, goles_casa, goles_visitante, casa, empate, visitante in REGISTRO.iter_unpack(datos):
+            if id_registro != id_partido:
+                continue
+            resultado.append({
+                'hora': datetime.fromtimestamp(instante).strftime('%Y-%m-%d %H:%M:%S'),
+                'minuto': minuto,
+                'goles_casa': goles_casa,
+                'goles_visitante': goles_visitante,
+                'cuota_casa': _cuota(casa),
+                'cuota_empate': _cuota(empate),
+                'cuota_visitante': _cuota(visitante)
+            })
+        return resultado
+
+    def tamano_bytes(self):
+        try:
+            return sum(os.path.getsize(os.path.join(self.directorio, n)) for n in os.listdir(self.directorio))
+        except FileNotFoundError:
+            return 0
+
+def cambios_marcador(observaciones):
+    """Observaciones en las que el marcador cambió respecto a la anterior (goles vistos en vivo)"""
+    cambios = []
+    for anterior, actual in zip(observaciones, observaciones[1:]):
+        if (actual['goles_casa'], actual['goles_visitante']) != (anterior['goles_casa'], anterior['goles_visitante']):
+            cambios.append({
+                'minuto': actual['minuto'],
+                'minuto_anterior': anterior['minuto'],
+                'goles_casa': actual['goles_casa'],
+                'goles_visitante': actual['goles_visitante']
+            })
+    return cambios
+
+_cronologia = None
+_cronologia_lock = threading.Lock()
+
+def obtener_cronologia():
+    """Cronología compartida del proceso"""
+    global _cronologia
+    with _cronologia_lock:
+        if _cronologia is None:
+            _cronologia = Cronologia()
+        return _cronologia
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cronología en vivo de un partido detectado')
+    parser.add_argument('fecha', help='Fecha del partido YYYY-MM-DD')
+    parser.add_argument('equipo_casa')
+    parser.add_argument('equipo_visitante')
+    args = parser.parse_args()
+
+    observaciones = obtener_cronologia().observaciones(args.fecha, args.equipo_casa, args.equipo_visitante)
+    if not observaciones:
+        print("📭 Sin observaciones para ese partido")
+    for o in observaciones:
+        cuotas = ' / '.join(f"{c:.2f}" if c else '-' for c in (o['cuota_casa'], o['cuota_empate'], o['cuota_visitante']))
+        print(f"{o['hora']}  {o['minuto']:>3}'  {o['goles_casa']}-{o['goles_visitante']}  {cuotas}")
+    for cambio in cambios_marcador(observaciones):
+        print(f"⚽ {cambio['goles_casa']}-{cambio['goles_visitante']} entre el minuto {cambio['minuto_anterior']} y el {cambio['minuto']}")
@@ -0,0 +1,201 @@
+"""
+Detectores declarativos de partidos en vivo.
+
+Cada detector es una regla con nombre: un conjunto de condiciones (clave: valor)
+sobre las filas en vivo de la página, y la línea de goles con la que se evalúa
+el resultado final. Cada uno tiene su propio almacén y sus propias estadísticas.
+
+El almacén guarda si el partido superó la línea de su detector en la columna
+`supero_1_5` (el nombre viene del detector original); la API y las exportaciones
+lo publican como `supero_linea` junto a `linea`, y solo los detectores con
+línea 1.5 conservan además `supero_1_5` (ver Detector.publicar_partido).
+
+Todos los detectores se evalúan en una sola pasada por el snapshot: los datos
+derivados de cada fila (goles, diferencia, favorito) se calculan una vez y cada
+regla solo añade unas comparaciones, así que un detector nuevo no cuesta otra
+descarga ni otro parseo.
+
+Condiciones disponibles (CONDICIONES):
+    minuto_min, minuto_max      minuto del partido (inclusive)
+    goles, goles_min, goles_max goles totales
+    diferencia                  diferencia de goles en valor absoluto
+    favorito                    'gana', 'empata' o 'pierde' (favorito: el de menor cuota)
+    cuota_favorito_max          cuota máxima del favorito
+
+Por defecto solo está activo el detector principal (un_gol): los demás, los de
+REGLAS y los añadidos o redefinidos con un JSON (DETECTOR_REGLAS=ruta, una lista de
+reglas como las de REGLAS), se activan con DETECTOR_ACTIVOS=un_gol,cero_cero_70.
+Cada detector activo suma su almacén, sus pendientes y sus descargas de resultados.
+"""
+import os
+import json
+import re
+from almacen_partidos import DETECTOR_PRINCIPAL
+
+REGLAS = [
+    {
+        'id': 'un_gol',
+        'nombre': '1 gol desde el minuto 60',
+        'condiciones': {'minuto_min': 60, 'goles': 1},
+        'linea': 1.5
+    },
+    {
+        'id': 'cero_cero_70',
+        'nombre': '0-0 desde el minuto 70',
+        'condiciones': {'minuto_min': 70, 'goles': 0},
+        'linea': 0.5
+    },
+    {
+        'id': 'favorito_pierde',
+        'nombre': 'Favorito (cuota hasta 2.00) perdiendo desde el minuto 60',
+        'condiciones': {'minuto_min': 60, 'favorito': 'pierde', 'cuota_favorito_max': 2.0},
+        'linea': 1.5
+    }
+]
+
+# Identificador usado en nombres de archivo y URLs
+PATRON_ID = re.compile(r'^[a-z0-9_]+$')
+
+def _cuota(texto):
+    try:
+        return float(texto.replace(',', '.'))
+    except (AttributeError, ValueError):
+        return None
+
+def contexto_fila(fila):
+    """Datos derivados de una fila en vivo, calculados una sola vez para todas las reglas"""
+    goles_casa = fila.goles_casa
+    goles_visitante = fila.goles_visitante
+    cuota_casa = _cuota(fila.cuota_casa)
+    cuota_visitante = _cuota(fila.cuota_visitante)
+
+    favorito = cuota_favorito = None
+    if cuota_casa is not None and cuota_visitante is not None and cuota_casa != cuota_visitante:
+        # Diferencia de goles desde el punto de vista del favorito
+        if cuota_casa < cuota_visitante:
+            ventaja, cuota_favorito = goles_casa - goles_visitante, cuota_casa
+        else:
+            ventaja, cuota_favorito = goles_visitante - goles_casa, cuota_visitante
+        favorito = 'gana' if ventaja > 0 else 'pierde' if ventaja < 0 else 'empata'
+
+    return {
+        'minuto': fila.minuto,
+        'goles': goles_casa + goles_visitante,
+        'diferencia': abs(goles_casa - goles_visitante),
+        'favorito': favorito,
+        'cuota_favorito': cuota_favorito
+    }
+
+# Condición: función (contexto, valor) -> bool
+CONDICIONES = {
+    'minuto_min': lambda c, v: c['minuto'] >= v,
+    'minuto_max': lambda c, v: c['minuto'] <= v,
+    'goles': lambda c, v: c['goles'] == v,
+    'goles_min': lambda c, v: c['goles'] >= v,
+    'goles_max': lambda c, v: c['goles'] <= v,
+    'diferencia': lambda c, v: c['diferencia'] == v,
+    'favorito': lambda c, v: c['favorito'] == v,
+    'cuota_favorito_max': lambda c, v: c['cuota_favorito'] is not None and c['cuota_favorito'] <= v
+}
+
+class Detector:
+    """Regla compilada: las condiciones se resuelven a funciones una sola vez"""
+
+    def __init__(self, id, nombre, condiciones, linea=1.5):
+        if not PATRON_ID.match(id):
+            raise ValueError(f"Id de detector inválido: {id!r} (solo minúsculas, dígitos y _)")
+        desconocidas = set(condiciones) - set(CONDICIONES)
+        if desconocidas:
+            raise ValueError(f"Condiciones desconocidas en {id}: {', '.join(sorted(desconocidas))}")
+        self.id = id
+        self.nombre = nombre
+        self.condiciones = dict(condiciones)
+        self.linea = linea
+        self._predicados = [(CONDICIONES[nombre], valor) for nombre, valor in condiciones.items()]
+
+    @property
+    def minuto_min(self):
+        return self.condiciones.get('minuto_min', 0)
+
+    def cumple(self, contexto):
+        for predicado, valor in self._predicados:
+            if not predicado(contexto, valor):
+                return False
+        return True
+
+    def supera_linea(self, goles_finales):
+        return goles_finales > self.linea
+
+    def descripcion(self):
+        return {'id': self.id, 'nombre': self.nombre, 'condiciones': self.condiciones, 'linea': self.linea}
+
+    def publicar_partido(self, partido):
+        """
+        Partido del almacén tal como lo sirve la API: `supero_linea` y `linea` en lugar de
+        la columna `supero_1_5`, que solo se conserva si la línea del detector es 1.5
+        """
+        publicado = dict(partido)
+        if self.linea == 1.5:
+            supero = publicado.get('supero_1_5')
+        else:
+            supero = publicado.pop('supero_1_5', None)
+        publicado['linea'] = self.linea
+        publicado['supero_linea'] = supero
+        return publicado
+
+    def publicar_estadisticas(self, estadisticas):
+        """Bloque de estadísticas con `supero_linea` / `no_supero_linea` (como publicar_partido)"""
+        publicado = dict(estadisticas)
+        for clave in ('supero', 'no_supero'):
+            if f"{clave}_1_5" not in publicado:
+                continue
+            if self.linea == 1.5:
+                publicado[f"{clave}_linea"] = publicado[f"{clave}_1_5"]
+            else:
+                publicado[f"{clave}_linea"] = publicado.pop(f"{clave}_1_5")
+        publicado['linea'] = self.linea
+        return publicado
+
+def cargar_reglas(ruta=None):
+    """REGLAS más las del JSON `ruta` (una regla con el mismo id reemplaza a la original)"""
+    reglas = {regla['id']: regla for regla in REGLAS}
+    if ruta:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            for regla in json.load(f):
+                reglas[regla['id']] = regla
+    return [Detector(r['id'], r.get('nombre', r['id']), r['condiciones'], r.get('linea', 1.5)) for r in reglas.values()]
+
+def _activos():
+    detectores = cargar_reglas(os.environ.get('DETECTOR_REGLAS'))
+    nombres = os.environ.get('DETECTOR_ACTIVOS', '')
+    elegidos = {n.strip() for n in nombres.split(',') if n.strip()} | {DETECTOR_PRINCIPAL}
+    desconocidos = elegidos - {d.id for d in detectores}
+    if desconocidos:
+        raise ValueError(f"DETECTOR_ACTIVOS incluye detectores sin regla: {', '.join(sorted(desconocidos))}")
+    return [d for d in detectores if d.id in elegidos]
+
+# Solo el principal salvo que DETECTOR_ACTIVOS añada otros; siempre está activo
+# porque el panel y /api/detector/un-gol lo usan
+ACTIVOS = _activos()
+POR_ID = {d.id: d for d in ACTIVOS}
+# Minuto desde el que algún detector puede disparar (ventana del planificador)
+MINUTO_MINIMO = min(d.minuto_min for d in ACTIVOS)
+
+def obtener(detector_id):
+    """Detector activo con ese id; KeyError si no existe"""
+    return POR_ID[detector_id]
+
+def evaluar(filas):
+    """
+    Una sola pasada por las filas: {id del detector: [filas que cumplen su regla]}.
+    Solo se consideran filas en vivo con minuto y marcador.
+    """
+    coincidencias = {d.id: [] for d in ACTIVOS}
+    for fila in filas:
+        if not fila.en_vivo or not fila.minuto or fila.goles_casa is None:
+            continue
+        contexto = contexto_fila(fila)
+        for detector in ACTIVOS:
+            if detector.cumple(contexto):
+                coincidencias[detector.id].append(fila)
+    return coincidencias
@@ -0,0 +1,181 @@
+"""
+Canal de eventos en tiempo real (Server-Sent Events).
+
+Un hilo vigilante por proceso sigue la revisión del almacén y, cuando avanza,
+lee los cambios una sola vez y los guarda en un buffer circular. Los suscriptores
+SSE solo leen de ese buffer: el coste por cambio no depende del número de clientes
+y funciona aunque el scraping se ejecute en otro proceso.
+
+El scraping llama a notificar() después de escribir para que el vigilante no
+espere al siguiente sondeo.
+"""
+import os
+import json
+import time
+import threading
+from collections import deque
+import almacen_partidos
+import detectores
+
+# Segundos entre consultas de la revisión del almacén (si nadie notifica antes)
+INTERVALO_VIGILANCIA = 2
+# Comentario keep-alive para que proxies y navegador no cierren la conexión
+INTERVALO_PING = 15
+# Cada conexión se cierra tras este tiempo; EventSource reconecta con Last-Event-ID
+DURACION_MAXIMA = 600
+# Cada suscriptor ocupa un hilo del worker (gunicorn --threads) durante toda la conexión.
+# DETECTOR_HILOS debe coincidir con --threads (el Procfile usa la misma variable) y
+# HILOS_RESERVADOS quedan siempre libres para /health, /ready y la API; por encima de
+# MAX_SUSCRIPTORES se responde 503 y el cliente hace polling
+HILOS_WORKER = int(os.environ.get('DETECTOR_HILOS', 64))
+HILOS_RESERVADOS = 16
+MAX_SUSCRIPTORES = max(HILOS_WORKER - HILOS_RESERVADOS, 0)
+# Eventos recientes que se pueden reenviar a un cliente que reconecta
+MAX_EVENTOS = 500
+# Milisegundos que espera EventSource antes de reconectar
+RETRY_MS = 5000
+
+def formatear_evento(revision, tipo, datos):
+    """Texto SSE de un evento"""
+    return f"id: {revision}\nevent: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+class CanalEventos:
+    """Difusión de detecciones y resultados finales a los suscriptores SSE del proceso"""
+
+    def __init__(self):
+        self._condicion = threading.Condition()
+        self._eventos = deque()
+        self._revision = None
+        # Revisión más reciente descartada del buffer: cursores menores deben recargar
+        self._minima = 0
+        # Veces que el almacén se limpió o se reemplazó: los suscriptores conectados recargan
+        self._reinicios = 0
+        self._despertar = threading.Event()
+        self._hilo = None
+        self.suscriptores = 0
+
+    def iniciar(self):
+        """Arranca el hilo vigilante (una vez por proceso)"""
+        with self._condicion:
+            if self._hilo is not None:
+                return
+            self._revision = almacen_partidos.obtener_almacen().revision()
+            self._minima = self._revision
+            self._hilo = threading.Thread(target=self._vigilar, name='vigilante-eventos', daemon=True)
+            self._hilo.start()
+
+    def notificar(self):
+        """Avisa de que el almacén cambió (evita esperar al siguiente sondeo)"""
+        self._despertar.set()
+
+    def reservar(self):
+        """
+        Ocupa un hueco de suscriptor si queda alguno (comprobar y contar a la vez, para
+        que peticiones simultáneas no superen MAX_SUSCRIPTORES). Devuelve False si no.
+        Cada reserva se devuelve con liberar() al cerrar la respuesta.
+        """
+        with self._condicion:
+            if self.suscriptores >= MAX_SUSCRIPTORES:
+                return False
+            self.suscriptores += 1
+            return True
+
+    def liberar(self):
+        with self._condicion:
+            self.suscriptores -= 1
+
+    def _vigilar(self):
+        while True:
+            self._despertar.wait(INTERVALO_VIGILANCIA)
+            self._despertar.clear()
+            try:
+                self._leer_cambios()
+            except Exception as e:
+                print(f"⚠️ Error leyendo cambios para eventos: {e}")
+
+    def _leer_cambios(self):
+        cambios = almacen_partidos.obtener_almacen().cambios_desde(self._revision)
+        if cambios['cursor'] == self._revision and not cambios['reiniciar']:
+            return
+
+        nuevos = []
+        if not cambios['reiniciar']:
+            regla = detectores.obtener(almacen_partidos.DETECTOR_PRINCIPAL)
+            for partido in cambios['partidos']:
+                tipo = {'FINALIZADO': 'finalizado', almacen_partidos.SIN_RESULTADO: 'sin_resultado'}.get(
+                    partido.get('estado'), 'detectado')
+                # Mismos campos que /api/detector/cambios
+                nuevos.append((partido['revision'], tipo, regla.publicar_partido(partido)))
+
+        with self._condicion:
+            if cambios['reiniciar']:
+                # Almacén limpiado o reemplazado: el buffer ya no sirve, los cursores
+                # anteriores deben recargar y los suscriptores conectados también
+                self._eventos.clear()
+                self._minima = cambios['cursor']
+                self._reinicios += 1
+            for evento in nuevos:
+                if len(self._eventos) >= MAX_EVENTOS:
+                    self._minima = self._eventos.popleft()[0]
+                self._eventos.append(evento)
+            self._revision = cambios['cursor']
+            self._condicion.notify_all()
+
+        for _, tipo, datos in nuevos:
+            print(f"📡 Evento {tipo}: {datos['equipo_casa']} vs {datos['equipo_visitante']}")
+
+    def _reiniciar(self):
+        return (self._revision, 'reiniciar', {'cursor': self._revision})
+
+    def _pendientes(self, cursor):
+        if cursor < self._minima:
+            return [self._reiniciar()]
+        return [e for e in self._eventos if e[0] > cursor]
+
+    def suscribir(self, cursor=None):
+        """
+        Generador con el texto SSE para un suscriptor, a partir de `cursor`.
+        El hueco se reserva antes con reservar() y se libera al cerrar la respuesta
+        (así se libera aunque el generador no llegue a empezar).
+        """
+        self.iniciar()
+        yield f"retry: {RETRY_MS}\n\n"
+        with self._condicion:
+            reinicios = self._reinicios
+            if cursor is None:
+                cursor = self._revision
+            adelantado = cursor > self._revision
+        # Un cursor por delante del vigilante suele ser solo que aún no leyó la última
+        # escritura; si también va por delante del almacén (limpiado, directorio de datos
+        # reemplazado) el cliente debe recargar, igual que `reiniciar` en /api/detector/cambios
+        if adelantado and almacen_partidos.obtener_almacen().revision() < cursor:
+            with self._condicion:
+                evento = self._reiniciar()
+            yield formatear_evento(*evento)
+            cursor = evento[0]
+
+        fin = time.monotonic() + DURACION_MAXIMA
+        while time.monotonic() < fin:
+            with self._condicion:
+                if self._revision <= cursor and self._reinicios == reinicios:
+                    self._condicion.wait(INTERVALO_PING)
+                if self._reinicios != reinicios:
+                    # El almacén se limpió o se reemplazó durante la conexión
+                    reinicios = self._reinicios
+                    pendientes = [self._reiniciar()]
+                    cursor = self._revision
+                else:
+                    pendientes = self._pendientes(cursor)
+                revision = self._revision
+
+            for evento in pendientes:
+                yield formatear_evento(*evento)
+            if not pendientes and revision <= cursor:
+                yield ": ping\n\n"
+            # La revisión puede avanzar sin partidos que enviar (solo metadatos)
+            cursor = max(cursor, revision)
+
+canal = CanalEventos()
+
+def notificar():
+    canal.notificar()
@@ -0,0 +1,296 @@
+"""
+Extracción de las filas `a.game` de la página de Primatips.
+
+Motores disponibles (variable de entorno DETECTOR_PARSER):
+- lxml:      árbol lxml y un solo recorrido por fila (por defecto, el más rápido)
+- strainer:  BeautifulSoup con parser lxml que solo construye las filas `a.game`
+- bs4:       BeautifulSoup con html.parser sobre la página completa (extracción original,
+             referencia para comparar los demás motores)
+
+Todos devuelven registros FilaPartido con los mismos campos y valores.
+"""
+import os
+import re
+from typing import NamedTuple, Optional
+import lxml.html
+from lxml.etree import ParserError
+from bs4 import BeautifulSoup, SoupStrainer
+
+MOTOR_POR_DEFECTO = os.environ.get('DETECTOR_PARSER', 'lxml')
+
+# Selección de filas sin depender de cssselect
+XPATH_FILAS = "//a[contains(concat(' ', normalize-space(@class), ' '), ' game ')]"
+# Durante el parseo SoupStrainer ve el atributo class sin separar ("game live")
+CLASE_FILA = re.compile(r'(^|\s)game(\s|$)')
+
+class FilaPartido(NamedTuple):
+    """Datos de una fila `a.game` de la página del día"""
+    hora: str
+    liga: str
+    equipo_casa: str
+    equipo_visitante: str
+    cuota_casa: str
+    cuota_empate: str
+    cuota_visitante: str
+    prob_casa: str
+    prob_empate: str
+    prob_visitante: str
+    tip: str
+    en_vivo: bool
+    minuto: Optional[int]
+    goles_casa: Optional[int]
+    goles_visitante: Optional[int]
+    finalizado: bool
+    goles_finales_casa: Optional[int]
+    goles_finales_visitante: Optional[int]
+
+def obtener_minuto_partido(texto_minuto):
+    """Extrae el minuto actual del partido del texto"""
+    if not texto_minuto:
+        return None
+
+    # Buscar patrones como "65'" o "90'+3"
+    match = re.search(r'(\d+)', texto_minuto)
+    if match:
+        return int(match.group(1))
+    return None
+
+# --- BeautifulSoup (motores bs4 y strainer) ---
+
+def _texto(elemento):
+    return elemento.get_text(strip=True) if elemento else ''
+
+def extraer_fila(partido):
+    """
+    Extrae todos los datos de una fila `a.game` (Tag de BeautifulSoup) en un diccionario.
+    Devuelve None si la fila no tiene los dos equipos.
+    """
+    equipos = partido.find('span', class_='nms')
+    if not equipos:
+        return None
+
+    nombres = equipos.find_all('span', class_='nm')
+    if len(nombres) < 2:
+        return None
+
+    # Nombre completo de la liga (si existe) o abreviatura
+    liga_texto = _texto(partido.find('span', class_='cn'))
+    liga_completa = partido.find('span', class_='fl')
+    if liga_completa:
+        img = liga_completa.find('img')
+        if img and img.get('title'):
+            liga_texto = img.get('title')
+
+    cuotas = partido.find_all('span', class_='o')
+    probs = partido.find_all('span', class_='t')
+
+    fila = {
+        'hora': _texto(partido.find('span', class_='tm')),
+        'liga': liga_texto,
+        'equipo_casa': nombres[0].get_text(strip=True),
+        'equipo_visitante': nombres[1].get_text(strip=True),
+        'cuota_casa': _texto(cuotas[0]) if len(cuotas) > 0 else '',
+        'cuota_empate': _texto(cuotas[1]) if len(cuotas) > 1 else '',
+        'cuota_visitante': _texto(cuotas[2]) if len(cuotas) > 2 else '',
+        'prob_casa': _texto(probs[0]) if len(probs) > 0 else '',
+        'prob_empate': _texto(probs[1]) if len(probs) > 1 else '',
+        'prob_visitante': _texto(probs[2]) if len(probs) > 2 else '',
+        'tip': _texto(partido.find('span', class_='tip')),
+        'en_vivo': False,
+        'minuto': None,
+        'goles_casa': None,
+        'goles_visitante': None,
+        'finalizado': False,
+        'goles_finales_casa': None,
+        'goles_finales_visitante': None
+    }
+
+    resultado = partido.find('span', class_='res')
+    if not resultado:
+        return fila
+
+    clases = resultado.get('class', [])
+
+    # Partido en vivo (clase 'lv'): minuto y marcador actual
+    if 'lv' in clases:
+        fila['en_vivo'] = True
+        minuto_elemento = resultado.find('span', class_='lvs')
+        if minuto_elemento:
+            fila['minuto'] = obtener_minuto_partido(minuto_elemento.get_text(strip=True))
+        goles = resultado.find_all('span', class_='l')
+        if len(goles) >= 2:
+            fila['goles_casa'] = int(goles[0].get_text(strip=True) or 0)
+            fila['goles_visitante'] = int(goles[1].get_text(strip=True) or 0)
+
+    # Partido finalizado (clase 'rsl'): marcador final
+    if 'rsl' in clases:
+        goles = resultado.find_all('span', class_='r')
+        if len(goles) >= 2:
+            fila['finalizado'] = True
+            fila['goles_finales_casa'] = int(goles[0].get_text(strip=True) or 0)
+            fila['goles_finales_visitante'] = int(goles[1].get_text(strip=True) or 0)
+
+    return fila
+
+def extraer_fila_bs4(partido):
+    """extraer_fila como FilaPartido"""
+    fila = extraer_fila(partido)
+    return FilaPartido(**fila) if fila else None
+
+# --- lxml ---
+
+def _clases(elemento):
+    return (elemento.get('class') or '').split()
+
+def _texto_lxml(elemento):
+    """Equivalente a get_text(strip=True) de BeautifulSoup"""
+    if elemento is None:
+        return ''
+    return ''.join(t.strip() for t in elemento.itertext())
+
+def _spans(elemento, clase):
+    return [s for s in elemento.iter('span') if clase in _clases(s)]
+
+def _primero(elemento, clase):
+    for s in elemento.iter('span'):
+        if clase in _clases(s):
+            return s
+    return None
+
+def extraer_fila_lxml(partido):
+    """
+    Misma extracción que extraer_fila sobre un elemento lxml.
+    Un solo recorrido por los span de la fila clasifica todo lo que se necesita.
+    """
+    nms = fl = cn = tm = tip = res = None
+    cuotas = []
+    probs = []
+
+    for span in partido.iter('span'):
+        for clase in _clases(span):
+            if clase == 'o':
+                cuotas.append(span)
+            elif clase == 't':
+                probs.append(span)
+            elif clase == 'nms' and nms is None:
+                nms = span
+            elif clase == 'fl' and fl is None:
+                fl = span
+            elif clase == 'cn' and cn is None:
+                cn = span
+            elif clase == 'tm' and tm is None:
+                tm = span
+            elif clase == 'tip' and tip is None:
+                tip = span
+            elif clase == 'res' and res is None:
+                res = span
+
+    if nms is None:
+        return None
+    nombres = _spans(nms, 'nm')
+    if len(nombres) < 2:
+        return None
+
+    liga_texto = _texto_lxml(cn)
+    if fl is not None:
+        img = next(fl.iter('img'), None)
+        if img is not None and img.get('title'):
+            liga_texto = img.get('title')
+
+    en_vivo = finalizado = False
+    minuto = goles_casa = goles_visitante = None
+    goles_finales_casa = goles_finales_visitante = None
+
+    if res is not None:
+        clases = _clases(res)
+
+        if 'lv' in clases:
+            en_vivo = True
+            minuto_elemento = _primero(res, 'lvs')
+            if minuto_elemento is not None:
+                minuto = obtener_minuto_partido(_texto_lxml(minuto_elemento))
+            goles = _spans(res, 'l')
+            if len(goles) >= 2:
+                goles_casa = int(_texto_lxml(goles[0]) or 0)
+                goles_visitante = int(_texto_lxml(goles[1]) or 0)
+
+        if 'rsl' in clases:
+            goles = _spans(res, 'r')
+            if len(goles) >= 2:
+                finalizado = True
+                goles_finales_casa = int(_texto_lxml(goles[0]) or 0)
+                goles_finales_visitante = int(_texto_lxml(goles[1]) or 0)
+
+    return FilaPartido(
+        hora=_texto_lxml(tm),
+        liga=liga_texto,
+        equipo_casa=_texto_lxml(nombres[0]),
+        equipo_visitante=_texto_lxml(nombres[1]),
+        cuota_casa=_texto_lxml(cuotas[0]) if len(cuotas) > 0 else '',
+        cuota_empate=_texto_lxml(cuotas[1]) if len(cuotas) > 1 else '',
+        cuota_visitante=_texto_lxml(cuotas[2]) if len(cuotas) > 2 else '',
+        prob_casa=_texto_lxml(probs[0]) if len(probs) > 0 else '',
+        prob_empate=_texto_lxml(probs[1]) if len(probs) > 1 else '',
+        prob_visitante=_texto_lxml(probs[2]) if len(probs) > 2 else '',
+        tip=_texto_lxml(tip),
+        en_vivo=en_vivo,
+        minuto=minuto,
+        goles_casa=goles_casa,
+        goles_visitante=goles_visitante,
+        finalizado=finalizado,
+        goles_finales_casa=goles_finales_casa,
+        goles_finales_visitante=goles_finales_visitante
+    )
+
+def _documento_lxml(html):
+    # La página es UTF-8; si no lo fuera, lxml detecta la codificación de los bytes
+    if isinstance(html, bytes):
+        try:
+            html = html.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+    try:
+        return lxml.html.document_fromstring(html)
+    except ParserError:
+        # Documento vacío
+        return None
+
+# --- Motores ---
+
+def _filas_bs4(html):
+    return BeautifulSoup(html, 'html.parser').find_all('a', class_='game')
+
+def _filas_strainer(html):
+    return BeautifulSoup(html, 'lxml', parse_only=SoupStrainer('a', class_=CLASE_FILA)).find_all('a', class_='game')
+
+def _filas_lxml(html):
+    documento = _documento_lxml(html)
+    return documento.xpath(XPATH_FILAS) if documento is not None else []
+
+# Motor: (filas `a.game` de la página, extracción de una fila)
+MOTORES = {
+    'lxml': (_filas_lxml, extraer_fila_lxml),
+    'strainer': (_filas_strainer, extraer_fila_bs4),
+    'bs4': (_filas_bs4, extraer_fila_bs4)
+}
+
+def extraer_filas(html, motor=None):
+    """
+    Lista de FilaPartido de la página. Las filas sin los dos equipos se omiten;
+    una fila con datos inválidos se avisa y se salta sin detener el resto.
+    """
+    motor = motor or MOTOR_POR_DEFECTO
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de extracción desconocido: {motor} (opciones: {', '.join(MOTORES)})")
+
+    buscar_filas, extraer = MOTORES[motor]
+    filas = []
+    for partido in buscar_filas(html):
+        try:
+            fila = extraer(partido)
+        except Exception as e:
+            print(f"⚠️ Error procesando partido: {e}")
+            continue
+        if fila:
+            filas.append(fila)
+    return filas
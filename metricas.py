@@ -0,0 +1,237 @@
+"""
+Métricas del detector en el formato de texto de Prometheus (GET /metrics).
+
+Contadores, medidores e histogramas con etiquetas, sin dependencias externas.
+Cada módulo declara las suyas con contador() / medidor() / histograma().
+
+Con varios workers cada proceso publica sus valores en data/metricas/<pid>.json
+(temporal + rename atómico) cada INTERVALO_PUBLICACION segundos, y /metrics suma
+los de todos los procesos: el scraping corre en un solo worker y la API en todos.
+Los archivos que no se actualizan en CADUCIDAD segundos (procesos terminados)
+se ignoran y se borran.
+"""
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from apscheduler.triggers.interval import IntervalTrigger
+import almacen_partidos
+
+DIRECTORIO = os.path.join(almacen_partidos.DATA_DIR, 'metricas')
+INTERVALO_PUBLICACION = 15
+CADUCIDAD = 120
+
+# Segundos: de una lectura del almacén a una descarga lenta con reintentos
+CUBOS_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_metricas = OrderedDict()
+_registro_lock = threading.Lock()
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _numero(valor):
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+def _linea(nombre, etiquetas, valor):
+    if etiquetas:
+        texto = ','.join(f'{clave}="{_escapar(v)}"' for clave, v in etiquetas)
+        return f"{nombre}{{{texto}}} {_numero(valor)}"
+    return f"{nombre} {_numero(valor)}"
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas):
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}, no {tuple(etiquetas)}")
+        return tuple(str(etiquetas[e]) for e in self.etiquetas)
+
+    def exportar(self):
+        with self._lock:
+            valores = [[list(clave), valor] for clave, valor in self._valores.items()]
+        return {'tipo': self.tipo, 'ayuda': self.ayuda, 'etiquetas': list(self.etiquetas), 'valores': valores}
+
+class Contador(_Metrica):
+    """Valor que solo crece (peticiones, bytes, errores)"""
+    tipo = 'counter'
+
+    def inc(self, valor=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+class Medidor(_Metrica):
+    """Valor instantáneo (filas del último snapshot, estado del circuito)"""
+    tipo = 'gauge'
+
+    def fijar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = valor
+
+class Histograma(_Metrica):
+    """Distribución de observaciones en cubos acumulados, con suma y número"""
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), cubos=CUBOS_DURACION):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.cubos = tuple(sorted(cubos))
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            # [observaciones por cubo..., suma, número]
+            estado = self._valores.get(clave)
+            if estado is None:
+                estado = self._valores[clave] = [0] * len(self.cubos) + [0, 0]
+            for i, limite in enumerate(self.cubos):
+                if valor <= limite:
+                    estado[i] += 1
+                    break
+            estado[-2] += valor
+            estado[-1] += 1
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        """Observa la duración del bloque (también si lanza una excepción)"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def exportar(self):
+        datos = super().exportar()
+        datos['cubos'] = list(self.cubos)
+        return datos
+
+def _registrar(clase, nombre, *args, **kwargs):
+    with _registro_lock:
+        if nombre not in _metricas:
+            _metricas[nombre] = clase(nombre, *args, **kwargs)
+        return _metricas[nombre]
+
+def contador(nombre, ayuda, etiquetas=()):
+    return _registrar(Contador, nombre, ayuda, etiquetas)
+
+def medidor(nombre, ayuda, etiquetas=()):
+    return _registrar(Medidor, nombre, ayuda, etiquetas)
+
+def histograma(nombre, ayuda, etiquetas=(), cubos=CUBOS_DURACION):
+    return _registrar(Histograma, nombre, ayuda, etiquetas, cubos)
+
+def exportar():
+    """Valores de este proceso, serializables en JSON"""
+    with _registro_lock:
+        metricas = list(_metricas.values())
+    return {
+        'pid': os.getpid(),
+        'publicado': time.time(),
+        'metricas': {m.nombre: m.exportar() for m in metricas}
+    }
+
+# ----------------------------------------------------------------------
+# Varios procesos
+# ----------------------------------------------------------------------
+
+def publicar():
+    """Escribe los valores de este proceso para que los lean los demás workers"""
+    try:
+        os.makedirs(DIRECTORIO, exist_ok=True)
+        ruta = os.path.join(DIRECTORIO, f"{os.getpid()}.json")
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(exportar(), f)
+        os.replace(temporal, ruta)
+    except OSError as e:
+        print(f"⚠️ No se pudieron publicar las métricas: {e}")
+
+def _publicadas_por_otros():
+    try:
+        nombres = os.listdir(DIRECTORIO)
+    except FileNotFoundError:
+        return []
+
+    ahora = time.time()
+    propio = f"{os.getpid()}.json"
+    exportaciones = []
+    for nombre in nombres:
+        if not nombre.endswith('.json') or nombre == propio:
+            continue
+        ruta = os.path.join(DIRECTORIO, nombre)
+        try:
+            if ahora - os.path.getmtime(ruta) > CADUCIDAD:
+                os.remove(ruta)
+                continue
+            with open(ruta, 'r', encoding='utf-8') as f:
+                exportaciones.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            # Borrado o reemplazado por otro proceso mientras se leía
+            continue
+    return exportaciones
+
+def combinar(exportaciones):
+    """
+    Suma contadores e histogramas de varios procesos; de cada medidor vale
+    el valor publicado más recientemente.
+    """
+    combinadas = OrderedDict()
+    for exportacion in sorted(exportaciones, key=lambda e: e['publicado']):
+        for nombre, datos in exportacion['metricas'].items():
+            destino = combinadas.setdefault(nombre, {**datos, 'valores': OrderedDict()})
+            valores = destino['valores']
+            for etiquetas, valor in datos['valores']:
+                clave = tuple(etiquetas)
+                if datos['tipo'] == 'gauge' or clave not in valores:
+                    valores[clave] = list(valor) if isinstance(valor, list) else valor
+                elif datos['tipo'] == 'histogram':
+                    valores[clave] = [a + b for a, b in zip(valores[clave], valor)]
+                else:
+                    valores[clave] += valor
+    return combinadas
+
+def formatear(combinadas):
+    """Formato de exposición de texto de Prometheus (versión 0.0.4)"""
+    lineas = []
+    for nombre, datos in combinadas.items():
+        lineas.append(f"# HELP {nombre} {datos['ayuda']}")
+        lineas.append(f"# TYPE {nombre} {datos['tipo']}")
+        for clave, valor in sorted(datos['valores'].items()):
+            etiquetas = list(zip(datos['etiquetas'], clave))
+            if datos['tipo'] != 'histogram':
+                lineas.append(_linea(nombre, etiquetas, valor))
+                continue
+            acumulado = 0
+            for limite, observaciones in zip(datos['cubos'], valor):
+                acumulado += observaciones
+                lineas.append(_linea(f"{nombre}_bucket", etiquetas + [('le', _numero(limite))], acumulado))
+            lineas.append(_linea(f"{nombre}_bucket", etiquetas + [('le', '+Inf')], valor[-1]))
+            lineas.append(_linea(f"{nombre}_sum", etiquetas, valor[-2]))
+            lineas.append(_linea(f"{nombre}_count", etiquetas, valor[-1]))
+    return '\n'.join(lineas) + '\n'
+
+def texto_prometheus():
+    """Métricas de todos los procesos del despliegue, listas para servir en /metrics"""
+    return formatear(combinar([exportar()] + _publicadas_por_otros()))
+
+def programar_publicacion(scheduler):
+    """Publica las métricas de este proceso periódicamente en `scheduler`"""
+    scheduler.add_job(
+        func=publicar,
+        trigger=IntervalTrigger(seconds=INTERVALO_PUBLICACION),
+        id='publicar_metricas',
+        name='Publicación de métricas',
+        replace_existing=True
+    )
@@ -0,0 +1,166 @@
+"""
+Planificador adaptativo del scraping.
+
+En vez de un intervalo fijo, la próxima ejecución se calcula a partir del
+último snapshot:
+- Partidos en vivo dentro de la ventana 60-90: sondeo rápido (el inicio es el
+  menor minuto_min de los detectores activos).
+- Partidos detectados sin resultado final que siguen en juego: sondeo frecuente.
+- Partidos en vivo antes del minuto 60: se espera hasta que el primero llegue.
+- Sin partidos en vivo: espera larga (un partido que aún no empezó tarda
+  más de una hora en llegar al minuto 60).
+- Errores de descarga: espera exponencial.
+
+A cada intervalo se le aplica jitter y un mínimo entre ejecuciones.
+Todas las decisiones quedan en un historial consultable.
+"""
+import random
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+import almacen_partidos
+import detectores
+from almacen_partidos import clave_partido
+
+MINUTO_INICIO_VENTANA = detectores.MINUTO_MINIMO
+MINUTO_FIN_VENTANA = 90
+# Minutos reales de descanso entre la primera y la segunda parte
+MINUTOS_DESCANSO = 15
+
+# Intervalos en segundos
+INTERVALO_VENTANA = 60
+INTERVALO_PENDIENTES = 120
+INTERVALO_SIN_PARTIDOS = 30 * 60
+INTERVALO_ERROR = 5 * 60
+# Límite de frecuencia: nunca dos ejecuciones más cerca que esto
+MIN_INTERVALO = 45
+MAX_INTERVALO = 30 * 60
+# Fracción de jitter (+/-) para no sondear siempre en el mismo segundo
+JITTER = 0.1
+
+MAX_DECISIONES = 50
+
+def minutos_hasta_ventana(minuto):
+    """Minutos reales que faltan para que un partido en vivo llegue al minuto 60"""
+    if minuto is None:
+        # Sin minuto (descanso u otro texto): se asume el descanso completo
+        return MINUTOS_DESCANSO + (MINUTO_INICIO_VENTANA - 45)
+    restante = max(MINUTO_INICIO_VENTANA - minuto, 0)
+    if minuto < 45:
+        restante += MINUTOS_DESCANSO
+    return restante
+
+def analizar_snapshot(snapshot, claves_pendientes):
+    """Cuenta los partidos en vivo por fase y los pendientes que siguen en juego"""
+    resumen = {
+        'en_vivo': 0,
+        'en_ventana': 0,
+        'antes_de_ventana': 0,
+        'pendientes_en_juego': 0,
+        'minutos_hasta_ventana': None
+    }
+
+    for fila in snapshot['filas']:
+        if not fila.en_vivo or fila.finalizado:
+            continue
+
+        resumen['en_vivo'] += 1
+        minuto = fila.minuto
+
+        if minuto is not None and MINUTO_INICIO_VENTANA <= minuto <= MINUTO_FIN_VENTANA:
+            resumen['en_ventana'] += 1
+        elif minuto is None or minuto < MINUTO_INICIO_VENTANA:
+            resumen['antes_de_ventana'] += 1
+            faltan = minutos_hasta_ventana(minuto)
+            if resumen['minutos_hasta_ventana'] is None or faltan < resumen['minutos_hasta_ventana']:
+                resumen['minutos_hasta_ventana'] = faltan
+
+        if clave_partido(snapshot['fecha'], fila.equipo_casa, fila.equipo_visitante) in claves_pendientes:
+            resumen['pendientes_en_juego'] += 1
+
+    return resumen
+
+def intervalo_base(resumen):
+    """Intervalo (segundos) y motivo según el estado de los partidos"""
+    if resumen['en_ventana']:
+        return INTERVALO_VENTANA, f"{resumen['en_ventana']} partidos en la ventana 60-90"
+    if resumen['pendientes_en_juego']:
+        return INTERVALO_PENDIENTES, f"{resumen['pendientes_en_juego']} detectados sin resultado final"
+    if resumen['antes_de_ventana']:
+        return (
+            resumen['minutos_hasta_ventana'] * 60,
+            f"{resumen['antes_de_ventana']} partidos en vivo, el primero llega al 60' en ~{resumen['minutos_hasta_ventana']} min"
+        )
+    return INTERVALO_SIN_PARTIDOS, 'sin partidos en vivo'
+
+class Planificador:
+    """Calcula la próxima ejecución y guarda el historial de decisiones"""
+
+    def __init__(self, semilla=None):
+        self._lock = threading.Lock()
+        self._aleatorio = random.Random(semilla)
+        self._decisiones = deque(maxlen=MAX_DECISIONES)
+        self._errores_seguidos = 0
+        self._ultima_ejecucion = None
+
+    def registrar_ejecucion(self, ahora=None):
+        with self._lock:
+            self._ultima_ejecucion = ahora or datetime.now()
+
+    def siguiente(self, snapshot, ahora=None):
+        """
+        Decide cuándo volver a ejecutar a partir del último snapshot
+        (None si la descarga falló). Devuelve la decisión completa.
+        """
+        ahora = ahora or datetime.now()
+
+        if snapshot is None:
+            resumen = None
+            with self._lock:
+                self._errores_seguidos += 1
+                errores = self._errores_seguidos
+            base = INTERVALO_ERROR * 2 ** (errores - 1)
+            motivo = f"error de descarga ({errores} seguidos)"
+        else:
+            with self._lock:
+                self._errores_seguidos = 0
+            # Pendientes de todos los detectores
+            pendientes = []
+            for detector in detectores.ACTIVOS:
+                try:
+                    pendientes.extend(almacen_partidos.obtener_almacen(detector.id).pendientes())
+                except Exception as e:
+                    print(f"⚠️ Error leyendo pendientes de {detector.id}: {e}")
+            claves = {almacen_partidos.clave_de(p) for p in pendientes}
+            resumen = analizar_snapshot(snapshot, claves)
+            base, motivo = intervalo_base(resumen)
+
+        base = min(max(base, MIN_INTERVALO), MAX_INTERVALO)
+
+        with self._lock:
+            jitter = self._aleatorio.uniform(-JITTER, JITTER) * base
+            intervalo = min(max(base + jitter, MIN_INTERVALO), MAX_INTERVALO)
+
+            # Límite de frecuencia respecto a la última ejecución real
+            proxima = ahora + timedelta(seconds=intervalo)
+            if self._ultima_ejecucion:
+                minima = self._ultima_ejecucion + timedelta(seconds=MIN_INTERVALO)
+                proxima = max(proxima, minima)
+
+            decision = {
+                'calculado': ahora.strftime('%Y-%m-%d %H:%M:%S'),
+                'proxima_ejecucion': proxima.strftime('%Y-%m-%d %H:%M:%S'),
+                'intervalo': round((proxima - ahora).total_seconds(), 1),
+                'intervalo_base': base,
+                'jitter': round(jitter, 1),
+                'motivo': motivo,
+                'resumen': resumen
+            }
+            self._decisiones.append(decision)
+
+        return {**decision, 'proxima': proxima}
+
+    def decisiones(self):
+        """Historial de decisiones, la más reciente primero"""
+        with self._lock:
+            return list(reversed(self._decisiones))
@@ -0,0 +1,155 @@
+"""
+Ejecución programada del scraping (un único proceso en todo el despliegue).
+
+- Dentro de la app web (DETECTOR_SCHEDULER=auto, por defecto): cada worker de
+  gunicorn se presenta como candidato y solo el que obtiene el lock
+  data/scheduler.lock ejecuta el scraping. Si ese worker muere, el sistema libera
+  el lock y otro worker toma el relevo en su siguiente intento.
+- Como proceso dedicado: `python programador.py`, con DETECTOR_SCHEDULER=off en
+  los workers web para que solo sirvan la API.
+
+Las decisiones del planificador se guardan en data/planificador.json (temporal +
+rename atómico) para que cualquier worker pueda servirlas.
+"""
+import os
+import json
+from datetime import datetime
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+import almacen_partidos
+import bloqueo
+import metricas
+import planificador
+import scrape_un_gol_live
+
+MODO = os.environ.get('DETECTOR_SCHEDULER', 'auto')
+
+ARCHIVO_LIDER = os.path.join(almacen_partidos.DATA_DIR, 'scheduler.lock')
+ARCHIVO_DECISIONES = os.path.join(almacen_partidos.DATA_DIR, 'planificador.json')
+# Segundos entre intentos de los workers que no son líderes
+INTERVALO_CANDIDATURA = 30
+
+# La próxima ejecución se decide después de cada ciclo según los partidos en vivo
+planificador_scraping = planificador.Planificador()
+liderazgo = bloqueo.Liderazgo(ARCHIVO_LIDER)
+_scheduler = None
+
+INTERVALO_PLANIFICADO = metricas.medidor(
+    'detector_planificador_intervalo_segundos', 'Segundos hasta el próximo scraping según el planificador')
+
+def guardar_decisiones(proxima_ejecucion):
+    """Escribe la próxima ejecución y el historial de decisiones de forma atómica"""
+    datos = {
+        'proxima_ejecucion': proxima_ejecucion,
+        'pid': os.getpid(),
+        'decisiones': planificador_scraping.decisiones()
+    }
+    temporal = f"{ARCHIVO_DECISIONES}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False)
+    os.replace(temporal, ARCHIVO_DECISIONES)
+
+def leer_decisiones():
+    """Últimas decisiones publicadas por el proceso líder (si lo hay)"""
+    try:
+        with open(ARCHIVO_DECISIONES, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'proxima_ejecucion': None, 'pid': None, 'decisiones': []}
+
+def _programar(cuando):
+    _scheduler.add_job(
+        func=ejecutar_scraping_un_gol,
+        trigger=DateTrigger(run_date=cuando),
+        id='scraping_un_gol',
+        name='Scraping Detector 1 Gol',
+        replace_existing=True,
+        # Cada ejecución programa la siguiente: una ejecución perdida pararía el scraping
+        misfire_grace_time=None
+    )
+
+def programar_siguiente(snapshot):
+    """Programa la próxima ejecución a partir del último snapshot"""
+    decision = planificador_scraping.siguiente(snapshot)
+    _programar(decision['proxima'])
+    INTERVALO_PLANIFICADO.fijar(decision['intervalo'])
+    print(f"⏰ Próximo scraping: {decision['proxima_ejecucion']} ({decision['intervalo']:.0f}s, {decision['motivo']})")
+
+    try:
+        guardar_decisiones(decision['proxima_ejecucion'])
+    except OSError as e:
+        print(f"⚠️ No se pudieron guardar las decisiones del planificador: {e}")
+
+def ejecutar_scraping_un_gol():
+    """Función que ejecuta el scraping automático"""
+    print(f"\n{'='*60}")
+    print(f"🤖 Scraping automático - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*60}")
+
+    planificador_scraping.registrar_ejecucion()
+    snapshot = None
+    try:
+        # Una sola descarga y parseo para detección y resultados finales
+        ciclo = scrape_un_gol_live.ejecutar_ciclo()
+        snapshot = ciclo['snapshot']
+        resultado = ciclo['deteccion']
+
+        if resultado['exito']:
+            print(f"✅ Nuevos detectados: {resultado['nuevos_detectados']}")
+            print(f"💾 Total guardados: {resultado['total_guardados']}")
+
+            actualizacion = ciclo['actualizacion']
+            print(f"🔄 Partidos actualizados: {actualizacion.get('actualizados', 0)}")
+        else:
+            print(f"❌ Error: {resultado.get('error', 'Desconocido')}")
+        print("⏱️ Tiempos: " + ' · '.join(f"{etapa} {segundos:.2f}s" for etapa, segundos in ciclo['tiempos'].items()))
+    finally:
+        # Siempre se reprograma: un fallo no debe detener el scraping
+        programar_siguiente(snapshot)
+        # Los demás workers sirven /metrics con los datos de este ciclo
+        metricas.publicar()
+
+    print(f"{'='*60}\n")
+
+def _candidatura():
+    if not liderazgo.intentar():
+        return
+    print(f"👑 Proceso {os.getpid()} toma el relevo del scraping")
+    _scheduler.remove_job('candidatura_scraping')
+    _programar(datetime.now())
+
+def iniciar(scheduler):
+    """
+    Programa el scraping en `scheduler` si este proceso es el líder
+    (con una primera ejecución inmediata); si no, lo intenta periódicamente.
+    No hace ninguna petición: el scraping inicial corre en el hilo del scheduler,
+    así que importar la app no depende de la red.
+    """
+    global _scheduler
+    _scheduler = scheduler
+
+    if liderazgo.intentar():
+        print(f"👑 Proceso {os.getpid()} ejecuta el scraping")
+        print("\n🚀 Scraping inicial programado en segundo plano")
+        _programar(datetime.now())
+        return
+
+    print(f"👥 Proceso {os.getpid()} solo sirve la API (el scraping corre en otro proceso)")
+    scheduler.add_job(
+        func=_candidatura,
+        trigger=IntervalTrigger(seconds=INTERVALO_CANDIDATURA),
+        id='candidatura_scraping',
+        name='Candidatura al scraping',
+        replace_existing=True
+    )
+
+if __name__ == '__main__':
+    # Proceso dedicado: los workers web pueden arrancar con DETECTOR_SCHEDULER=off
+    programador = BlockingScheduler()
+    iniciar(programador)
+    metricas.programar_publicacion(programador)
+    try:
+        programador.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
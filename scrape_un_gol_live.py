@@ -1,194 +1,230 @@
-import requests
-from bs4 import BeautifulSoup
-import json
 import os
-from datetime import datetime
-import re
+import io
+import csv
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import argparse
+import almacen_partidos
+import archivo_paginas
+import cliente_http
+import cronologia
+from bloqueo import BloqueoArchivo
+import eventos
+import extraccion
+import metricas
+import detectores
+from almacen_partidos import clave_partido, DETECTOR_PRINCIPAL
+
+# Se puede apuntar a un servidor local (stub) para pruebas
+URL_PRIMATIPS = os.environ.get('DETECTOR_URL_PRIMATIPS', 'https://es.primatips.com/tips/{fecha}')
+
+# Exportación: partidos leídos del almacén por lote (memoria constante)
+LOTE_EXPORTACION = 500
+FORMATOS_EXPORTACION = ('ndjson', 'csv')
+# La columna supero_1_5 del almacén se exporta como supero_linea (ver detectores.py)
+COLUMNAS_EXPORTACION = almacen_partidos.CAMPOS + ['linea', 'supero_linea', 'actualizado']
+
+# Resolución de pendientes de varios días
+MAX_DESCARGAS_PARALELAS = 4
+# Pendientes más antiguos que esto (aplazados, suspendidos) ya no se consultan:
+# pasan a SIN_RESULTADO y dejan de contar como pendientes y en vivo
+MAX_DIAS_PENDIENTES = 14
+
+_bloqueo_ciclo = BloqueoArchivo(os.path.join(almacen_partidos.DATA_DIR, 'ciclo.lock'))
+
+# Último snapshot parseado por fecha: si la página no cambió se reutiliza sin parsear
+MAX_SNAPSHOTS_CACHEADOS = MAX_DIAS_PENDIENTES + 2
+_snapshots = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+# Hora del último ciclo correcto de este proceso (readiness en /ready)
+ultimo_ciclo_correcto = None
+
+# Métricas por etapa del ciclo (ver /metrics)
+DURACION_PARSEO = metricas.histograma(
+    'detector_parseo_segundos', 'Duración del parseo de una página', ['motor'])
+FILAS_ESCANEADAS = metricas.contador(
+    'detector_filas_escaneadas_total', 'Filas a.game extraídas de las páginas parseadas')
+FILAS_SNAPSHOT = metricas.medidor(
+    'detector_filas_ultimo_snapshot', 'Filas del último snapshot parseado')
+DURACION_CICLO = metricas.histograma(
+    'detector_ciclo_segundos', 'Duración de cada etapa del ciclo de scraping (snapshot, deteccion, reconciliacion, cronologia, total)',
+    ['etapa'])
+CICLOS = metricas.contador(
+    'detector_ciclos_total', 'Ciclos de scraping por resultado (ok, sin_cambios, error)', ['resultado'])
+DETECCIONES_POR_CICLO = metricas.histograma(
+    'detector_detecciones_por_ciclo', 'Partidos que cumplen la regla de cada detector en cada ciclo',
+    ['detector'], cubos=(0, 1, 2, 3, 5, 10, 20, 50))
+PARTIDOS_NUEVOS = metricas.contador(
+    'detector_partidos_nuevos_total', 'Partidos detectados por primera vez', ['detector'])
+RESULTADOS_ACTUALIZADOS = metricas.contador(
+    'detector_resultados_actualizados_total', 'Partidos pendientes resueltos con su resultado final', ['detector'])
+FECHAS_CONSULTADAS = metricas.medidor(
+    'detector_fechas_pendientes_consultadas', 'Fechas consultadas en la última resolución de pendientes')
+ESCRITURA_ALMACEN = metricas.histograma(
+    'detector_almacen_escritura_segundos', 'Duración de las escrituras al almacén', ['operacion'])
 
-def obtener_minuto_partido(texto_minuto):
-    """Extrae el minuto actual del partido del texto"""
-    if not texto_minuto:
-        return None
+def _parsear(html, motor):
+    motor = motor or extraccion.MOTOR_POR_DEFECTO
+    with DURACION_PARSEO.medir(motor=motor):
+        filas = extraccion.extraer_filas(html, motor)
+    FILAS_ESCANEADAS.inc(len(filas))
+    FILAS_SNAPSHOT.fijar(len(filas))
+    return filas
+
+def descargar_pagina_dia(fecha):
+    """
+    Descarga la página de Primatips para una fecha con el cliente HTTP compartido.
+    Devuelve una cliente_http.Respuesta (contenido y si cambió desde la descarga anterior).
+    """
+    url = URL_PRIMATIPS.format(fecha=fecha)
+    
+    print(f"\n🔍 Escaneando {url}...")
+    
+    respuesta = cliente_http.obtener_cliente().obtener(url)
+    if respuesta.sin_cambios:
+        print(f"♻️ Página sin cambios ({respuesta.estado}), se reutiliza el último parseo")
     
-    # Buscar patrones como "65'" o "90'+3"
-    match = re.search(r'(\d+)', texto_minuto)
-    if match:
-        return int(match.group(1))
-    return None
+    # Con DETECTOR_ARCHIVO=on la página se guarda para repetir la detección sin red
+    archivo = archivo_paginas.obtener_archivo()
+    if archivo is not None:
+        try:
+            archivo.guardar(fecha, respuesta.contenido, respuesta.estado)
+        except Exception as e:
+            print(f"⚠️ No se pudo archivar la página: {e}")
+    return respuesta
 
-def scrape_partidos_un_gol_live():
+def obtener_snapshot(fecha=None, html=None, motor=None):
     """
-    Scrapea partidos en vivo de Primatips 1X2 del día actual
-    Detecta partidos con exactamente 1 gol después del minuto 60
+    Descarga y parsea la página del día una sola vez.
+    Si se pasa `html` (por ejemplo un fixture guardado) no se hace ninguna petición.
+    Cada fila `a.game` se extrae una única vez como FilaPartido; el snapshot
+    resultante se comparte entre detección y actualización de resultados.
+    Si la página descargada no cambió desde la última vez, se devuelve el snapshot
+    anterior sin volver a parsear (`sin_cambios: True`).
     """
-    try:
-        # URL de Primatips del día actual
-        fecha_hoy = datetime.now().strftime('%Y-%m-%d')
-        url = f"https://es.primatips.com/tips/{fecha_hoy}"
-        
-        print(f"\n🔍 Escaneando {url}...")
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    fecha = fecha or datetime.now().strftime('%Y-%m-%d')
+    
+    if html is not None:
+        return {
+            'fecha': fecha,
+            'filas': _parsear(html, motor),
+            'sin_cambios': False
         }
+    
+    respuesta = descargar_pagina_dia(fecha)
+    
+    if respuesta.sin_cambios:
+        with _snapshots_lock:
+            anterior = _snapshots.get(fecha)
+        if anterior is not None:
+            return {**anterior, 'sin_cambios': True}
+    
+    snapshot = {
+        'fecha': fecha,
+        'filas': _parsear(respuesta.contenido, motor),
+        'sin_cambios': False
+    }
+    with _snapshots_lock:
+        _snapshots[fecha] = snapshot
+        _snapshots.move_to_end(fecha)
+        while len(_snapshots) > MAX_SNAPSHOTS_CACHEADOS:
+            _snapshots.popitem(last=False)
+    return snapshot
+
+def indexar_snapshot(snapshot):
+    """Índice del snapshot por (fecha, equipo_casa, equipo_visitante)"""
+    indice = {}
+    for fila in snapshot['filas']:
+        clave = clave_partido(snapshot['fecha'], fila.equipo_casa, fila.equipo_visitante)
+        # Si la página repite un partido, vale la primera aparición
+        indice.setdefault(clave, fila)
+    return indice
+
+def partido_de_fila(fecha, fila, hora_deteccion):
+    """Registro de un partido detectado a partir de su fila del snapshot"""
+    return {
+        'fecha': fecha,
+        'hora': fila.hora,
+        'liga': fila.liga,
+        'equipo_casa': fila.equipo_casa,
+        'equipo_visitante': fila.equipo_visitante,
+        'goles_casa': fila.goles_casa,
+        'goles_visitante': fila.goles_visitante,
+        'minuto': fila.minuto,
+        'cuota_casa': fila.cuota_casa,
+        'cuota_empate': fila.cuota_empate,
+        'cuota_visitante': fila.cuota_visitante,
+        'prob_casa': fila.prob_casa,
+        'prob_empate': fila.prob_empate,
+        'prob_visitante': fila.prob_visitante,
+        'tip': fila.tip,
+        'hora_deteccion': hora_deteccion,
+        'estado': 'DETECTADO',
+        'goles_finales_casa': None,
+        'goles_finales_visitante': None,
+        'supero_1_5': None
+    }
+
+def scrape_partidos_un_gol_live(snapshot=None):
+    """
+    Scrapea partidos en vivo de Primatips 1X2 del día actual y evalúa todos los
+    detectores activos (detectores.py) en una sola pasada por las filas; cada
+    detector guarda sus partidos en su propio almacén.
+    El resultado principal es el del detector de 1 gol después del minuto 60;
+    el de cada detector está en 'detectores'.
+    Si no se pasa un snapshot, descarga la página del día.
+    """
+    try:
+        if snapshot is None:
+            snapshot = obtener_snapshot()
         
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Buscar partidos en vivo (clase 'lv' para live)
-        partidos_live = soup.find_all('a', class_='game')
-        
-        partidos_detectados = []
-        
-        for partido in partidos_live:
-            try:
-                # Verificar si está en vivo
-                resultado = partido.find('span', class_='res')
-                if not resultado or 'lv' not in resultado.get('class', []):
-                    continue
-                
-                # Extraer minuto
-                minuto_elemento = resultado.find('span', class_='lvs')
-                if not minuto_elemento:
-                    continue
-                
-                minuto_texto = minuto_elemento.get_text(strip=True)
-                minuto = obtener_minuto_partido(minuto_texto)
-                
-                if not minuto or minuto < 60:
-                    continue
-                
-                # Extraer resultado actual
-                goles_elementos = resultado.find_all('span', class_='l')
-                if len(goles_elementos) < 2:
-                    continue
-                
-                goles_casa = int(goles_elementos[0].get_text(strip=True) or 0)
-                goles_visitante = int(goles_elementos[1].get_text(strip=True) or 0)
-                
-                total_goles = goles_casa + goles_visitante
-                
-                # Solo detectar si hay exactamente 1 gol
-                if total_goles != 1:
-                    continue
-                
-                # Extraer equipos
-                equipos = partido.find('span', class_='nms')
-                if not equipos:
-                    continue
-                
-                nombres = equipos.find_all('span', class_='nm')
-                if len(nombres) < 2:
-                    continue
-                
-                equipo_casa = nombres[0].get_text(strip=True)
-                equipo_visitante = nombres[1].get_text(strip=True)
-                
-                # Extraer hora y liga
-                hora = partido.find('span', class_='tm')
-                hora_texto = hora.get_text(strip=True) if hora else ''
-                
-                liga = partido.find('span', class_='cn')
-                liga_texto = liga.get_text(strip=True) if liga else ''
-                
-                # Obtener nombre completo de la liga
-                liga_completa = partido.find('span', class_='fl')
-                if liga_completa:
-                    img = liga_completa.find('img')
-                    if img and img.get('title'):
-                        liga_texto = img.get('title')
-                
-                # Extraer cuotas
-                cuotas = partido.find_all('span', class_='o')
-                cuota_casa = cuotas[0].get_text(strip=True) if len(cuotas) > 0 else ''
-                cuota_empate = cuotas[1].get_text(strip=True) if len(cuotas) > 1 else ''
-                cuota_visitante = cuotas[2].get_text(strip=True) if len(cuotas) > 2 else ''
-                
-                # Extraer probabilidades
-                probs = partido.find_all('span', class_='t')
-                prob_casa = probs[0].get_text(strip=True) if len(probs) > 0 else ''
-                prob_empate = probs[1].get_text(strip=True) if len(probs) > 1 else ''
-                prob_visitante = probs[2].get_text(strip=True) if len(probs) > 2 else ''
-                
-                # Extraer tip
-                tip_elem = partido.find('span', class_='tip')
-                tip = tip_elem.get_text(strip=True) if tip_elem else ''
-                
-                # Crear registro del partido
-                partido_info = {
-                    'fecha': fecha_hoy,
-                    'hora': hora_texto,
-                    'liga': liga_texto,
-                    'equipo_casa': equipo_casa,
-                    'equipo_visitante': equipo_visitante,
-                    'goles_casa': goles_casa,
-                    'goles_visitante': goles_visitante,
-                    'minuto': minuto,
-                    'cuota_casa': cuota_casa,
-                    'cuota_empate': cuota_empate,
-                    'cuota_visitante': cuota_visitante,
-                    'prob_casa': prob_casa,
-                    'prob_empate': prob_empate,
-                    'prob_visitante': prob_visitante,
-                    'tip': tip,
-                    'hora_deteccion': datetime.now().strftime('%H:%M:%S'),
-                    'estado': 'DETECTADO',
-                    'goles_finales_casa': None,
-                    'goles_finales_visitante': None,
-                    'supero_1_5': None
-                }
-                
-                partidos_detectados.append(partido_info)
-                print(f"✅ DETECTADO: {equipo_casa} {goles_casa}-{goles_visitante} {equipo_visitante} (min {minuto})")
-                
-            except Exception as e:
-                print(f"⚠️ Error procesando partido: {e}")
-                continue
-        
-        # Cargar partidos existentes
-        archivo_json = 'data/partidos_un_gol_detectados.json'
-        partidos_guardados = {'partidos': [], 'total_partidos': 0}
-        
-        if os.path.exists(archivo_json):
-            try:
-                with open(archivo_json, 'r', encoding='utf-8') as f:
-                    partidos_guardados = json.load(f)
-            except:
-                pass
+        fecha_hoy = snapshot['fecha']
+        hora_deteccion = datetime.now().strftime('%H:%M:%S')
+        coincidencias = detectores.evaluar(snapshot['filas'])
         
-        # Agregar solo partidos nuevos (evitar duplicados)
-        for partido_nuevo in partidos_detectados:
-            # Verificar si ya existe por equipos y hora
-            existe = False
-            for partido_existente in partidos_guardados['partidos']:
-                if (partido_existente['equipo_casa'] == partido_nuevo['equipo_casa'] and 
-                    partido_existente['equipo_visitante'] == partido_nuevo['equipo_visitante'] and
-                    partido_existente['fecha'] == partido_nuevo['fecha']):
-                    existe = True
-                    break
+        por_detector = {}
+        hay_nuevos = False
+        for detector in detectores.ACTIVOS:
+            partidos_detectados = []
+            for fila in coincidencias[detector.id]:
+                partidos_detectados.append(partido_de_fila(fecha_hoy, fila, hora_deteccion))
+                print(f"✅ DETECTADO [{detector.id}]: {fila.equipo_casa} {fila.goles_casa}-{fila.goles_visitante} {fila.equipo_visitante} (min {fila.minuto})")
+            DETECCIONES_POR_CICLO.observar(len(partidos_detectados), detector=detector.id)
             
-            if not existe:
-                partidos_guardados['partidos'].append(partido_nuevo)
-        
-        # Actualizar información
-        partidos_guardados['ultima_actualizacion'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        partidos_guardados['total_partidos'] = len(partidos_guardados['partidos'])
+            # Guardar solo los partidos nuevos (deduplicación por clave indexada)
+            almacen = almacen_partidos.obtener_almacen(detector.id)
+            with ESCRITURA_ALMACEN.medir(operacion='guardar_nuevos'):
+                insertados = almacen.guardar_nuevos(partidos_detectados)
+            if insertados:
+                PARTIDOS_NUEVOS.inc(len(insertados), detector=detector.id)
+                hay_nuevos = True
+            
+            por_detector[detector.id] = {
+                'nuevos_detectados': len(partidos_detectados),
+                'total_guardados': almacen.total(),
+                'partidos': partidos_detectados
+            }
         
-        # Guardar archivo JSON
-        os.makedirs('data', exist_ok=True)
-        with open(archivo_json, 'w', encoding='utf-8') as f:
-            json.dump(partidos_guardados, f, ensure_ascii=False, indent=2)
+        if hay_nuevos:
+            eventos.notificar()
         
-        print(f"\n📊 Total partidos detectados: {len(partidos_detectados)}")
-        print(f"💾 Total en base de datos: {partidos_guardados['total_partidos']}")
+        principal = por_detector[DETECTOR_PRINCIPAL]
+        print(f"\n📊 Total partidos detectados: {principal['nuevos_detectados']}")
+        print(f"💾 Total en base de datos: {principal['total_guardados']}")
+        for detector_id, resultado in por_detector.items():
+            if detector_id != DETECTOR_PRINCIPAL:
+                print(f"   [{detector_id}] detectados: {resultado['nuevos_detectados']} | guardados: {resultado['total_guardados']}")
         
         return {
             'exito': True,
-            'nuevos_detectados': len(partidos_detectados),
-            'total_guardados': partidos_guardados['total_partidos'],
-            'partidos': partidos_detectados
+            **principal,
+            'detectores': por_detector
         }
         
     except Exception as e:
@@ -198,170 +234,444 @@ def scrape_partidos_un_gol_live():
             'error': str(e),
             'nuevos_detectados': 0,
             'total_guardados': 0,
-            'partidos': []
+            'partidos': [],
+            'detectores': {}
         }
 
-def actualizar_resultados_finales():
+def snapshots_de_fechas(fechas, snapshot=None):
     """
-    Verifica los partidos detectados que ya finalizaron
-    y actualiza si superaron los 1.5 goles
+    Snapshots de varias fechas. El snapshot ya descargado en el ciclo se reutiliza;
+    el resto de páginas se descargan en paralelo con un máximo de
+    MAX_DESCARGAS_PARALELAS peticiones a la vez.
+    Una fecha que falla se avisa y se omite sin detener las demás.
     """
-    archivo_json = 'data/partidos_un_gol_detectados.json'
+    snapshots = {}
+    if snapshot is not None and snapshot['fecha'] in fechas:
+        snapshots[snapshot['fecha']] = snapshot
     
-    if not os.path.exists(archivo_json):
-        return {'actualizados': 0}
+    por_descargar = sorted(f for f in fechas if f not in snapshots)
+    if not por_descargar:
+        return snapshots
     
+    with ThreadPoolExecutor(max_workers=min(MAX_DESCARGAS_PARALELAS, len(por_descargar))) as pool:
+        futuros = {pool.submit(obtener_snapshot, fecha): fecha for fecha in por_descargar}
+        for futuro in as_completed(futuros):
+            fecha = futuros[futuro]
+            try:
+                snapshots[fecha] = futuro.result()
+            except Exception as e:
+                print(f"⚠️ No se pudo descargar {fecha}: {e}")
+    
+    return snapshots
+
+def actualizar_resultados_finales(snapshot=None, descargar=True):
+    """
+    Verifica los partidos detectados que ya finalizaron
+    y actualiza si superaron la línea de goles de su detector (1.5 en el principal).
+    Se consultan todas las fechas con partidos pendientes de cualquier detector
+    (un partido detectado a las 23:40 termina en la página del día anterior),
+    en paralelo y en una sola pasada.
+    El snapshot del ciclo, si se pasa, se reutiliza para su fecha.
+    Con descargar=False solo se usa ese snapshot (por ejemplo con un fixture).
+    Los pendientes de hace más de MAX_DIAS_PENDIENTES días pasan a SIN_RESULTADO.
+    Comparte el lock del ciclo: una actualización manual no se solapa con el scraping
+    programado de otro worker.
+    """
+    with _bloqueo_ciclo:
+        return _actualizar_resultados_finales(snapshot, descargar)
+
+def _actualizar_resultados_finales(snapshot, descargar):
     try:
-        with open(archivo_json, 'r', encoding='utf-8') as f:
-            datos = json.load(f)
+        hoy = snapshot['fecha'] if snapshot else datetime.now().strftime('%Y-%m-%d')
+        limite = (datetime.strptime(hoy, '%Y-%m-%d') - timedelta(days=MAX_DIAS_PENDIENTES)).strftime('%Y-%m-%d')
         
-        fecha_hoy = datetime.now().strftime('%Y-%m-%d')
-        url = f"https://es.primatips.com/tips/{fecha_hoy}"
+        pendientes_por_detector = []
+        sin_resultado = 0
+        for detector in detectores.ACTIVOS:
+            almacen = almacen_partidos.obtener_almacen(detector.id)
+            pendientes = []
+            caducados = []
+            for partido in almacen.pendientes():
+                (pendientes if partido['fecha'] >= limite else caducados).append(partido)
+            
+            if caducados:
+                # Estado terminal con su revisión: el feed de cambios y el SSE lo ven
+                for partido in caducados:
+                    partido['estado'] = almacen_partidos.SIN_RESULTADO
+                with ESCRITURA_ALMACEN.medir(operacion='actualizar'):
+                    sin_resultado += almacen.actualizar(caducados)
+                print(f"⌛ [{detector.id}] {len(caducados)} pendientes anteriores a {limite} marcados {almacen_partidos.SIN_RESULTADO}")
+            if pendientes:
+                pendientes_por_detector.append((detector, almacen, pendientes))
+        if sin_resultado:
+            eventos.notificar()
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
+        # Sin pendientes no hace falta descargar nada
+        if not pendientes_por_detector:
+            return {'actualizados': 0, 'sin_resultado': sin_resultado}
         
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
+        fechas = {p['fecha'] for _, _, pendientes in pendientes_por_detector for p in pendientes}
+        if not descargar:
+            fechas &= {snapshot['fecha']} if snapshot else set()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        partidos_pagina = soup.find_all('a', class_='game')
+        FECHAS_CONSULTADAS.fijar(len(fechas))
+        snapshots = snapshots_de_fechas(fechas, snapshot)
+        if fechas and not snapshots:
+            return {'actualizados': 0, 'sin_resultado': sin_resultado, 'fechas': sorted(fechas),
+                    'error': 'No se pudo descargar ninguna fecha pendiente'}
         
-        actualizados = 0
+        # Páginas indexadas una sola vez para todos los detectores: cada pendiente se resuelve en O(1)
+        indice = {}
+        for snapshot_fecha in snapshots.values():
+            indice.update(indexar_snapshot(snapshot_fecha))
         
-        for partido_guardado in datos['partidos']:
-            if partido_guardado.get('supero_1_5') is not None:
-                continue  # Ya fue actualizado
+        por_detector = {}
+        for detector, almacen, pendientes in pendientes_por_detector:
+            resueltos = []
             
-            # Buscar el partido en la página
-            for partido_web in partidos_pagina:
-                try:
-                    equipos = partido_web.find('span', class_='nms')
-                    if not equipos:
-                        continue
-                    
-                    nombres = equipos.find_all('span', class_='nm')
-                    if len(nombres) < 2:
-                        continue
-                    
-                    equipo_casa = nombres[0].get_text(strip=True)
-                    equipo_visitante = nombres[1].get_text(strip=True)
-                    
-                    if (equipo_casa == partido_guardado['equipo_casa'] and
-                        equipo_visitante == partido_guardado['equipo_visitante']):
-                        
-                        # Verificar si el partido finalizó
-                        resultado = partido_web.find('span', class_='res')
-                        if resultado and 'rsl' in resultado.get('class', []):
-                            # Partido finalizado
-                            goles = resultado.find_all('span', class_='r')
-                            if len(goles) >= 2:
-                                goles_casa_final = int(goles[0].get_text(strip=True) or 0)
-                                goles_visitante_final = int(goles[1].get_text(strip=True) or 0)
-                                total_final = goles_casa_final + goles_visitante_final
-                                
-                                partido_guardado['goles_finales_casa'] = goles_casa_final
-                                partido_guardado['goles_finales_visitante'] = goles_visitante_final
-                                partido_guardado['supero_1_5'] = total_final > 1
-                                partido_guardado['estado'] = 'FINALIZADO'
-                                actualizados += 1
-                                
-                                print(f"✅ Actualizado: {equipo_casa} {goles_casa_final}-{goles_visitante_final} {equipo_visitante} | +1.5: {'SÍ' if total_final > 1 else 'NO'}")
-                        
-                        break
-                        
-                except Exception as e:
+            for partido_guardado in pendientes:
+                fila = indice.get(clave_partido(
+                    partido_guardado['fecha'],
+                    partido_guardado['equipo_casa'],
+                    partido_guardado['equipo_visitante']
+                ))
+                if not fila or not fila.finalizado:
                     continue
+                
+                goles_casa_final = fila.goles_finales_casa
+                goles_visitante_final = fila.goles_finales_visitante
+                supero = detector.supera_linea(goles_casa_final + goles_visitante_final)
+                
+                partido_guardado['goles_finales_casa'] = goles_casa_final
+                partido_guardado['goles_finales_visitante'] = goles_visitante_final
+                partido_guardado['supero_1_5'] = supero
+                partido_guardado['estado'] = 'FINALIZADO'
+                resueltos.append(partido_guardado)
+                
+                print(f"✅ Actualizado [{detector.id}]: {fila.equipo_casa} {goles_casa_final}-{goles_visitante_final} {fila.equipo_visitante} | +{detector.linea:g}: {'SÍ' if supero else 'NO'}")
+            
+            # Guardar solo los partidos que cambiaron
+            with ESCRITURA_ALMACEN.medir(operacion='actualizar'):
+                actualizados = almacen.actualizar(resueltos)
+            if actualizados:
+                RESULTADOS_ACTUALIZADOS.inc(actualizados, detector=detector.id)
+            por_detector[detector.id] = actualizados
         
-        # Guardar cambios
-        with open(archivo_json, 'w', encoding='utf-8') as f:
-            json.dump(datos, f, ensure_ascii=False, indent=2)
+        total = sum(por_detector.values())
+        if total:
+            eventos.notificar()
         
-        return {'actualizados': actualizados}
+        return {'actualizados': total, 'por_detector': por_detector, 'sin_resultado': sin_resultado,
+                'fechas': sorted(snapshots)}
         
     except Exception as e:
         print(f"❌ Error actualizando resultados: {e}")
         return {'actualizados': 0, 'error': str(e)}
 
-def obtener_partidos_detectados():
-    """Lee el archivo JSON con los partidos detectados"""
-    archivo_json = 'data/partidos_un_gol_detectados.json'
-    
-    if not os.path.exists(archivo_json):
+def registrar_cronologia(snapshot):
+    """Añade una observación a la cronología de cada partido pendiente (de cualquier detector) que sigue en juego"""
+    try:
+        claves = set()
+        for detector in detectores.ACTIVOS:
+            claves.update(almacen_partidos.clave_de(p) for p in almacen_partidos.obtener_almacen(detector.id).pendientes())
+        return cronologia.obtener_cronologia().registrar(snapshot, claves)
+    except Exception as e:
+        print(f"⚠️ Error registrando la cronología: {e}")
+        return 0
+
+def ejecutar_ciclo(fecha=None, html=None):
+    """
+    Ciclo completo de scraping: una sola descarga y un solo parseo
+    alimentan la detección en vivo y la actualización de resultados finales.
+    Un solo ciclo a la vez en todo el despliegue (scheduler y actualizaciones
+    manuales desde cualquier worker).
+    """
+    with _bloqueo_ciclo:
+        return _ejecutar_ciclo(fecha, html)
+
+def _ejecutar_ciclo(fecha, html):
+    global ultimo_ciclo_correcto
+    inicio = time.perf_counter()
+    tiempos = {}
+    try:
+        snapshot = obtener_snapshot(fecha, html)
+    except Exception as e:
+        print(f"❌ Error en scraping: {e}")
+        tiempos['total'] = time.perf_counter() - inicio
+        DURACION_CICLO.observar(tiempos['total'], etapa='total')
+        CICLOS.inc(resultado='error')
         return {
-            'ultima_actualizacion': None,
-            'total_partidos': 0,
-            'partidos': [],
-            'estadisticas': {
-                'finalizados': 0,
-                'supero_1_5': 0,
-                'no_supero_1_5': 0,
-                'en_vivo': 0
-            }
+            'deteccion': {
+                'exito': False,
+                'error': str(e),
+                'nuevos_detectados': 0,
+                'total_guardados': 0,
+                'partidos': [],
+                'detectores': {}
+            },
+            'actualizacion': {'actualizados': 0, 'error': str(e)},
+            'snapshot': None,
+            'tiempos': tiempos
         }
+    tiempos['snapshot'] = time.perf_counter() - inicio
     
+    marca = time.perf_counter()
+    deteccion = scrape_partidos_un_gol_live(snapshot)
+    tiempos['deteccion'] = time.perf_counter() - marca
+    
+    actualizacion = {'actualizados': 0}
+    if deteccion['exito']:
+        # Con un HTML dado (fixture) no se descargan las demás fechas
+        marca = time.perf_counter()
+        actualizacion = _actualizar_resultados_finales(snapshot, descargar=html is None)
+        tiempos['reconciliacion'] = time.perf_counter() - marca
+        
+        # Página sin cambios: las observaciones serían las mismas del ciclo anterior
+        if not snapshot['sin_cambios']:
+            marca = time.perf_counter()
+            registrar_cronologia(snapshot)
+            tiempos['cronologia'] = time.perf_counter() - marca
+    
+    tiempos['total'] = time.perf_counter() - inicio
+    for etapa, segundos in tiempos.items():
+        DURACION_CICLO.observar(segundos, etapa=etapa)
+    if not deteccion['exito']:
+        CICLOS.inc(resultado='error')
+    else:
+        CICLOS.inc(resultado='sin_cambios' if snapshot['sin_cambios'] else 'ok')
+        ultimo_ciclo_correcto = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    return {
+        'deteccion': deteccion,
+        'actualizacion': actualizacion,
+        'snapshot': snapshot,
+        'tiempos': tiempos
+    }
+
+def obtener_partidos_detectados(desde=None, hasta=None, estado=None, detector=DETECTOR_PRINCIPAL,
+                                liga=None, supero_1_5=None, orden=None, limite=None, pagina=None):
+    """
+    Lee los partidos detectados del almacén del detector.
+    Filtros opcionales: rango de fechas YYYY-MM-DD (inclusivo), estado, liga y supero_1_5
+    (si el partido superó la línea del detector).
+    Con `limite` devuelve una sola página en el orden `orden` (ver almacen_partidos.ORDENES);
+    la siguiente se pide con pagina=siguiente_pagina. Sin `limite` ni `orden` la lista
+    completa sale en orden de detección, como antes de la paginación.
+    Las estadísticas corresponden a todos los partidos filtrados, no solo a la página.
+    """
+    regla = detectores.obtener(detector)
+    if orden is None and limite is None:
+        orden = 'deteccion'
     try:
-        with open(archivo_json, 'r', encoding='utf-8') as f:
-            datos = json.load(f)
+        almacen = almacen_partidos.obtener_almacen(detector)
+        # Cursor leído antes que los datos: desde aquí se piden los cambios posteriores
+        cursor = almacen.revision()
+        resultado = almacen.pagina(
+            desde=desde, hasta=hasta, estado=estado, liga=liga, supero_1_5=supero_1_5,
+            orden=orden, despues=pagina, limite=limite
+        )
         
-        # Calcular estadísticas
-        finalizados = sum(1 for p in datos['partidos'] if p.get('estado') == 'FINALIZADO')
-        supero = sum(1 for p in datos['partidos'] if p.get('supero_1_5') == True)
-        no_supero = sum(1 for p in datos['partidos'] if p.get('supero_1_5') == False)
-        en_vivo = datos['total_partidos'] - finalizados
+        # Estadísticas preagregadas: no se recorren los partidos
+        estadisticas = almacen.estadisticas(desde=desde, hasta=hasta, estado=estado, liga=liga, supero_1_5=supero_1_5)
         
-        datos['estadisticas'] = {
-            'finalizados': finalizados,
-            'supero_1_5': supero,
-            'no_supero_1_5': no_supero,
-            'en_vivo': en_vivo
+        return {
+            'ultima_actualizacion': almacen.ultima_actualizacion(),
+            'total_partidos': estadisticas.pop('detectados'),
+            'cursor': cursor,
+            'partidos': [regla.publicar_partido(p) for p in resultado['partidos']],
+            'siguiente_pagina': resultado['siguiente'],
+            'estadisticas': regla.publicar_estadisticas(estadisticas)
         }
-        
-        return datos
     except Exception as e:
-        print(f"Error leyendo JSON: {e}")
+        print(f"Error leyendo partidos: {e}")
         return {
             'ultima_actualizacion': None,
             'total_partidos': 0,
             'partidos': [],
-            'estadisticas': {
+            'siguiente_pagina': None,
+            'estadisticas': regla.publicar_estadisticas({
                 'finalizados': 0,
                 'supero_1_5': 0,
                 'no_supero_1_5': 0,
                 'en_vivo': 0
-            }
+            })
         }
 
-def limpiar_partidos_detectados():
-    """Limpia el archivo JSON de partidos detectados"""
-    archivo_json = 'data/partidos_un_gol_detectados.json'
-    
-    datos_vacios = {
-        'ultima_actualizacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'total_partidos': 0,
-        'partidos': [],
-        'estadisticas': {
-            'finalizados': 0,
-            'supero_1_5': 0,
-            'no_supero_1_5': 0,
-            'en_vivo': 0
+def obtener_cambios(cursor, desde=None, hasta=None, estado=None, detector=DETECTOR_PRINCIPAL,
+                    liga=None, supero_1_5=None):
+    """
+    Partidos insertados o modificados después de `cursor` (sin filtrar, para que
+    el cliente pueda quitar los que dejan de cumplir su filtro) y estadísticas del filtro.
+    Si 'reiniciar' es True el cliente debe recargar la lista completa.
+    """
+    regla = detectores.obtener(detector)
+    try:
+        almacen = almacen_partidos.obtener_almacen(detector)
+        cambios = almacen.cambios_desde(cursor)
+        estadisticas = almacen.estadisticas(desde=desde, hasta=hasta, estado=estado, liga=liga, supero_1_5=supero_1_5)
+        
+        return {
+            'cursor': cambios['cursor'],
+            'reiniciar': cambios['reiniciar'],
+            'partidos': [regla.publicar_partido(p) for p in cambios['partidos']],
+            'ultima_actualizacion': almacen.ultima_actualizacion(),
+            'total_partidos': estadisticas.pop('detectados'),
+            'estadisticas': regla.publicar_estadisticas(estadisticas)
         }
+    except Exception as e:
+        print(f"Error leyendo cambios: {e}")
+        return {'cursor': cursor, 'reiniciar': True, 'partidos': [], 'error': str(e)}
+
+def obtener_version(detector=DETECTOR_PRINCIPAL):
+    """Versión actual del almacén del detector; cambia con cada escritura"""
+    return almacen_partidos.obtener_almacen(detector).version()
+
+def obtener_estadisticas(agrupar=None, desde=None, hasta=None, detector=DETECTOR_PRINCIPAL):
+    """
+    Estadísticas preagregadas, totales o por día/liga.
+    agrupar: None (totales), 'fecha' o 'liga'
+    """
+    regla = detectores.obtener(detector)
+    try:
+        almacen = almacen_partidos.obtener_almacen(detector)
+        if agrupar:
+            grupos = almacen.estadisticas_agrupadas(agrupar, desde, hasta)
+            return {'agrupar': agrupar, 'grupos': [regla.publicar_estadisticas(g) for g in grupos]}
+        return regla.publicar_estadisticas(almacen.estadisticas(desde=desde, hasta=hasta))
+    except Exception as e:
+        print(f"Error leyendo estadísticas: {e}")
+        return {'error': str(e)}
+
+def obtener_cronologia(fecha, equipo_casa, equipo_visitante):
+    """Observaciones en vivo de un partido y los cambios de marcador vistos entre ellas"""
+    observaciones = cronologia.obtener_cronologia().observaciones(fecha, equipo_casa, equipo_visitante)
+    return {
+        'fecha': fecha,
+        'equipo_casa': equipo_casa,
+        'equipo_visitante': equipo_visitante,
+        'observaciones': observaciones,
+        'cambios_marcador': cronologia.cambios_marcador(observaciones)
     }
+
+def normalizar_instante(texto):
+    """Instante 'YYYY-MM-DD[ HH:MM[:SS]]' o ISO 8601 al formato del almacén; ValueError si no es válido"""
+    return datetime.fromisoformat(texto.strip()).strftime('%Y-%m-%d %H:%M:%S')
+
+def exportar_partidos(formato='ndjson', desde=None, hasta=None, actualizado_desde=None,
+                      detector=DETECTOR_PRINCIPAL, **filtros):
+    """
+    Genera el historial en NDJSON (un partido por línea) o CSV, un trozo de texto
+    por lote de LOTE_EXPORTACION partidos: nunca hay más de un lote en memoria.
+    Filtros: rango de fechas del partido, estado, liga, supero_1_5 (línea del detector) y, para una
+    exportación incremental, `actualizado_desde` (partidos insertados o cambiados
+    desde ese instante, formato del campo `actualizado`).
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato desconocido: {formato} (opciones: {', '.join(FORMATOS_EXPORTACION)})")
     
+    regla = detectores.obtener(detector)
+    almacen = almacen_partidos.obtener_almacen(detector)
+    columnas = [c for c in COLUMNAS_EXPORTACION if c != 'supero_1_5' or regla.linea == 1.5]
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=columnas, lineterminator='\n', extrasaction='ignore')
+    if formato == 'csv':
+        escritor.writeheader()
+    
+    # Orden de detección: un partido insertado durante la exportación llega al final
+    pagina = None
+    while True:
+        lote = almacen.pagina(
+            desde=desde, hasta=hasta, orden='deteccion', despues=pagina,
+            limite=LOTE_EXPORTACION, actualizado_desde=actualizado_desde, **filtros
+        )
+        for partido in lote['partidos']:
+            partido = regla.publicar_partido(partido)
+            if formato == 'csv':
+                escritor.writerow(partido)
+            else:
+                buffer.write(json.dumps(partido, ensure_ascii=False))
+                buffer.write('\n')
+        if buffer.tell():
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        
+        pagina = lote['siguiente']
+        if pagina is None:
+            return
+
+def listar_detectores():
+    """Detectores activos con su regla y las estadísticas de su almacén"""
+    resultado = []
+    for detector in detectores.ACTIVOS:
+        resultado.append({
+            **detector.descripcion(),
+            'principal': detector.id == DETECTOR_PRINCIPAL,
+            'estadisticas': obtener_estadisticas(detector=detector.id)
+        })
+    return resultado
+
+def limpiar_partidos_detectados(detector=DETECTOR_PRINCIPAL):
+    """Limpia todos los partidos detectados por el detector"""
     try:
-        os.makedirs('data', exist_ok=True)
-        with open(archivo_json, 'w', encoding='utf-8') as f:
-            json.dump(datos_vacios, f, ensure_ascii=False, indent=2)
+        with ESCRITURA_ALMACEN.medir(operacion='limpiar'):
+            almacen_partidos.obtener_almacen(detector).limpiar()
+        eventos.notificar()
         return {'exito': True}
     except Exception as e:
         return {'exito': False, 'error': str(e)}
 
+def _exportar_cli(args):
+    """`python scrape_un_gol_live.py exportar`: historial por la salida estándar o a un archivo"""
+    try:
+        actualizado_desde = normalizar_instante(args.actualizado_desde) if args.actualizado_desde else None
+    except ValueError:
+        sys.exit(f"❌ Instante inválido: {args.actualizado_desde} (YYYY-MM-DD HH:MM:SS)")
+    supero = {'true': True, 'false': False}.get(args.supero_1_5)
+    
+    # Tomado antes de leer: lo que cambie durante la exportación entra en la siguiente
+    inicio = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    salida = open(args.salida, 'w', encoding='utf-8', newline='') if args.salida else sys.stdout
+    try:
+        for trozo in exportar_partidos(
+            args.formato, desde=args.desde, hasta=args.hasta, actualizado_desde=actualizado_desde,
+            detector=args.detector, estado=args.estado, liga=args.liga, supero_1_5=supero
+        ):
+            salida.write(trozo)
+    finally:
+        if args.salida:
+            salida.close()
+    # Mensajes por stderr para no mezclarlos con los datos
+    print(f"✅ Exportación completada. Siguiente incremental: --actualizado-desde '{inicio}'", file=sys.stderr)
+
 if __name__ == '__main__':
-    print("🚨 Iniciando detector de partidos con 1 gol (60+ min)...")
-    resultado = scrape_partidos_un_gol_live()
-    print(f"\n✅ Scraping completado. Nuevos: {resultado['nuevos_detectados']}")
+    parser = argparse.ArgumentParser(description='Detector de partidos con 1 gol (60+ min)')
+    parser.add_argument('--fixture', help='Ruta a un HTML de Primatips guardado (no se descarga nada)')
+    parser.add_argument('--fecha', help='Fecha YYYY-MM-DD del snapshot (por defecto hoy)')
+    subparsers = parser.add_subparsers(dest='comando')
+    parser_exportar = subparsers.add_parser('exportar', help='Exporta el historial en NDJSON o CSV')
+    parser_exportar.add_argument('--formato', choices=FORMATOS_EXPORTACION, default='ndjson')
+    parser_exportar.add_argument('--desde', help='Primera fecha de partido YYYY-MM-DD')
+    parser_exportar.add_argument('--hasta', help='Última fecha de partido YYYY-MM-DD')
+    parser_exportar.add_argument('--actualizado-desde', help='Solo partidos insertados o cambiados desde este instante')
+    parser_exportar.add_argument('--estado', choices=['DETECTADO', 'FINALIZADO', almacen_partidos.SIN_RESULTADO])
+    parser_exportar.add_argument('--liga')
+    parser_exportar.add_argument('--supero-linea', '--supero-1-5', dest='supero_1_5', choices=['true', 'false'],
+                                 help='Si el partido superó la línea de goles del detector')
+    parser_exportar.add_argument('--detector', default=DETECTOR_PRINCIPAL, choices=list(detectores.POR_ID))
+    parser_exportar.add_argument('--salida', help='Archivo de salida (por defecto la salida estándar)')
+    args = parser.parse_args()
+    
+    if args.comando == 'exportar':
+        _exportar_cli(args)
+        sys.exit(0)
     
-    print("\n🔄 Actualizando resultados finales...")
-    actualizacion = actualizar_resultados_finales()
-    print(f"✅ Actualizados: {actualizacion.get('actualizados', 0)} partidos")
+    html = None
+    if args.fixture:
+        with open(args.fixture, 'rb') as f:
+            html = f.read()
+    
+    print("🚨 Iniciando detector de partidos con 1 gol (60+ min)...")
+    ciclo = ejecutar_ciclo(fecha=args.fecha, html=html)
+    print(f"\n✅ Scraping completado. Nuevos: {ciclo['deteccion']['nuevos_detectados']}")
+    print(f"✅ Actualizados: {ciclo['actualizacion'].get('actualizados', 0)} partidos")